@@ -2,10 +2,14 @@ import os
 from flask import Flask, jsonify
 from flask_cors import CORS
 from src.config.config import DevelopmentConfig, ProductionConfig
-from src import db, migrate, mail, ai_service
+from src import (
+    db, migrate, mail, ai_service, availability_cache, email_dispatcher
+)
 from src.routes.booking_routes import booking_bp
 from src.routes.timeslot_routes import timeslot_bp
 from src.routes.ai_routes import ai_bp
+from src.commands.timeslot_commands import timeslot_cli
+from src.commands.ai_commands import ai_cli
 
 
 def create_app(config_class=None):
@@ -24,12 +28,17 @@ def create_app(config_class=None):
     db.init_app(app)
     migrate.init_app(app, db)
     mail.init_app(app)
+    availability_cache.init_app(app)
+    email_dispatcher.init_app(app)
     ai_service.init_app(app)
 
     app.register_blueprint(booking_bp, url_prefix='/api/bookings')
     app.register_blueprint(timeslot_bp, url_prefix='/api/timeslots')
     app.register_blueprint(ai_bp, url_prefix='/api/ai')
 
+    app.cli.add_command(timeslot_cli)
+    app.cli.add_command(ai_cli)
+
     @app.route("/")
     def home():
         return jsonify({"message": "Welcome to the Timeslot Scheduling Tool"})
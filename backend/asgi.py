@@ -0,0 +1,5 @@
+from app import app
+from src.asgi import create_asgi_app
+
+# run with: uvicorn asgi:application --host 0.0.0.0 --port 5001
+application = create_asgi_app(app)
@@ -0,0 +1,129 @@
+"""Load test: concurrent chats on the sync and async assistant paths.
+
+Every chat is a fake assistant run that takes RUN_SECONDS to complete.
+The sync path answers chats on a fixed pool of threads, like gunicorn
+threads or `flask run`, so at most that many chats progress at once. The
+async path answers every chat on one event loop thread, as the ASGI chat
+endpoint does.
+
+Usage (from backend/):
+    python -m benchmarks.bench_chat_concurrency [chats ...]
+"""
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+import asyncio
+import itertools
+import sys
+import time
+from benchmarks.common import report
+from src.services.ai_service import AIService
+
+RUN_SECONDS = 1.0
+SYNC_THREADS = 32
+
+
+class FakeAssistant:
+    """Runs complete RUN_SECONDS after they are created."""
+
+    def __init__(self):
+        self._ids = itertools.count()
+        self._done_at = {}
+        self.reply = SimpleNamespace(data=[SimpleNamespace(content=[
+            SimpleNamespace(text=SimpleNamespace(value='ok'))])])
+
+    def create_thread(self, **kwargs):
+        return SimpleNamespace(id=next(self._ids))
+
+    def create_message(self, **kwargs):
+        return None
+
+    def create_run(self, thread_id, assistant_id, **kwargs):
+        self._done_at[thread_id] = time.perf_counter() + RUN_SECONDS
+        return SimpleNamespace(id=thread_id, status='queued')
+
+    def retrieve_run(self, thread_id, run_id):
+        done = time.perf_counter() >= self._done_at[thread_id]
+        return SimpleNamespace(
+            id=run_id, status='completed' if done else 'in_progress')
+
+    def list_messages(self, **kwargs):
+        return self.reply
+
+    def sync_client(self):
+        return self._client(lambda func: func)
+
+    def async_client(self):
+        def make_async(func):
+            async def call(*args, **kwargs):
+                return func(*args, **kwargs)
+            return call
+        return self._client(make_async)
+
+    def _client(self, wrap):
+        return SimpleNamespace(beta=SimpleNamespace(threads=SimpleNamespace(
+            create=wrap(self.create_thread),
+            messages=SimpleNamespace(
+                create=wrap(self.create_message),
+                list=wrap(self.list_messages)
+            ),
+            runs=SimpleNamespace(
+                create=wrap(self.create_run),
+                retrieve=wrap(self.retrieve_run)
+            )
+        )))
+
+
+def make_service():
+    service = AIService()
+    service.assistant = SimpleNamespace(id='asst_1')
+    fake = FakeAssistant()
+    service.client = fake.sync_client()
+    service.async_client = fake.async_client()
+    return service
+
+
+def run_sync(chats):
+    service = make_service()
+    with ThreadPoolExecutor(max_workers=SYNC_THREADS) as pool:
+        submitted = time.perf_counter()
+        futures = [pool.submit(service.get_ai_response, 'hi')
+                   for _ in range(chats)]
+
+        def wait(future):
+            future.result()
+            return (time.perf_counter() - submitted) * 1000
+
+        # latency as seen by a client, including time queued for a thread
+        return [wait(future) for future in futures], SYNC_THREADS
+
+
+def run_async(chats):
+    service = make_service()
+
+    async def chat():
+        started = time.perf_counter()
+        await service.get_ai_response_async('hi')
+        return (time.perf_counter() - started) * 1000
+
+    async def main():
+        return await asyncio.gather(*(chat() for _ in range(chats)))
+
+    return asyncio.run(main()), 1
+
+
+def main():
+    levels = [int(arg) for arg in sys.argv[1:]] or [32, 200, 500]
+    print(f"fake runs take {RUN_SECONDS:.0f}s, sync pool of "
+          f"{SYNC_THREADS} threads")
+    for chats in levels:
+        for label, runner in [('sync', run_sync), ('async', run_async)]:
+            started = time.perf_counter()
+            latencies, threads = runner(chats)
+            elapsed = time.perf_counter() - started
+            report(f"{label} x{chats}", latencies,
+                   chats_per_s=f"{chats / elapsed:.0f}",
+                   threads=threads)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""Benchmark chat latency while Azure OpenAI is down.
+
+Every fake run stays queued, so each chat waits out the run budget
+(RUN_TIMEOUT seconds) before failing. Without the circuit breaker every
+request pays that, with it only the first few do and the rest are
+answered in degraded mode straight away.
+
+Usage (from backend/):
+    python -m benchmarks.bench_circuit_breaker [chats]
+"""
+from types import SimpleNamespace
+import sys
+import time
+from benchmarks.common import report
+from src.services.ai_service import FAQ_RESPONSES, AIService
+from src.services.circuit_breaker import CircuitBreaker
+from src.services.faq_index import FaqIndex
+
+RUN_TIMEOUT = 0.2
+
+
+def fake_client(counter):
+    def create_run(**kwargs):
+        counter['runs'] += 1
+        return SimpleNamespace(id='run-1', status='queued')
+
+    stuck = SimpleNamespace(id='run-1', status='queued')
+    return SimpleNamespace(beta=SimpleNamespace(threads=SimpleNamespace(
+        create=lambda: SimpleNamespace(id='thread-1'),
+        messages=SimpleNamespace(create=lambda **kwargs: None),
+        runs=SimpleNamespace(
+            create=create_run,
+            retrieve=lambda **kwargs: stuck,
+            cancel=lambda **kwargs: SimpleNamespace(
+                id='run-1', status='cancelled')
+        )
+    )))
+
+
+def main():
+    chats = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    print(f"{chats} chats, backend down, run budget "
+          f"{RUN_TIMEOUT * 1000:.0f}ms")
+
+    for label, min_calls in [('no circuit breaker', chats + 1),
+                             ('circuit breaker', 5)]:
+        counter = {'runs': 0}
+        service = AIService()
+        service.client = fake_client(counter)
+        service.assistant = SimpleNamespace(id='asst_1')
+        service.faq_index = FaqIndex(FAQ_RESPONSES)
+        service.poll_settings = {'initial_delay': 0.02, 'max_delay': 0.05}
+        service.run_timeout = RUN_TIMEOUT
+        service.circuit_breaker = CircuitBreaker(
+            min_calls=min_calls, is_failure=service._is_backend_failure)
+
+        durations = []
+        for user in range(chats):
+            started = time.perf_counter()
+            try:
+                service.get_ai_response(
+                    "Can I book for tomorrow?", user_id=f"user-{user}")
+            except RuntimeError:
+                pass
+            durations.append((time.perf_counter() - started) * 1000)
+        report(label, durations, runs=counter['runs'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""Benchmark app startup with eager and lazy AIService initialization.
+
+Key Vault and the assistants API are replaced with stubs that sleep for
+a typical round trip, so the numbers show the network time create_app
+used to spend before the app could serve its first request. "eager"
+initializes the assistant during startup as before, "lazy" leaves it to
+the first chat, which is timed separately.
+
+Usage (from backend/):
+    python -m benchmarks.bench_cold_start [repeat]
+"""
+from types import SimpleNamespace
+from unittest.mock import patch
+import sys
+import time
+from benchmarks.common import report
+from src import ai_service
+from src.config.config import Config
+
+KEY_VAULT_SECONDS = 0.15
+ASSISTANT_SECONDS = 0.25
+
+
+class BenchConfig(Config):
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    AZURE_ASSISTANT_ID = 'asst_1'
+
+
+def slow(seconds, result=None):
+    def call(*args, **kwargs):
+        time.sleep(seconds)
+        return result
+    return call
+
+
+def stub_azure():
+    assistant = SimpleNamespace(id='asst_1')
+    assistants = SimpleNamespace(
+        retrieve=slow(ASSISTANT_SECONDS, assistant),
+        update=slow(ASSISTANT_SECONDS, assistant),
+        create=slow(ASSISTANT_SECONDS, assistant)
+    )
+    client = SimpleNamespace(beta=SimpleNamespace(assistants=assistants))
+    secret = SimpleNamespace(
+        get_secret=slow(KEY_VAULT_SECONDS, SimpleNamespace(value='key')))
+    return [
+        patch('src.services.secret_provider.DefaultAzureCredential'),
+        patch('src.services.secret_provider.SecretClient',
+              return_value=secret),
+        patch('src.services.ai_service.AzureOpenAI', return_value=client),
+        patch('src.services.ai_service.AsyncAzureOpenAI')
+    ]
+
+
+def reset_service():
+    ai_service.client = None
+    ai_service.async_client = None
+    ai_service.assistant = None
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    from app import create_app
+
+    patches = stub_azure()
+    for stub in patches:
+        stub.start()
+    try:
+        startup = {'eager': [], 'lazy': []}
+        first_chat = []
+        for _ in range(repeat):
+            reset_service()
+            started = time.perf_counter()
+            create_app(BenchConfig)
+            ai_service.ensure_initialized()
+            startup['eager'].append((time.perf_counter() - started) * 1000)
+
+            reset_service()
+            started = time.perf_counter()
+            create_app(BenchConfig)
+            startup['lazy'].append((time.perf_counter() - started) * 1000)
+
+            started = time.perf_counter()
+            ai_service.ensure_initialized()
+            first_chat.append((time.perf_counter() - started) * 1000)
+    finally:
+        for stub in patches:
+            stub.stop()
+
+    print(f"Key Vault {KEY_VAULT_SECONDS * 1000:.0f}ms, assistants API "
+          f"{ASSISTANT_SECONDS * 1000:.0f}ms per call")
+    report('eager startup', startup['eager'])
+    report('lazy startup', startup['lazy'])
+    report('lazy first chat setup', first_chat)
+
+
+if __name__ == '__main__':
+    main()
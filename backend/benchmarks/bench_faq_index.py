@@ -0,0 +1,45 @@
+"""Benchmark the local FAQ index that answers questions without the LLM.
+
+Times building the index and matching a mix of FAQ questions and other
+chat messages. Each hit saves a full assistant run, several API calls
+taking seconds in total.
+
+Usage (from backend/):
+    python -m benchmarks.bench_faq_index [repeat]
+"""
+import sys
+from benchmarks.common import report, timeit
+from src.services.ai_service import FAQ_RESPONSES
+from src.services.faq_index import FaqIndex
+
+MESSAGES = [
+    "What are your opening hours?",
+    "where are you located?",
+    "Do you have wifi?",
+    "what payment methods do you accept",
+    "Do you offer delivery?",
+    "How do I order in BSL?",
+    "Can I book a table for 2pm tomorrow?",
+    "I'd like to book from 1-3pm on Monday, my name is Sam",
+    "Show me the latte video",
+    "How do I sign thank you?",
+    "Can I host an event on Friday at 3pm?",
+    "yes please confirm the booking",
+]
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+    report('build index', timeit(lambda: FaqIndex(FAQ_RESPONSES), repeat=20))
+
+    index = FaqIndex(FAQ_RESPONSES)
+    durations = []
+    for message in MESSAGES:
+        durations += timeit(lambda: index.match(message), repeat=repeat)
+    stats = index.stats()
+    report('match', durations, hit_rate=f"{stats['hit_rate']:.2f}")
+
+
+if __name__ == '__main__':
+    main()
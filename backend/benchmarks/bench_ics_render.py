@@ -0,0 +1,90 @@
+"""Benchmark rendering the booking invitation attached to confirmations.
+
+Compares the previous approach (building an ics.Calendar per email and
+serialising it) with the precompiled IcsRenderer, and reports the one-off
+cost of importing each in a fresh interpreter.
+
+Usage (from backend/):
+    python -m benchmarks.bench_ics_render [iterations]
+"""
+from datetime import datetime, timedelta, timezone
+import subprocess
+import sys
+from benchmarks.common import report, timeit
+from src.services.email_service import EmailService
+from src.services import ics_renderer
+from src.services.ics_renderer import IcsRenderer
+
+ORGANIZER_EMAIL = 'cafe@example.com'
+ATTENDEE_EMAIL = 'guest@example.com'
+START_TIME = datetime(2025, 6, 2, 10, 0, tzinfo=timezone.utc)
+END_TIME = START_TIME + timedelta(hours=1)
+
+
+def render_with_ics():
+    from ics import Calendar, Event
+
+    c = Calendar()
+    e = Event()
+    e.name = "Dialogue Cafe Booking"
+    e.begin = START_TIME
+    e.end = END_TIME
+    e.location = EmailService.LOCATION
+    e.description = "Your booking at Dialogue Cafe is confirmed!"
+    e.organizer = f"{EmailService.ORGANIZER_NAME};mailto:{ORGANIZER_EMAIL}"
+    e.attendees = [f"mailto:{ATTENDEE_EMAIL}"]
+    c.events.add(e)
+    ics_content = c.serialize().replace("\n", "\r\n")
+    return f"BEGIN:VCALENDAR\r\nMETHOD:REQUEST\r\n{ics_content[13:]}"
+
+
+def import_ms(statement):
+    """time an import in a fresh interpreter"""
+    code = (
+        "import time; start = time.perf_counter(); "
+        f"{statement}; print((time.perf_counter() - start) * 1000)"
+    )
+    result = subprocess.run([sys.executable, '-c', code],
+                            capture_output=True, text=True, check=True)
+    return float(result.stdout)
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    renderer = IcsRenderer(
+        summary="Dialogue Cafe Booking",
+        description="Your booking at Dialogue Cafe is confirmed!",
+        location=EmailService.LOCATION,
+        organizer_name=EmailService.ORGANIZER_NAME,
+        organizer_email=ORGANIZER_EMAIL
+    )
+
+    def render_precompiled():
+        return renderer.render(ATTENDEE_EMAIL, START_TIME, END_TIME)
+
+    print(f"{iterations} invitations per run")
+    # load ics_renderer on its own, importing src would pull in the app
+    renderer_import = (
+        "import importlib.util as u; "
+        f"s = u.spec_from_file_location('r', {ics_renderer.__file__!r}); "
+        "s.loader.exec_module(u.module_from_spec(s))"
+    )
+    for label, render, statement in [
+        ('ics.Calendar', render_with_ics, 'import ics'),
+        ('IcsRenderer', render_precompiled, renderer_import),
+    ]:
+        render()
+
+        def batch():
+            for _ in range(iterations):
+                render()
+
+        durations = timeit(batch, repeat=5)
+        per_message_us = min(durations) * 1000 / iterations
+        report(label, durations,
+               per_message=f"{per_message_us:.1f}us",
+               import_ms=f"{import_ms(statement):.1f}")
+
+
+if __name__ == '__main__':
+    main()
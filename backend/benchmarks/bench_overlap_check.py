@@ -0,0 +1,81 @@
+"""Benchmark the booking overlap check for users with long histories.
+
+Compares the previous implementation, which walked user.bookings and lazily
+loaded each booking's timeslots, with the single EXISTS query in
+TimeslotService._has_overlapping_timeslots.
+
+Usage (from backend/): python -m benchmarks.bench_overlap_check [bookings]
+"""
+from datetime import datetime, timedelta, timezone
+import sys
+from benchmarks.common import count_statements, make_app, report, timeit
+from src.models.booking import Booking, BookingStatus
+from src.models.timeslot import Timeslot
+from src.models.user import User
+from src.services.timeslot_service import TimeslotService
+from src import db
+
+
+def legacy_has_overlapping_timeslots(user, new_times):
+    new_timestamps = {t.timestamp() for t in new_times}
+
+    for booking in user.bookings:
+        if booking.status in [
+            BookingStatus.CANCELLED, BookingStatus.COMPLETED
+        ]:
+            continue
+
+        existing_timestamps = {
+            ts.start_time.replace(tzinfo=timezone.utc).timestamp()
+            for ts in booking.timeslots}
+        if new_timestamps.intersection(existing_timestamps):
+            return True
+    return False
+
+
+def seed(history):
+    user = User(email='regular@example.com', full_name='Regular Customer')
+    db.session.add(user)
+
+    start = datetime(2020, 1, 6, 8, 0, tzinfo=timezone.utc)
+    for i in range(history):
+        timeslot = Timeslot(start_time=start + timedelta(hours=i))
+        # mostly past bookings, with a few still active
+        status = (BookingStatus.BOOKED if i % 50 == 0
+                  else BookingStatus.COMPLETED)
+        booking = Booking(user=user, status=status)
+        booking.timeslots.append(timeslot)
+        db.session.add_all([timeslot, booking])
+    db.session.commit()
+    return user.id
+
+
+def main(history=5000):
+    app = make_app()
+    service = TimeslotService()
+    new_times = [datetime(2030, 1, 7, 10, 0, tzinfo=timezone.utc),
+                 datetime(2030, 1, 7, 11, 0, tzinfo=timezone.utc)]
+
+    with app.app_context():
+        db.create_all()
+        user_id = seed(history)
+        print(f"user with {history} past bookings")
+
+        for label, check in [
+            ('legacy (user.bookings)', legacy_has_overlapping_timeslots),
+            ('EXISTS query', service._has_overlapping_timeslots),
+        ]:
+            def run():
+                # fresh session per call, as in a real request
+                db.session.remove()
+                user = db.session.get(User, user_id)
+                assert check(user, new_times) is False
+
+            with count_statements() as statements:
+                run()
+            report(label, timeit(run, repeat=10),
+                   queries=len(statements))
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
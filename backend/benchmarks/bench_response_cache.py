@@ -0,0 +1,79 @@
+"""Benchmark first-message chat latency with and without the response cache.
+
+Each fake assistant run takes RUN_SECONDS. New users send a first message
+drawn from a small set of common questions, worded with varying case and
+punctuation, with a long tail of one-off messages. Reports latency per
+chat and the assistant runs started.
+
+Usage (from backend/):
+    python -m benchmarks.bench_response_cache [chats]
+"""
+from types import SimpleNamespace
+import random
+import sys
+import time
+from benchmarks.common import report
+from src.services.ai_service import AIService
+from src.services.response_cache import ResponseCache
+
+RUN_SECONDS = 0.05
+COMMON = [
+    "Is the cafe wheelchair accessible?",
+    "Do you have vegan food?",
+    "Can I pay with cash?",
+    "How much is a latte?",
+    "When are you open?",
+    "Can I bring my dog?",
+]
+
+
+def fake_client(counter):
+    def create_run(**kwargs):
+        counter['runs'] += 1
+        time.sleep(RUN_SECONDS)
+        return SimpleNamespace(id='run-1', status='completed')
+
+    reply = SimpleNamespace(data=[SimpleNamespace(content=[
+        SimpleNamespace(text=SimpleNamespace(value='Yes, of course'))])])
+    return SimpleNamespace(beta=SimpleNamespace(threads=SimpleNamespace(
+        create=lambda: SimpleNamespace(id='thread-1'),
+        messages=SimpleNamespace(
+            create=lambda **kwargs: None,
+            list=lambda **kwargs: reply
+        ),
+        runs=SimpleNamespace(create=create_run)
+    )))
+
+
+def messages(chats):
+    rng = random.Random(3)
+    for number in range(chats):
+        if rng.random() < 0.2:
+            yield f"Question number {number}"
+        else:
+            message = rng.choice(COMMON)
+            yield rng.choice([message, message.lower(), message.rstrip('?')])
+
+
+def main():
+    chats = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    print(f"{chats} first messages, fake runs take {RUN_SECONDS * 1000:.0f}ms")
+
+    for label, cache in [('no cache', None), ('response cache',
+                                              ResponseCache())]:
+        counter = {'runs': 0}
+        service = AIService()
+        service.client = fake_client(counter)
+        service.assistant = SimpleNamespace(id='asst_1')
+        service.response_cache = cache
+
+        durations = []
+        for user, message in enumerate(messages(chats)):
+            started = time.perf_counter()
+            service.get_ai_response(message, user_id=f"user-{user}")
+            durations.append((time.perf_counter() - started) * 1000)
+        report(label, durations, runs=counter['runs'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+"""Benchmark assistant response latency under different run polling.
+
+A fake OpenAI client simulates runs that take a random amount of time,
+optionally calling a function half way through. Each strategy answers the
+same set of runs concurrently. The mean/p50/p95 columns are polling
+overhead, how long after the run changed status the client noticed,
+followed by end-to-end latency and runs.retrieve calls per run.
+"fixed 1s" reproduces the previous time.sleep(1) loop.
+
+Usage (from backend/):
+    python -m benchmarks.bench_run_polling [runs]
+"""
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+import random
+import sys
+import threading
+import time
+from benchmarks.common import report
+from src.services.ai_service import AIService
+
+STRATEGIES = [
+    ('fixed 1s', {'initial_delay': 1.0, 'max_delay': 1.0, 'jitter': 0}),
+    ('adaptive', {'initial_delay': 0.2, 'max_delay': 0.5,
+                  'multiplier': 2.0, 'jitter': 0.2}),
+]
+
+
+class FakeRuns:
+    """Runs finish after a scripted duration of real time.
+
+    Runs with a tool call pause in requires_action after half their
+    duration and finish the remaining half after outputs are submitted.
+    """
+
+    def __init__(self, scripts):
+        self._scripts = scripts
+        self._runs = {}
+        self._lock = threading.Lock()
+        self.overheads = []
+
+    def create(self, thread_id, assistant_id, **kwargs):
+        duration, uses_tool = self._scripts[thread_id]
+        if uses_tool:
+            phases = [(duration / 2, 'requires_action'),
+                      (duration / 2, 'completed')]
+        else:
+            phases = [(duration, 'completed')]
+        with self._lock:
+            self._runs[thread_id] = {
+                'phases': phases,
+                'ready_at': time.perf_counter() + phases[0][0],
+                'overhead': 0.0
+            }
+        return self._status(thread_id, 'queued')
+
+    def retrieve(self, thread_id, run_id):
+        with self._lock:
+            state = self._runs[thread_id]
+            now = time.perf_counter()
+            if now < state['ready_at']:
+                return self._status(thread_id, 'in_progress')
+            # time between the run changing status and us noticing
+            state['overhead'] += now - state['ready_at']
+            status = state['phases'][0][1]
+            if status == 'completed':
+                self.overheads.append(state['overhead'])
+            return self._status(thread_id, status)
+
+    def submit_tool_outputs(self, thread_id, run_id, tool_outputs):
+        with self._lock:
+            state = self._runs[thread_id]
+            state['phases'].pop(0)
+            state['ready_at'] = time.perf_counter() + state['phases'][0][0]
+        return self._status(thread_id, 'queued')
+
+    def _status(self, thread_id, status):
+        tool_call = SimpleNamespace(
+            id='call_1',
+            function=SimpleNamespace(
+                name='get_videos', arguments='{"category": "menu"}')
+        )
+        return SimpleNamespace(
+            id=f"run-{thread_id}",
+            status=status,
+            required_action=SimpleNamespace(
+                submit_tool_outputs=SimpleNamespace(tool_calls=[tool_call]))
+        )
+
+
+def fake_client(scripts):
+    threads = iter(range(len(scripts)))
+    threads_lock = threading.Lock()
+
+    def create_thread():
+        with threads_lock:
+            return SimpleNamespace(id=next(threads))
+
+    reply = SimpleNamespace(data=[SimpleNamespace(content=[
+        SimpleNamespace(text=SimpleNamespace(value='ok'))])])
+    return SimpleNamespace(beta=SimpleNamespace(threads=SimpleNamespace(
+        create=create_thread,
+        messages=SimpleNamespace(
+            create=lambda **kwargs: None,
+            list=lambda **kwargs: reply
+        ),
+        runs=FakeRuns(scripts)
+    )))
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 60
+    rng = random.Random(7)
+    # model runs of 0.5-4s, a third of them calling a function
+    scripts = [(rng.uniform(0.5, 4.0), rng.random() < 1 / 3)
+               for _ in range(runs)]
+    print(f"{runs} concurrent runs of 0.5-4s, a third with a tool call")
+
+    for label, settings in STRATEGIES:
+        service = AIService()
+        service.client = fake_client(scripts)
+        service.assistant = SimpleNamespace(id='asst_1')
+        service.poll_settings = settings
+
+        with ThreadPoolExecutor(max_workers=runs) as pool:
+            list(pool.map(lambda _: service.get_ai_response('hi'),
+                          range(runs)))
+
+        stats = service.run_metrics.stats()
+        overheads = service.client.beta.threads.runs.overheads
+        report(label, [overhead * 1000 for overhead in overheads],
+               latency_p50=f"{stats['latency_p50']:.2f}s",
+               latency_p95=f"{stats['latency_p95']:.2f}s",
+               polls_per_run=f"{stats['polls_per_run']:.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""Benchmark confirmation email throughput against a local SMTP server.
+
+Compares sending each message with mail.send (a new SMTP session per
+message, the previous behaviour) with EmailService's PooledSender, which
+reuses one connection. An aiosmtpd server stands in for Gmail, with an
+optional delay on EHLO to approximate the network and TLS handshake.
+
+Requires aiosmtpd (see requirements.txt).
+
+Usage (from backend/):
+    python -m benchmarks.bench_smtp_sending [messages] [handshake_ms]
+"""
+import asyncio
+import socket
+import sys
+import time
+from aiosmtpd.controller import Controller
+from aiosmtpd.handlers import Sink
+from benchmarks.common import make_app
+from src.services.email_service import EmailService
+from src import mail
+
+
+class SlowHandshakeSink(Sink):
+    def __init__(self, handshake_ms):
+        self.handshake_ms = handshake_ms
+        self.sessions = 0
+
+    async def handle_EHLO(self, server, session, envelope, hostname,
+                          responses):
+        self.sessions += 1
+        await asyncio.sleep(self.handshake_ms / 1000)
+        session.host_name = hostname
+        return responses
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def main(messages=200, handshake_ms=20):
+    port = free_port()
+    handler = SlowHandshakeSink(handshake_ms)
+    controller = Controller(handler, hostname='127.0.0.1', port=port)
+    controller.start()
+
+    app = make_app()
+    app.config.update(
+        MAIL_SERVER='127.0.0.1',
+        MAIL_PORT=port,
+        MAIL_USE_TLS=False,
+        MAIL_USERNAME='cafe@example.com',
+        MAIL_MAX_EMAILS=50
+    )
+    mail.init_app(app)
+    email_service = EmailService()
+
+    try:
+        with app.app_context():
+            outbox = [
+                email_service.build_confirmation(
+                    f'customer{i}@example.com', '2030-01-07',
+                    {'start': '10:00', 'end': '11:00'})
+                for i in range(messages)
+            ]
+            print(f"{messages} messages, {handshake_ms}ms handshake, "
+                  f"MAIL_MAX_EMAILS={app.config['MAIL_MAX_EMAILS']}")
+
+            def send_each():
+                for msg in outbox:
+                    mail.send(msg)
+
+            def send_pooled():
+                with email_service.pooled_sender() as sender:
+                    for msg in outbox:
+                        sender.send(msg)
+
+            for label, send in [('mail.send per message', send_each),
+                                ('PooledSender', send_pooled)]:
+                handler.sessions = 0
+                start = time.perf_counter()
+                send()
+                report(label, messages, time.perf_counter() - start,
+                       handler.sessions)
+    finally:
+        controller.stop()
+
+
+def report(label, messages, elapsed, sessions):
+    print(f"{label:<24}  {messages / elapsed:8.1f} msg/s  "
+          f"total={elapsed:6.2f}s  smtp_sessions={sessions}")
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,61 @@
+"""Shared helpers for the backend benchmarks.
+
+Benchmarks build a minimal app with only the database extension so they
+run offline without Azure credentials.
+"""
+from contextlib import contextmanager
+from flask import Flask
+from sqlalchemy import event
+import statistics
+import time
+from src import db
+
+
+def make_app(database_uri='sqlite:///:memory:'):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_uri
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    return app
+
+
+@contextmanager
+def count_statements():
+    """collect SQL statements executed inside the block"""
+    statements = []
+
+    def on_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', on_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', on_execute)
+
+
+def timeit(func, repeat=20):
+    """run func repeat times and return per-call durations in ms"""
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append((time.perf_counter() - start) * 1000)
+    return durations
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))
+    return ordered[index]
+
+
+def report(label, durations, **extra):
+    columns = [
+        f"{label:<24}",
+        f"mean={statistics.mean(durations):8.2f}ms",
+        f"p50={percentile(durations, 50):8.2f}ms",
+        f"p95={percentile(durations, 95):8.2f}ms",
+    ]
+    columns += [f"{key}={value}" for key, value in extra.items()]
+    print("  ".join(columns))
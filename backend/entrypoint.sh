@@ -1,5 +1,8 @@
 #!/bin/sh
 # Run database migrations before starting the app
 flask db upgrade
-# Start the Flask app
-exec flask run --host=0.0.0.0 --port=5001
\ No newline at end of file
+# Start the app, the chat endpoint is served on the ASGI event loop
+if [ "$FLASK_DEBUG" = "1" ]; then
+  RELOAD="--reload"
+fi
+exec uvicorn asgi:application --host=0.0.0.0 --port=5001 $RELOAD
@@ -0,0 +1,36 @@
+"""Add booked_count to timeslots
+
+Revision ID: 3b1f6c2d9a47
+Revises: fdc900b76065
+Create Date: 2026-10-18 10:12:41.208317
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3b1f6c2d9a47'
+down_revision = 'fdc900b76065'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('timeslots', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('booked_count', sa.Integer(),
+                                      server_default='0', nullable=False))
+
+    # backfill counters from existing active bookings
+    op.execute(
+        "UPDATE timeslots SET booked_count = ("
+        "SELECT COUNT(*) FROM booking_timeslot "
+        "JOIN bookings ON bookings.id = booking_timeslot.booking_id "
+        "WHERE booking_timeslot.timeslot_id = timeslots.id "
+        "AND bookings.status = 'BOOKED')"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('timeslots', schema=None) as batch_op:
+        batch_op.drop_column('booked_count')
@@ -0,0 +1,59 @@
+"""Add assistant run usage
+
+Revision ID: 57c2bd8cbc0f
+Revises: c5b37f6ec0ce
+Create Date: 2026-10-18 10:55:27.198897
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '57c2bd8cbc0f'
+down_revision = 'c5b37f6ec0ce'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('assistant_run',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('run_id', sa.String(length=100), nullable=True),
+    sa.Column('thread_id', sa.String(length=100), nullable=True),
+    sa.Column('user_id', sa.String(length=255), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('prompt_tokens', sa.Integer(), nullable=True),
+    sa.Column('completion_tokens', sa.Integer(), nullable=True),
+    sa.Column('total_tokens', sa.Integer(), nullable=True),
+    sa.Column('wall_time', sa.Float(), nullable=False),
+    sa.Column('polls', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('assistant_run', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_assistant_run_created_at'), ['created_at'], unique=False)
+        batch_op.create_index(batch_op.f('ix_assistant_run_user_id'), ['user_id'], unique=False)
+
+    op.create_table('assistant_tool_call',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('assistant_run_id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('duration', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['assistant_run_id'], ['assistant_run.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('assistant_tool_call', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_assistant_tool_call_assistant_run_id'), ['assistant_run_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('assistant_tool_call', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_assistant_tool_call_assistant_run_id'))
+
+    op.drop_table('assistant_tool_call')
+    with op.batch_alter_table('assistant_run', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_assistant_run_user_id'))
+        batch_op.drop_index(batch_op.f('ix_assistant_run_created_at'))
+
+    op.drop_table('assistant_run')
@@ -0,0 +1,27 @@
+"""Add capacity to timeslots
+
+Revision ID: 8e4a2f71c3d5
+Revises: 3b1f6c2d9a47
+Create Date: 2026-10-18 11:03:27.551904
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8e4a2f71c3d5'
+down_revision = '3b1f6c2d9a47'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('timeslots', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('capacity', sa.Integer(),
+                                      server_default='3', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('timeslots', schema=None) as batch_op:
+        batch_op.drop_column('capacity')
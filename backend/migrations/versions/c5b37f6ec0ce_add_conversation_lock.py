@@ -0,0 +1,29 @@
+"""Add conversation lock
+
+Revision ID: c5b37f6ec0ce
+Revises: dcf6cf253643
+Create Date: 2026-10-18 10:51:21.442604
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5b37f6ec0ce'
+down_revision = 'dcf6cf253643'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('conversation_lock',
+    sa.Column('conversation_key', sa.String(length=255), nullable=False),
+    sa.Column('owner', sa.String(length=32), nullable=False),
+    sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('conversation_key')
+    )
+
+
+def downgrade():
+    op.drop_table('conversation_lock')
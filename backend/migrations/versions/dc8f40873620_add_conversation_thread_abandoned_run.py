@@ -0,0 +1,26 @@
+"""Add conversation thread abandoned run
+
+Revision ID: dc8f40873620
+Revises: 57c2bd8cbc0f
+Create Date: 2026-10-18 11:17:22.283027
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'dc8f40873620'
+down_revision = '57c2bd8cbc0f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('conversation_thread', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('abandoned_run_id', sa.String(length=100), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('conversation_thread', schema=None) as batch_op:
+        batch_op.drop_column('abandoned_run_id')
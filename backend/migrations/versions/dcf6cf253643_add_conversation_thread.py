@@ -0,0 +1,34 @@
+"""Add conversation thread
+
+Revision ID: dcf6cf253643
+Revises: c57d0e9b2a16
+Create Date: 2026-10-18 10:35:38.055046
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'dcf6cf253643'
+down_revision = 'c57d0e9b2a16'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('conversation_thread',
+    sa.Column('user_id', sa.String(length=255), nullable=False),
+    sa.Column('thread_id', sa.String(length=100), nullable=False),
+    sa.Column('last_used_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+    with op.batch_alter_table('conversation_thread', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_conversation_thread_last_used_at'), ['last_used_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('conversation_thread', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_conversation_thread_last_used_at'))
+
+    op.drop_table('conversation_thread')
@@ -0,0 +1,34 @@
+"""Add conversation thread pending messages
+
+Revision ID: ec19d2bf9f25
+Revises: dc8f40873620
+Create Date: 2026-10-18 11:36:14.453510
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'ec19d2bf9f25'
+down_revision = 'dc8f40873620'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('conversation_thread', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('pending_messages', sa.JSON(), nullable=True))
+        batch_op.alter_column('thread_id',
+               existing_type=sa.VARCHAR(length=100),
+               nullable=True)
+
+
+def downgrade():
+    # users whose replies all came without a run have no thread yet
+    op.execute("DELETE FROM conversation_thread WHERE thread_id IS NULL")
+    with op.batch_alter_table('conversation_thread', schema=None) as batch_op:
+        batch_op.alter_column('thread_id',
+               existing_type=sa.VARCHAR(length=100),
+               nullable=False)
+        batch_op.drop_column('pending_messages')
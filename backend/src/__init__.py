@@ -2,8 +2,12 @@ from flask_migrate import Migrate
 from flask_sqlalchemy import SQLAlchemy
 from flask_mail import Mail
 from .services.ai_service import AIService
+from .services.availability_cache import AvailabilityCache
+from .services.email_dispatcher import EmailDispatcher
 
 db = SQLAlchemy()
 migrate = Migrate()
 mail = Mail()
 ai_service = AIService()
+availability_cache = AvailabilityCache()
+email_dispatcher = EmailDispatcher()
@@ -0,0 +1,106 @@
+from a2wsgi import WSGIMiddleware
+from src.services.conversation_queue import ConversationBusy
+import json
+import os
+
+CHAT_PATH = '/api/ai/chat'
+
+
+class AsyncChatApp:
+    """ASGI application serving the chat endpoint on the event loop.
+
+    POST /api/ai/chat awaits AIService.get_ai_response_async, so a chat
+    waiting on the assistant holds no thread. Every other request is passed
+    to the Flask app on a pool of WSGI_WORKERS threads, so a slow route such
+    as the streaming chat endpoint doesn't hold up the rest.
+    """
+
+    def __init__(self, flask_app, origins=None):
+        self.flask_app = flask_app
+        self.wsgi = WSGIMiddleware(
+            flask_app, workers=flask_app.config.get('WSGI_WORKERS', 10))
+        if origins is None:
+            origins = [os.getenv('FRONTEND_URL', 'http://localhost:3000')]
+        self.origins = origins
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif (scope['type'] == 'http' and scope['path'] == CHAT_PATH
+                and scope['method'] == 'POST'):
+            await self._chat(scope, receive, send)
+        else:
+            await self.wsgi(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _chat(self, scope, receive, send):
+        from src import ai_service
+
+        try:
+            data = json.loads(await self._read_body(receive))
+            user_message = data.get('message')
+            user_id = data.get('user_id')
+
+            if not user_message:
+                return await self._respond(
+                    scope, send, 400, {'error': 'No message provided'})
+
+            with self.flask_app.app_context():
+                ai_response = await ai_service.get_ai_response_async(
+                    user_message, user_id)
+
+            await self._respond(scope, send, 200, {
+                'response': ai_response,
+                'success': True
+            })
+
+        except ConversationBusy as e:
+            await self._respond(scope, send, 429, {
+                'error': str(e),
+                'success': False
+            })
+
+        except Exception as e:
+            await self._respond(scope, send, 500, {
+                'error': str(e),
+                'success': False
+            })
+
+    async def _read_body(self, receive):
+        body = b''
+        while True:
+            message = await receive()
+            body += message.get('body', b'')
+            if not message.get('more_body'):
+                return body
+
+    async def _respond(self, scope, send, status, payload):
+        body = json.dumps(payload).encode()
+        headers = [
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(body)).encode())
+        ]
+        origin = dict(scope['headers']).get(b'origin', b'').decode()
+        if origin in self.origins:
+            headers += [
+                (b'access-control-allow-origin', origin.encode()),
+                (b'vary', b'Origin')
+            ]
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': headers
+        })
+        await send({'type': 'http.response.body', 'body': body})
+
+
+def create_asgi_app(flask_app, origins=None):
+    return AsyncChatApp(flask_app, origins)
@@ -0,0 +1,18 @@
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from src.services.thread_registry import DatabaseThreadRegistry
+
+ai_cli = AppGroup('ai', help='AI assistant maintenance commands.')
+
+
+@ai_cli.command('purge-threads')
+@click.option('--ttl', type=int, default=None,
+              help='Idle seconds before a thread expires '
+                   '(defaults to AI_THREAD_TTL).')
+def purge_threads(ttl):
+    """Delete conversation threads that have been idle longer than the TTL"""
+    if ttl is None:
+        ttl = current_app.config.get('AI_THREAD_TTL', 86400)
+    removed = DatabaseThreadRegistry(ttl=ttl).purge_expired()
+    click.echo(f'Removed {removed} expired conversation threads.')
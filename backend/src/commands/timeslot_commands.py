@@ -0,0 +1,58 @@
+import click
+from flask.cli import AppGroup
+from src.services.timeslot_service import TimeslotService
+from src import db, availability_cache
+
+timeslot_cli = AppGroup('timeslots', help='Timeslot maintenance commands.')
+timeslot_service = TimeslotService()
+
+
+@timeslot_cli.command('check-counts')
+@click.option('--fix', is_flag=True,
+              help='Overwrite drifted counters with the recomputed value.')
+def check_counts(fix):
+    """Recompute booked_count for every timeslot and report any drift"""
+    drift = timeslot_service.get_booked_count_drift()
+
+    if not drift:
+        click.echo('All timeslot counters are consistent.')
+        return
+
+    for timeslot, stored, actual in drift:
+        click.echo(
+            f'{timeslot.start_time.isoformat()}: '
+            f'stored={stored} actual={actual}'
+        )
+        if fix:
+            timeslot.booked_count = actual
+
+    if fix:
+        db.session.commit()
+        click.echo(f'Fixed {len(drift)} timeslot counter(s).')
+    else:
+        raise click.ClickException(
+            f'{len(drift)} timeslot counter(s) drifted, '
+            'rerun with --fix to repair.')
+
+
+@timeslot_cli.command('set-capacity')
+@click.argument('start_time')
+@click.argument('capacity', type=click.IntRange(min=0))
+def set_capacity(start_time, capacity):
+    """Set the booking capacity of the timeslot starting at START_TIME"""
+    try:
+        start_time = timeslot_service.get_start_times(
+            [{'start_time': start_time}])[0]
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint='START_TIME')
+
+    timeslot = timeslot_service.get_or_create_timeslot(start_time)
+    if timeslot.booked_count > capacity:
+        click.echo(
+            f'Warning: timeslot already has {timeslot.booked_count} '
+            'active bookings.')
+
+    timeslot.capacity = capacity
+    availability_cache.invalidate_on_commit(db.session, [start_time])
+    db.session.commit()
+    click.echo(f'Set capacity of {start_time.isoformat()} to {capacity}.')
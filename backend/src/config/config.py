@@ -7,12 +7,31 @@ load_dotenv()
 class Config:
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # threads serving the Flask routes under uvicorn, every route but the
+    # async chat endpoint (including the streaming one) takes one while busy
+    WSGI_WORKERS = int(os.getenv('WSGI_WORKERS', 10))
+
+    # Availability cache configuration
+    AVAILABILITY_CACHE_TTL = int(os.getenv('AVAILABILITY_CACHE_TTL', 300))
+    AVAILABILITY_CACHE_MAX_DAYS = int(
+        os.getenv('AVAILABILITY_CACHE_MAX_DAYS', 366))
+
     # Email configuration
     MAIL_SERVER = 'smtp.gmail.com'
     MAIL_PORT = 587
     MAIL_USE_TLS = True
     MAIL_USERNAME = os.getenv('SENDER_EMAIL')
     MAIL_PASSWORD = os.getenv('SENDER_PASSWORD')
+    # messages sent over one SMTP connection before it is recycled
+    MAIL_MAX_EMAILS = int(os.getenv('MAIL_MAX_EMAILS', 50))
+
+    # Email outbox dispatcher (retry delays in seconds)
+    EMAIL_OUTBOX_DISPATCH = True
+    EMAIL_OUTBOX_POLL_INTERVAL = 30
+    EMAIL_OUTBOX_BATCH_SIZE = 10
+    EMAIL_OUTBOX_MAX_ATTEMPTS = 5
+    EMAIL_OUTBOX_BACKOFF = 30
+    EMAIL_OUTBOX_MAX_BACKOFF = 3600
 
     # Azure OpenAI configuration
     KEY_VAULT_NAME = os.getenv('KEY_VAULT_NAME')
@@ -21,6 +40,91 @@ class Config:
     DEPLOYMENT_NAME = os.getenv('DEPLOYMENT_NAME')
     AZURE_ASSISTANT_ID = os.getenv('AZURE_ASSISTANT_ID')
 
+    # Where secrets such as the OpenAI key come from: 'keyvault', 'env'
+    # (OPENAI_API_SECRET_NAME 'openai-api-key' is read from OPENAI_API_KEY)
+    # or 'file' (JSON object of name -> value at SECRET_FILE). Secrets are
+    # cached for SECRET_CACHE_TTL seconds (0 disables the cache) and
+    # refreshed in the background SECRET_REFRESH_AHEAD seconds (at most half
+    # the TTL) before they expire, so a rotated key is picked up without a
+    # restart. DevelopmentConfig defaults to 'env'
+    SECRET_PROVIDER = os.getenv('SECRET_PROVIDER', 'keyvault')
+    SECRET_FILE = os.getenv('SECRET_FILE', 'secrets.json')
+    SECRET_CACHE_TTL = int(os.getenv('SECRET_CACHE_TTL', 900))
+    SECRET_REFRESH_AHEAD = int(os.getenv('SECRET_REFRESH_AHEAD', 120))
+    SECRET_RETRY_INTERVAL = 30
+
+    # Assistant run polling (delays in seconds)
+    AI_POLL_INITIAL_DELAY = 0.2
+    AI_POLL_MAX_DELAY = 0.5
+    AI_POLL_MULTIPLIER = 2.0
+    AI_POLL_JITTER = 0.2
+    # seconds a chat request may spend on its run (polling and tool calls)
+    # before the run is cancelled, and how long to wait for it to stop
+    AI_RUN_TIMEOUT = int(os.getenv('AI_RUN_TIMEOUT', 30))
+    AI_RUN_CANCEL_TIMEOUT = int(os.getenv('AI_RUN_CANCEL_TIMEOUT', 5))
+    # threads running read-only tool calls from one run concurrently
+    AI_TOOL_WORKERS = 4
+    # seconds to wait for any single Azure OpenAI HTTP response
+    AI_HTTP_TIMEOUT = int(os.getenv('AI_HTTP_TIMEOUT', 20))
+
+    # Circuit breaker around assistant runs. It opens when
+    # AI_CIRCUIT_FAILURE_RATE of the last AI_CIRCUIT_WINDOW runs failed, or
+    # AI_CIRCUIT_SLOW_RATE of them took AI_CIRCUIT_SLOW_SECONDS or longer.
+    # While open, chat answers straight away with the closest FAQ answers
+    # and a link to BOOKING_URL. After AI_CIRCUIT_OPEN_SECONDS it lets
+    # AI_CIRCUIT_PROBES runs through and closes again if they succeed
+    AI_CIRCUIT_WINDOW = 20
+    AI_CIRCUIT_MIN_CALLS = 5
+    AI_CIRCUIT_FAILURE_RATE = 0.5
+    AI_CIRCUIT_SLOW_SECONDS = 15
+    AI_CIRCUIT_SLOW_RATE = 0.5
+    AI_CIRCUIT_OPEN_SECONDS = int(os.getenv('AI_CIRCUIT_OPEN_SECONDS', 30))
+    AI_CIRCUIT_PROBES = 1
+    BOOKING_URL = os.getenv(
+        'BOOKING_URL',
+        os.getenv('FRONTEND_URL', 'http://localhost:3000') + '/book')
+
+    # Where users' assistant threads are remembered: 'memory' (per process)
+    # or 'database' (shared by every worker), idle entries expire after TTL
+    AI_THREAD_REGISTRY = os.getenv('AI_THREAD_REGISTRY', 'memory')
+    AI_THREAD_TTL = int(os.getenv('AI_THREAD_TTL', 86400))
+    AI_THREAD_MAX_ENTRIES = int(os.getenv('AI_THREAD_MAX_ENTRIES', 10000))
+
+    # One run at a time per conversation: 'local' (per process) or
+    # 'database' (lease shared by every worker). Messages sent while a run
+    # is in flight are answered together by the next run, at most
+    # AI_CONVERSATION_MAX_PENDING of them
+    AI_CONVERSATION_LOCK = os.getenv('AI_CONVERSATION_LOCK', 'local')
+    AI_CONVERSATION_LOCK_LEASE = int(
+        os.getenv('AI_CONVERSATION_LOCK_LEASE', 60))
+    AI_CONVERSATION_MAX_PENDING = int(
+        os.getenv('AI_CONVERSATION_MAX_PENDING', 5))
+
+    # Answer close matches to FAQ questions locally instead of running the
+    # assistant, scores are TF-IDF cosine similarity between 0 and 1
+    AI_FAQ_ENABLED = os.getenv('AI_FAQ_ENABLED', 'true').lower() == 'true'
+    AI_FAQ_MIN_SCORE = float(os.getenv('AI_FAQ_MIN_SCORE', 0.5))
+    AI_FAQ_MIN_MARGIN = float(os.getenv('AI_FAQ_MIN_MARGIN', 0.15))
+
+    # Reuse assistant replies to identical first messages that needed no
+    # tool calls (TTL in seconds)
+    AI_RESPONSE_CACHE_ENABLED = os.getenv(
+        'AI_RESPONSE_CACHE_ENABLED', 'true').lower() == 'true'
+    AI_RESPONSE_CACHE_TTL = int(os.getenv('AI_RESPONSE_CACHE_TTL', 3600))
+    AI_RESPONSE_CACHE_MAX_ENTRIES = int(
+        os.getenv('AI_RESPONSE_CACHE_MAX_ENTRIES', 1000))
+
+    # Token usage, wall time and tool call durations of every assistant run,
+    # written to the assistant_run table by a background thread in batches.
+    # Costs are per 1000 tokens and only used by /api/ai/metrics
+    AI_USAGE_ENABLED = os.getenv('AI_USAGE_ENABLED', 'true').lower() == 'true'
+    AI_USAGE_WRITER = True
+    AI_USAGE_BATCH_SIZE = 100
+    AI_USAGE_FLUSH_INTERVAL = 5
+    AI_USAGE_MAX_QUEUE = 10000
+    AI_PROMPT_TOKEN_COST = float(os.getenv('AI_PROMPT_TOKEN_COST', 0))
+    AI_COMPLETION_TOKEN_COST = float(os.getenv('AI_COMPLETION_TOKEN_COST', 0))
+
 
 class ProductionConfig(Config):
     SQLALCHEMY_DATABASE_URI = (
@@ -32,9 +136,13 @@ class ProductionConfig(Config):
         )
     )
     PORT = int(os.getenv('PORT', 5000))
+    AI_THREAD_REGISTRY = os.getenv('AI_THREAD_REGISTRY', 'database')
+    AI_CONVERSATION_LOCK = os.getenv('AI_CONVERSATION_LOCK', 'database')
 
 
 class DevelopmentConfig(Config):
     SQLALCHEMY_DATABASE_URI = 'sqlite:///local.db'
     DEBUG = True
     PORT = int(os.getenv('PORT', 5001))
+    # the key vault is opt-in locally, it needs `az login` first
+    SECRET_PROVIDER = os.getenv('SECRET_PROVIDER', 'env')
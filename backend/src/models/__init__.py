@@ -0,0 +1,15 @@
+# every model is imported here so importing any one of them registers all
+# the tables for create_all and migrations
+from src.models.assistant_run import AssistantRun, AssistantToolCall
+from src.models.booking import Booking, BookingStatus
+from src.models.conversation_lease import ConversationLease
+from src.models.conversation_thread import ConversationThread
+from src.models.email_outbox import OutboxEmail, OutboxStatus
+from src.models.timeslot import Timeslot
+from src.models.user import User
+
+__all__ = [
+    'AssistantRun', 'AssistantToolCall', 'Booking', 'BookingStatus',
+    'ConversationLease', 'ConversationThread', 'OutboxEmail', 'OutboxStatus',
+    'Timeslot', 'User'
+]
@@ -0,0 +1,46 @@
+from datetime import datetime, timezone
+from src import db
+
+
+class AssistantRun(db.Model):
+    """token usage and timing of one assistant run"""
+    __tablename__ = 'assistant_run'
+
+    id = db.Column(db.Integer, primary_key=True)
+    run_id = db.Column(db.String(100))
+    thread_id = db.Column(db.String(100))
+    user_id = db.Column(db.String(255), index=True)
+    status = db.Column(db.String(20), nullable=False)
+
+    # None when the run ended without reporting usage, e.g. on a timeout
+    prompt_tokens = db.Column(db.Integer)
+    completion_tokens = db.Column(db.Integer)
+    total_tokens = db.Column(db.Integer)
+
+    wall_time = db.Column(db.Float, nullable=False)
+    # None for streamed runs, which are never polled
+    polls = db.Column(db.Integer)
+    created_at = db.Column(
+        db.DateTime(timezone=True), nullable=False,
+        default=lambda: datetime.now(timezone.utc), index=True)
+
+    tool_calls = db.relationship(
+        'AssistantToolCall', backref='run', cascade='all, delete-orphan',
+        passive_deletes=True)
+
+    def __repr__(self):
+        return f'<AssistantRun {self.run_id} {self.status}>'
+
+
+class AssistantToolCall(db.Model):
+    """a function call made during an assistant run and how long it took"""
+    __tablename__ = 'assistant_tool_call'
+
+    id = db.Column(db.Integer, primary_key=True)
+    assistant_run_id = db.Column(db.Integer, db.ForeignKey(
+        'assistant_run.id', ondelete='CASCADE'), nullable=False, index=True)
+    name = db.Column(db.String(100), nullable=False)
+    duration = db.Column(db.Float, nullable=False)
+
+    def __repr__(self):
+        return f'<AssistantToolCall {self.name} {self.duration:.3f}s>'
@@ -1,6 +1,7 @@
 from datetime import datetime, timezone
 from enum import Enum
-from src import db
+from src import db, availability_cache
+from src.models.timeslot import Timeslot
 
 # many-to-many relationship between bookings and timeslots
 booking_timeslot = db.Table(
@@ -61,11 +62,22 @@ class Booking(db.Model):
         return f'<Booking {self.id} {self.status.value}>'
 
     def cancel(self):
+        self._release_timeslots()
         self.status = BookingStatus.CANCELLED
 
     def complete(self):
+        self._release_timeslots()
         self.status = BookingStatus.COMPLETED
 
+    def _release_timeslots(self):
+        """decrement timeslot counters when leaving the booked state"""
+        if self.status != BookingStatus.BOOKED:
+            return
+        for timeslot in self.timeslots:
+            timeslot.booked_count = Timeslot.booked_count - 1
+        availability_cache.invalidate_on_commit(
+            db.session, [ts.start_time for ts in self.timeslots])
+
     def to_dict(self):
         return {
             "id": self.id,
@@ -0,0 +1,13 @@
+from src import db
+
+
+class ConversationLease(db.Model):
+    """lease held by the worker running an assistant run for a conversation"""
+    __tablename__ = 'conversation_lock'
+
+    conversation_key = db.Column(db.String(255), primary_key=True)
+    owner = db.Column(db.String(32), nullable=False)
+    expires_at = db.Column(db.DateTime(timezone=True), nullable=False)
+
+    def __repr__(self):
+        return f'<ConversationLease {self.conversation_key} {self.owner}>'
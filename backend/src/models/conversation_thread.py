@@ -0,0 +1,22 @@
+from datetime import datetime, timezone
+from src import db
+
+
+class ConversationThread(db.Model):
+    """assistant thread a user's chat continues on, shared by all workers"""
+    __tablename__ = 'conversation_thread'
+
+    user_id = db.Column(db.String(255), primary_key=True)
+    # None until the user's first run, replies given without a run wait
+    # in pending_messages to be posted to the thread it starts
+    thread_id = db.Column(db.String(100))
+    # a run on the thread that was cancelled but not yet seen to stop, the
+    # thread rejects new messages until it has
+    abandoned_run_id = db.Column(db.String(100))
+    pending_messages = db.Column(db.JSON)
+    last_used_at = db.Column(
+        db.DateTime(timezone=True), nullable=False,
+        default=lambda: datetime.now(timezone.utc), index=True)
+
+    def __repr__(self):
+        return f'<ConversationThread {self.user_id} {self.thread_id}>'
@@ -0,0 +1,38 @@
+from datetime import datetime, timezone
+from enum import Enum
+from src import db
+
+
+class OutboxStatus(Enum):
+    PENDING = 'pending'
+    SENT = 'sent'
+    FAILED = 'failed'
+
+
+class OutboxEmail(db.Model):
+    """email waiting to be sent by the background dispatcher, written in the
+    same transaction as the change that triggered it"""
+    __tablename__ = 'email_outbox'
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    payload = db.Column(db.JSON, nullable=False)
+
+    status = db.Column(db.Enum(OutboxStatus), nullable=False,
+                       default=OutboxStatus.PENDING)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(
+        db.DateTime(timezone=True), nullable=False,
+        default=lambda: datetime.now(timezone.utc))
+    last_error = db.Column(db.String(500))
+    created_at = db.Column(
+        db.DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc))
+    sent_at = db.Column(db.DateTime(timezone=True))
+
+    __table_args__ = (
+        db.Index('idx_email_outbox_due', 'status', 'next_attempt_at'),
+    )
+
+    def __repr__(self):
+        return f'<OutboxEmail {self.id} {self.kind} {self.status.value}>'
@@ -1,6 +1,8 @@
 from datetime import datetime, timezone, timedelta
 from src import db
 
+MAX_BOOKINGS_PER_TIMESLOT = 3
+
 
 class Timeslot(db.Model):
     __tablename__ = 'timeslots'
@@ -12,9 +14,19 @@ class Timeslot(db.Model):
     start_time = db.Column(db.DateTime(timezone=True),
                            nullable=False, unique=True)
 
+    # number of active (booked) bookings, maintained alongside booking
+    # writes so availability reads don't need to join bookings
+    booked_count = db.Column(db.Integer, nullable=False,
+                             default=0, server_default='0')
+
+    # maximum number of active bookings allowed in this timeslot
+    capacity = db.Column(db.Integer, nullable=False,
+                         default=MAX_BOOKINGS_PER_TIMESLOT,
+                         server_default=str(MAX_BOOKINGS_PER_TIMESLOT))
+
     @property
-    def booking_count(self):
-        return self.bookings.count()
+    def is_full(self):
+        return self.booked_count >= self.capacity
 
     @property
     def end_time(self):
@@ -1,7 +1,12 @@
-from flask import Blueprint, jsonify, request
+from flask import (Blueprint, Response, current_app, jsonify, request,
+                   stream_with_context)
 from src import ai_service
+from src.services.conversation_queue import ConversationBusy
+from src.services.usage_service import UsageService
+import json
 
 ai_bp = Blueprint('ai', __name__)
+usage_service = UsageService()
 
 
 @ai_bp.route('/chat', methods=['POST'])
@@ -21,8 +26,123 @@ def chat():
             'success': True
         })
 
+    except ConversationBusy as e:
+        return jsonify({
+            'error': str(e),
+            'success': False
+        }), 429
+
+    except Exception as e:
+        return jsonify({
+            'error': str(e),
+            'success': False
+        }), 500
+
+
+@ai_bp.route('/threads', methods=['GET'])
+def get_thread_registry_stats():
+    """Get conversation thread registry size and hit/miss/eviction counters"""
+    return jsonify({
+        'status': 'success',
+        'data': ai_service.thread_registry.stats()
+    }), 200
+
+
+@ai_bp.route('/faq', methods=['GET'])
+def get_faq_stats():
+    """Get how many chat messages were answered from the FAQ index"""
+    if ai_service.faq_index is None:
+        data = {'enabled': False}
+    else:
+        data = {'enabled': True, **ai_service.faq_index.stats()}
+    return jsonify({
+        'status': 'success',
+        'data': data
+    }), 200
+
+
+@ai_bp.route('/cache', methods=['GET'])
+def get_response_cache_stats():
+    """Get response cache size and hit/miss/store counters"""
+    if ai_service.response_cache is None:
+        data = {'enabled': False}
+    else:
+        data = {'enabled': True, **ai_service.response_cache.stats()}
+    return jsonify({
+        'status': 'success',
+        'data': data
+    }), 200
+
+
+@ai_bp.route('/circuit', methods=['GET'])
+def get_circuit_breaker_stats():
+    """Get whether chat is answered by the assistant or in degraded mode,
+    and the recent failure and slow run rates"""
+    return jsonify({
+        'status': 'success',
+        'data': ai_service.circuit_breaker.stats()
+    }), 200
+
+
+@ai_bp.route('/metrics', methods=['GET'])
+def get_usage_metrics():
+    """Get token usage, cost and timings of assistant runs per day, tool
+    and user over the last `days` days (default 7)"""
+    days = request.args.get('days', 7, type=int)
+    if days < 1:
+        return jsonify({
+            'status': 'error',
+            'code': 'INVALID_DAYS',
+            'message': 'days must be a positive number'
+        }), 400
+
+    data = usage_service.get_usage_summary(
+        days=days,
+        prompt_cost=current_app.config.get('AI_PROMPT_TOKEN_COST', 0),
+        completion_cost=current_app.config.get('AI_COMPLETION_TOKEN_COST', 0)
+    )
+    data['runs'] = ai_service.run_metrics.stats()
+    data['recorder'] = ai_service.usage_recorder.stats()
+    return jsonify({
+        'status': 'success',
+        'data': data
+    }), 200
+
+
+def _sse(event, data):
+    """format one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@ai_bp.route('/chat/stream', methods=['POST'])
+def chat_stream():
+    try:
+        data = request.get_json()
+        user_message = data.get('message')
+        user_id = data.get('user_id')
     except Exception as e:
         return jsonify({
             'error': str(e),
             'success': False
         }), 500
+
+    if not user_message:
+        return jsonify({'error': 'No message provided'}), 400
+
+    def generate():
+        try:
+            for event, payload in ai_service.stream_ai_response(
+                    user_message, user_id):
+                yield _sse(event, payload)
+        except Exception as e:
+            yield _sse('error', {'error': str(e), 'success': False})
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            # stop reverse proxies from buffering the stream
+            'X-Accel-Buffering': 'no'
+        }
+    )
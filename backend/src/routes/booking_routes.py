@@ -1,25 +1,20 @@
-from src.services.email_service import EmailService
 from src.services.booking_service import BookingService
 from flask import Blueprint, request, jsonify
+from src import email_dispatcher
 
 booking_bp = Blueprint('booking', __name__)
 booking_service = BookingService()
-email_service = EmailService()
 
 
 def create_booking_internal(data):
     if not data:
         raise ValueError("Missing booking data")
 
-    # Create the booking
+    # Create the booking, its confirmation email is queued in the outbox
     booking = booking_service.create_booking(data)
 
-    # Send confirmation email
-    email_service.send_confirmation(
-        email=booking.user.email,
-        booking_date=booking.date,
-        booking_time=booking.time_range
-    )
+    # Wake the dispatcher to send the confirmation email
+    email_dispatcher.notify()
 
     return booking
 
@@ -50,10 +45,8 @@ def create_booking():
             'message': str(e)
         }), 400
     except Exception as e:
-        error_code = 'EMAIL_ERROR' if 'confirmation email' in str(
-            e) else 'SERVER_ERROR'
         return jsonify({
             'status': 'error',
-            'code': error_code,
+            'code': 'SERVER_ERROR',
             'message': str(e)
         }), 500
@@ -1,21 +1,82 @@
 from flask import Blueprint, request, jsonify
-from datetime import datetime
-from src.models.timeslot import Timeslot
+from datetime import datetime, timedelta
+from src.models.timeslot import MAX_BOOKINGS_PER_TIMESLOT
+from src.services.timeslot_service import TimeslotService
+from src.services.availability_cache import as_utc, day_of, day_start
+from src import availability_cache
 
 timeslot_bp = Blueprint('timeslot', __name__)
+timeslot_service = TimeslotService()
+
+
+def _get_timeslot_usage(start, end):
+    """get {start_time: (booked_count, capacity)} for existing timeslots
+    between start and end (UTC datetimes), serving whole days from the
+    availability cache"""
+    days = [start.date() + timedelta(days=offset)
+            for offset in range((end.date() - start.date()).days + 1)]
+
+    # serve cached days, then load every missing day in one query
+    generation = availability_cache.generation
+    day_counts = availability_cache.get_many(days)
+    missing = [day for day in days if day not in day_counts]
+
+    if missing:
+        fetched = {day: {} for day in missing}
+        usage = timeslot_service.get_timeslot_usage(
+            day_start(missing[0]),
+            day_start(missing[-1] + timedelta(days=1))
+        )
+        for start_time, slot_usage in usage.items():
+            day = day_of(start_time)
+            if day in fetched:
+                fetched[day][start_time] = slot_usage
+
+        availability_cache.put_many(fetched, generation)
+        day_counts.update(fetched)
+
+    return {
+        start_time: slot_usage
+        for day in days
+        for start_time, slot_usage in day_counts[day].items()
+        if start <= as_utc(start_time) <= end
+    }
 
 
 def get_availability_internal(start_date, end_date):
-    timeslots = Timeslot.query.filter(
-        Timeslot.start_time >= datetime.fromisoformat(start_date),
-        Timeslot.start_time <= datetime.fromisoformat(end_date)
-    ).all()
+    usage = _get_timeslot_usage(
+        as_utc(datetime.fromisoformat(start_date)),
+        as_utc(datetime.fromisoformat(end_date))
+    )
 
     return {
-        ts.start_time.isoformat(): ts.booking_count
-        for ts in timeslots
+        start_time.isoformat(): booked_count
+        for start_time, (booked_count, _) in usage.items()
+    }
+
+
+def get_availability_grid_internal(start_date, end_date):
+    """get every opening hours slot in range with its booking count,
+    including slots that have no timeslot row yet"""
+    start = as_utc(datetime.fromisoformat(start_date))
+    end = as_utc(datetime.fromisoformat(end_date))
+
+    usage = {
+        as_utc(start_time): slot_usage
+        for start_time, slot_usage in _get_timeslot_usage(start, end).items()
     }
 
+    grid = []
+    for slot in timeslot_service.get_opening_slots(start, end):
+        count, capacity = usage.get(slot, (0, MAX_BOOKINGS_PER_TIMESLOT))
+        grid.append({
+            "start_time": slot.isoformat(),
+            "booking_count": count,
+            "capacity": capacity,
+            "free": count < capacity
+        })
+    return grid
+
 
 @timeslot_bp.route('/availability', methods=['GET'])
 def get_availability():
@@ -48,3 +109,45 @@ def get_availability():
             'code': 'SERVER_ERROR',
             'message': str(e)
         }), 500
+
+
+@timeslot_bp.route('/availability/grid', methods=['GET'])
+def get_availability_grid():
+    """Get every opening hours timeslot for a given range
+    Query parameters:
+    - start_date: ISO formatted datetime string
+    - end_date: ISO formatted datetime string
+    """
+    try:
+        start_date = request.args.get('start_date')
+        end_date = request.args.get('end_date')
+
+        if not start_date or not end_date:
+            return jsonify({
+                'status': 'error',
+                'code': 'INVALID_REQUEST',
+                'message': 'Start and end date required'
+            }), 400
+
+        grid = get_availability_grid_internal(start_date, end_date)
+
+        return jsonify({
+            'status': 'success',
+            'data': grid
+        }), 200
+
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'code': 'SERVER_ERROR',
+            'message': str(e)
+        }), 500
+
+
+@timeslot_bp.route('/availability/cache', methods=['GET'])
+def get_availability_cache_stats():
+    """Get availability cache hit/miss/eviction counters"""
+    return jsonify({
+        'status': 'success',
+        'data': availability_cache.stats()
+    }), 200
@@ -1,118 +1,245 @@
-from azure.keyvault.secrets import SecretClient
-from azure.identity import DefaultAzureCredential
-from openai import AzureOpenAI
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+import asyncio
+from flask import current_app, has_app_context
+from openai import (
+    APIConnectionError, APITimeoutError, AsyncAzureOpenAI, AzureOpenAI,
+    InternalServerError, RateLimitError)
+from src.services.circuit_breaker import CircuitBreaker, CircuitOpen
+from src.services.conversation_queue import (
+    LEAD, ConversationLock, ConversationQueue, create_conversation_lock)
+from src.services.faq_index import FaqIndex
+from src.services.response_cache import ResponseCache, normalize_message
+from src.services.run_polling import (
+    FINISHED_STATUSES, PollBackoff, RunBudget, RunFailed, RunMetrics,
+    RunTimeout)
+from src.services.secret_provider import create_secret_provider
+from src.services.thread_registry import (
+    InMemoryThreadRegistry, create_thread_registry)
+from src.services.usage_recorder import UsageRecorder
+from types import SimpleNamespace
+import hashlib
+import httpx
+import logging
+import threading
 import time
 import json
 
-MAX_BOOKINGS_PER_TIMESLOT = 3
+logger = logging.getLogger(__name__)
+
+# tools that change state, these never run concurrently with each other
+SERIAL_TOOLS = {'create_booking'}
+
+# last_error codes of failed runs that point at Azure OpenAI rather than
+# the conversation
+BACKEND_RUN_ERRORS = {'server_error', 'rate_limit_exceeded'}
+
+# (question, answer) pairs, an answer of "." marks a section heading
+FAQ_RESPONSES = [
+    ("GENERAL INFORMATION", "."),
+    ("What is Dialogue Café?", "Dialogue Café is an inclusive coffee space where deaf and hard-of-hearing individuals work as baristas, offering a unique experience that promotes British Sign Language (BSL) and deaf culture. Our aim is to create an interactive and welcoming environment where customers can engage in sign language while enjoying high-quality coffee and food."),
+    ("Where is Dialogue Café located?", "Currently, Dialogue Café operates at the University of East London Docklands Campus within the Royal Docks Centre for Sustainability. A second location is set to open in Stratford (Newham) around April-May 2025."),
+    ("What are the opening hours of Dialogue Café?",
+     "Currently, Monday to Thursday between 08:00-17:00 Friday 08:00-13:00. Dialogue Café is closed on weekends."),
+    ("How can I contact Dialogue Café?", "You can reach us via: Email: info@dialoguehub.co.uk, Social Media: Instagram: dialogue.hub, LinkedIn : Dialogue Hub and Dialogue Café UK, Website: www.dialoguehub.co.uk"),
+    ("Is there a membership or sign-up required to visit?",
+     "No, Dialogue Café is open to everyone! You do not need a membership or prior sign-up to visit. Simply drop by, place an order, and enjoy your experience."),
+    ("ORDERING AND MENU", "."),
+    ("What's British Sign Language (BSL)?", "British Sign Language (BSL) is the primary language of the deaf community in the UK. It uses hand movements, facial expressions, and body language to communicate. At Dialogue Café, we encourage customers to engage with BSL by ordering using sign language, making it a fun and interactive experience."),
+    ("How do I order food and drinks in BSL?", "Ordering in BSL is simple! Our café provides easy-to-follow visual guides, and our friendly deaf baristas are happy to assist you. You can also use our digital screens with step-by-step instructions to learn and sign your order. If you're new to BSL, don't worry—we'll guide you through the process and make it an enjoyable experience"),
+    ("What payment methods do you accept?",
+     "We are cashless and we accept all major credit and debit cards, contactless payments, and mobile wallets (Apple Pay, Google Pay)."),
+    ("Do you offer vegetarian or vegan options?",
+     "Yes, we offer a variety of vegetarian and vegan options on our menu."),
+    ("Can I see the menu online?",
+     "Yes, our menu is available on our website at www.dialoguehub.co.uk."),
+    ("Do you have gluten-free options?",
+     "Yes, we offer gluten-free options on our menu."),
+    ("Are there any special promotions or discounts available?",
+     "We are currently applying 15% to UEL Students."),
+    ("Can I place an order in advance?",
+     "Currently, we do not accept advance orders."),
+    ("FACILITIES AND SERVICES", "."),
+    ("Do you provide Wi-Fi for customers?",
+     "Yes, we offer free Wi-Fi for all customers."),
+    ("Is there a quiet space for studying or working?",
+     "Yes, we have a designated quiet area for studying or working."),
+    ("Do you have accessibility features for people with disabilities?",
+     "Yes, Dialogue Café is designed to be accessible to everyone, including individuals with disabilities. We have wheelchair ramps, accessible restrooms, and staff trained in British Sign Language (BSL) to assist customers."),
+    ("Do you offer take-away or delivery services?",
+     "Yes, we offer take-away services. Delivery services are not available at the moment."),
+    ("EVENTS AND COMMUNITY", "."),
+    ("Does Dialogue Café host any events or workshops?",
+     "Yes. We do have school workshop and corporate workshop programmes. We are currently working on our event calendar."),
+    ("Can I get more information on School Workshop programme?",
+     "Yes. It's on our web page. For more details, please contact us via email."),
+    ("Can I get more information on Corporate Workshop Programme?",
+     "Yes. It's on our web page. For more details, please contact us via email."),
+    ("How can I participate in events at the café?",
+     "It's free and open to public. For more details, please contact us via email."),
+    ("Can I host my own event at Dialogue Café",
+     "Yes. It's on our web page. For more details, please contact us via email."),
+    ("Are there networking opportunities at the café?",
+     "Yes. For more details, please contact us via email."),
+    ("Can I speak to a staff member if my question isn't answered by D-Bot?",
+     "Yes. Any questions can be also answered through info@dialoguehub.co.uk"),
+]
 
 
 class AIService:
     def __init__(self, app=None):
         self.client = None
+        self.async_client = None
         self.deployment = None
         self.assistant = None
-        self.active_threads = {}
+        self.secret_provider = None
+        self.config_fingerprint = None
+        self.faq_index = None
+        self.response_cache = None
+        self.thread_registry = InMemoryThreadRegistry()
+        self.conversation_queue = ConversationQueue()
+        self.conversation_lock = ConversationLock()
         self.assistant_id = None
+        self.poll_settings = {}
+        self.run_timeout = 30
+        self.cancel_timeout = 5
+        self.run_metrics = RunMetrics()
+        self.circuit_breaker = CircuitBreaker(
+            is_failure=self._is_backend_failure)
+        self.booking_url = '/book'
+        self.http_timeout = 20
+        self.usage_recorder = UsageRecorder()
+        self.tool_workers = 4
+        self.tool_executor = None
+        self._tool_executor_lock = threading.Lock()
+        self.app = None
+        self._init_lock = threading.Lock()
         if app is not None:
             self.init_app(app)
 
     def init_app(self, app):
-        # Azure Key Vault configuration
-        key_vault_name = app.config['KEY_VAULT_NAME']
-        key_vault_uri = f"https://{key_vault_name}.vault.azure.net"
+        self.poll_settings = {
+            'initial_delay': app.config.get('AI_POLL_INITIAL_DELAY', 0.2),
+            'max_delay': app.config.get('AI_POLL_MAX_DELAY', 0.5),
+            'multiplier': app.config.get('AI_POLL_MULTIPLIER', 2.0),
+            'jitter': app.config.get('AI_POLL_JITTER', 0.2)
+        }
+        self.run_timeout = app.config.get('AI_RUN_TIMEOUT', 30)
+        self.cancel_timeout = app.config.get('AI_RUN_CANCEL_TIMEOUT', 5)
+        self.tool_workers = app.config.get('AI_TOOL_WORKERS', 4)
+        self.thread_registry = create_thread_registry(app.config)
+        self.conversation_queue = ConversationQueue(
+            max_pending=app.config.get('AI_CONVERSATION_MAX_PENDING', 5))
+        self.conversation_lock = create_conversation_lock(app.config)
+        self.usage_recorder = UsageRecorder(app)
+        self.circuit_breaker = CircuitBreaker(
+            window=app.config.get('AI_CIRCUIT_WINDOW', 20),
+            min_calls=app.config.get('AI_CIRCUIT_MIN_CALLS', 5),
+            failure_rate=app.config.get('AI_CIRCUIT_FAILURE_RATE', 0.5),
+            slow_call_seconds=app.config.get('AI_CIRCUIT_SLOW_SECONDS', 15),
+            slow_call_rate=app.config.get('AI_CIRCUIT_SLOW_RATE', 0.5),
+            open_seconds=app.config.get('AI_CIRCUIT_OPEN_SECONDS', 30),
+            probes=app.config.get('AI_CIRCUIT_PROBES', 1),
+            is_failure=self._is_backend_failure
+        )
+        self.booking_url = app.config.get('BOOKING_URL', self.booking_url)
+        self.http_timeout = app.config.get('AI_HTTP_TIMEOUT', 20)
+        self.secret_provider = create_secret_provider(app.config)
+        self.secret_provider.subscribe(self._on_secret_change)
+        self.faq_index = None
+        if app.config.get('AI_FAQ_ENABLED', True):
+            self.faq_index = FaqIndex(
+                FAQ_RESPONSES,
+                min_score=app.config.get('AI_FAQ_MIN_SCORE', 0.5),
+                min_margin=app.config.get('AI_FAQ_MIN_MARGIN', 0.15)
+            )
+        self.response_cache = None
+        if app.config.get('AI_RESPONSE_CACHE_ENABLED', True):
+            self.response_cache = ResponseCache(
+                max_entries=app.config.get(
+                    'AI_RESPONSE_CACHE_MAX_ENTRIES', 1000),
+                ttl=app.config.get('AI_RESPONSE_CACHE_TTL', 3600)
+            )
 
-        # Set up Key Vault client
-        credential = DefaultAzureCredential()
-        secret_client = SecretClient(
-            vault_url=key_vault_uri, credential=credential)
+        # Azure clients and the assistant are set up on first use, so app
+        # startup, CLI commands and tests make no network calls
+        self.app = app
+
+    @property
+    def is_initialized(self):
+        return self.client is not None and self.assistant is not None
+
+    def ensure_initialized(self):
+        """Set up the Azure clients and assistant once, on first use"""
+        if self.is_initialized:
+            return
+        if self.app is None:
+            raise RuntimeError("AIService is not initialized")
+        with self._init_lock:
+            # another thread may have finished while we waited for the lock
+            if not self.is_initialized:
+                self._initialize(self.app)
 
-        # Retrieve the API key from Key Vault
-        api_key_secret = secret_client.get_secret(
+    def _initialize(self, app):
+        # Retrieve the API key, from Key Vault unless SECRET_PROVIDER says
+        # otherwise
+        subscription_key = self.secret_provider.get_secret(
             app.config['OPENAI_API_SECRET_NAME'])
-        subscription_key = api_key_secret.value
 
         # Set deployment name
         self.deployment = app.config['DEPLOYMENT_NAME']
 
         # Initialize Azure OpenAI client
-        self.client = AzureOpenAI(
-            azure_endpoint=app.config['OPENAI_ENDPOINT_URL'],
-            api_key=subscription_key,
-            api_version="2024-05-01-preview",
-        )
+        self._create_clients(app, subscription_key)
 
         self.assistant_id = app.config.get('AZURE_ASSISTANT_ID')
 
         if self.assistant_id:
             try:
-                self.assistant = self.client.beta.assistants.retrieve(
+                assistant = self.client.beta.assistants.retrieve(
                     assistant_id=self.assistant_id
                 )
-                self.assistant = self._update_assistant(self.assistant)
+                assistant = self._update_assistant(assistant)
             except Exception:
-                self.assistant = self._create_assistant()
-                app.config['AZURE_ASSISTANT_ID'] = self.assistant.id
+                assistant = self._create_assistant()
+                app.config['AZURE_ASSISTANT_ID'] = assistant.id
         else:
-            self.assistant = self._create_assistant()
-            app.config['AZURE_ASSISTANT_ID'] = self.assistant.id
+            assistant = self._create_assistant()
+            app.config['AZURE_ASSISTANT_ID'] = assistant.id
+
+        # set last, is_initialized only becomes true once this is ready
+        self.assistant = assistant
+
+    def _create_clients(self, app, subscription_key):
+        self.client = AzureOpenAI(
+            azure_endpoint=app.config['OPENAI_ENDPOINT_URL'],
+            api_key=subscription_key,
+            api_version="2024-05-01-preview",
+            timeout=self.http_timeout,
+        )
+        self.async_client = AsyncAzureOpenAI(
+            azure_endpoint=app.config['OPENAI_ENDPOINT_URL'],
+            api_key=subscription_key,
+            api_version="2024-05-01-preview",
+            timeout=self.http_timeout,
+        )
+
+    def _on_secret_change(self, name, value):
+        """Switch to a rotated API key, called from the secret refresh
+        thread. Requests already running finish on the old clients."""
+        if name != self.app.config.get('OPENAI_API_SECRET_NAME'):
+            return
+        if self.client is None:
+            return
+        self._create_clients(self.app, value)
 
     def _get_instructions(self):
-        """Return the assistant instructions with current date"""
-        current_date = time.strftime("%A, %B %d, %Y")
+        """Return the assistant instructions"""
+        from src.models.timeslot import MAX_BOOKINGS_PER_TIMESLOT
 
         faq_instructions = "Frequently Asked Questions:\n"
-        faq_responses = [
-            ("GENERAL INFORMATION", "."),
-            ("What is Dialogue Café?", "Dialogue Café is an inclusive coffee space where deaf and hard-of-hearing individuals work as baristas, offering a unique experience that promotes British Sign Language (BSL) and deaf culture. Our aim is to create an interactive and welcoming environment where customers can engage in sign language while enjoying high-quality coffee and food."),
-            ("Where is Dialogue Café located?", "Currently, Dialogue Café operates at the University of East London Docklands Campus within the Royal Docks Centre for Sustainability. A second location is set to open in Stratford (Newham) around April-May 2025."),
-            ("What are the opening hours of Dialogue Café?",
-             "Currently, Monday to Thursday between 08:00-17:00 Friday 08:00-13:00. Dialogue Café is closed on weekends."),
-            ("How can I contact Dialogue Café?", "You can reach us via: Email: info@dialoguehub.co.uk, Social Media: Instagram: dialogue.hub, LinkedIn : Dialogue Hub and Dialogue Café UK, Website: www.dialoguehub.co.uk"),
-            ("Is there a membership or sign-up required to visit?",
-             "No, Dialogue Café is open to everyone! You do not need a membership or prior sign-up to visit. Simply drop by, place an order, and enjoy your experience."),
-            ("ORDERING AND MENU", "."),
-            ("What's British Sign Language (BSL)?", "British Sign Language (BSL) is the primary language of the deaf community in the UK. It uses hand movements, facial expressions, and body language to communicate. At Dialogue Café, we encourage customers to engage with BSL by ordering using sign language, making it a fun and interactive experience."),
-            ("How do I order food and drinks in BSL?", "Ordering in BSL is simple! Our café provides easy-to-follow visual guides, and our friendly deaf baristas are happy to assist you. You can also use our digital screens with step-by-step instructions to learn and sign your order. If you're new to BSL, don't worry—we'll guide you through the process and make it an enjoyable experience"),
-            ("What payment methods do you accept?",
-             "We are cashless and we accept all major credit and debit cards, contactless payments, and mobile wallets (Apple Pay, Google Pay)."),
-            ("Do you offer vegetarian or vegan options?",
-             "Yes, we offer a variety of vegetarian and vegan options on our menu."),
-            ("Can I see the menu online?",
-             "Yes, our menu is available on our website at www.dialoguehub.co.uk."),
-            ("Do you have gluten-free options?",
-             "Yes, we offer gluten-free options on our menu."),
-            ("Are there any special promotions or discounts available?",
-             "We are currently applying 15% to UEL Students."),
-            ("Can I place an order in advance?",
-             "Currently, we do not accept advance orders."),
-            ("FACILITIES AND SERVICES", "."),
-            ("Do you provide Wi-Fi for customers?",
-             "Yes, we offer free Wi-Fi for all customers."),
-            ("Is there a quiet space for studying or working?",
-             "Yes, we have a designated quiet area for studying or working."),
-            ("Do you have accessibility features for people with disabilities?",
-             "Yes, Dialogue Café is designed to be accessible to everyone, including individuals with disabilities. We have wheelchair ramps, accessible restrooms, and staff trained in British Sign Language (BSL) to assist customers."),
-            ("Do you offer take-away or delivery services?",
-             "Yes, we offer take-away services. Delivery services are not available at the moment."),
-            ("EVENTS AND COMMUNITY", "."),
-            ("Does Dialogue Café host any events or workshops?",
-             "Yes. We do have school workshop and corporate workshop programmes. We are currently working on our event calendar."),
-            ("Can I get more information on School Workshop programme?",
-             "Yes. It's on our web page. For more details, please contact us via email."),
-            ("Can I get more information on Corporate Workshop Programme?",
-             "Yes. It's on our web page. For more details, please contact us via email."),
-            ("How can I participate in events at the café?",
-             "It's free and open to public. For more details, please contact us via email."),
-            ("Can I host my own event at Dialogue Café",
-             "Yes. It's on our web page. For more details, please contact us via email."),
-            ("Are there networking opportunities at the café?",
-             "Yes. For more details, please contact us via email."),
-            ("Can I speak to a staff member if my question isn't answered by D-Bot?",
-             "Yes. Any questions can be also answered through info@dialoguehub.co.uk"),
-        ]
 
-        for question, answer in faq_responses:
+        for question, answer in FAQ_RESPONSES:
             if answer == ".":
                 faq_instructions += f"\n## {question}\n"
             else:
@@ -120,7 +247,6 @@ class AIService:
 
         base_instructions = (
             f"You are an AI Assistant called D-Bot for Dialogue Hub's British Sign Language Cafe. "
-            f"Today's date is {current_date}. "
             "Help users with information about the Cafe, BSL queries and menu videos, accessibility needs, "
             "and booking assistance. Create bookings when users request them. Provide BSL videos when users request them.\n"
             "Opening Hours:\n"
@@ -130,11 +256,9 @@ class AIService:
             "When helping with bookings:\n"
             "- First, always check availability for the requested time period\n"
             "- Timeslots must be consecutive on the same date\n"
-            f"- Each timeslot has a booking_count value - timeslots with booking_count less than {MAX_BOOKINGS_PER_TIMESLOT} are available\n"
-            "- When listing available times, you must show ALL business hours (8am-5pm Mon-Thu, 8am-1pm Fri)\n"
-            "- The get_availability function may return only timeslots that already have bookings\n"
-            "- For any business hour timeslot NOT returned by the function, assume it's available (0 bookings)\n"
-            f"- When displaying available times, include the current booking count for each slot out of {MAX_BOOKINGS_PER_TIMESLOT} \n"
+            "- Always call get_availability with mode 'grid', it returns every business hour timeslot in the range with its booking_count, capacity and a free flag\n"
+            "- Timeslots with free set to true are available, do not add or assume any timeslots that are not returned\n"
+            f"- When displaying available times, include the current booking count for each slot out of its capacity (usually {MAX_BOOKINGS_PER_TIMESLOT})\n"
             "- Suggest alternative times if requested slots are unavailable\n"
             "- Collect all required information: full name, email, and desired time\n"
             "- Each timeslot is 1 hour long and starts and ends on the hour\n"
@@ -224,6 +348,11 @@ class AIService:
                             "end_date": {
                                 "type": "string",
                                 "description": "End date in ISO format (YYYY-MM-DDTHH:MM:SS+00:00)"
+                            },
+                            "mode": {
+                                "type": "string",
+                                "enum": ["booked", "grid"],
+                                "description": "'grid' returns every business hour timeslot with booking_count, capacity and free, 'booked' (default) returns only existing timeslots"
                             }
                         },
                         "required": ["start_date", "end_date"]
@@ -254,222 +383,1072 @@ class AIService:
             }
         ]
 
+    def _get_run_instructions(self):
+        """Return the per-run instructions, kept out of the assistant so its
+        configuration doesn't change from day to day"""
+        return f"Today's date is {time.strftime('%A, %B %d, %Y')}."
+
+    def _get_assistant_config(self):
+        return {
+            'name': "D-Bot",
+            'model': self.deployment,
+            'instructions': self._get_instructions(),
+            'tools': self._get_tools(),
+            'tool_resources': {},
+            'temperature': 1,
+            'top_p': 0.9
+        }
+
+    def _config_fingerprint(self, config):
+        encoded = json.dumps(config, sort_keys=True).encode()
+        return hashlib.sha256(encoded).hexdigest()
+
     def _update_assistant(self, assistant):
-        """Update existing assistant with current configuration"""
+        """Update existing assistant if its configuration has changed"""
+        config = self._get_assistant_config()
+        fingerprint = self._config_fingerprint(config)
+        self.config_fingerprint = fingerprint
+
+        metadata = getattr(assistant, 'metadata', None)
+        metadata = dict(metadata) if isinstance(metadata, dict) else {}
+        if metadata.get('config_fingerprint') == fingerprint:
+            return assistant
+
+        metadata['config_fingerprint'] = fingerprint
         return self.client.beta.assistants.update(
             assistant_id=assistant.id,
-            name="D-Bot",
-            model=self.deployment,
-            instructions=self._get_instructions(),
-            tools=self._get_tools(),
-            tool_resources={},
-            temperature=1,
-            top_p=0.9
+            metadata=metadata,
+            **config
         )
 
     def _create_assistant(self):
         """Create a new assistant"""
+        config = self._get_assistant_config()
+        self.config_fingerprint = self._config_fingerprint(config)
         return self.client.beta.assistants.create(
-            name="D-Bot",
-            model=self.deployment,
-            instructions=self._get_instructions(),
-            tools=self._get_tools(),
-            tool_resources={},
-            temperature=1,
-            top_p=0.9
+            metadata={'config_fingerprint': self.config_fingerprint},
+            **config
         )
 
-    def get_ai_response(self, user_message, user_id=None):
-        """Get response using Azure OpenAI Assistant"""
-        if not self.client or not self.assistant:
-            raise RuntimeError("AIService is not initialized")
+    def _find_thread(self, user_id):
+        """ThreadEntry of the thread the user's conversation is on, None for
+        a new conversation. Looked up once per turn."""
+        if not user_id:
+            return None
+        return self.thread_registry.lookup(user_id)
 
-        # Use existing thread or create new one
-        thread = None
-        if user_id and user_id in self.active_threads:
-            thread = self.active_threads[user_id]
+    def _create_thread_id(self, user_id, messages=()):
+        if messages:
+            thread = self.client.beta.threads.create(messages=list(messages))
         else:
             thread = self.client.beta.threads.create()
-            if user_id:
-                self.active_threads[user_id] = thread
-
-        # Add the user's message to the thread
-        self.client.beta.threads.messages.create(
-            thread_id=thread.id,
-            role="user",
-            content=user_message
-        )
+        if user_id:
+            self.thread_registry.set(user_id, thread.id)
+        return thread.id
+
+    def _reply_messages(self, user_message, response):
+        return [{'role': 'user', 'content': user_message},
+                {'role': 'assistant', 'content': response}]
+
+    def _open_thread(self, user_id, thread, budget):
+        """Thread id to run on, with the exchanges answered without a run
+        since the last one posted to it first"""
+        pending = thread.pending_messages if thread else ()
+        if thread is None or thread.thread_id is None:
+            thread_id = self._create_thread_id(user_id, pending)
+        else:
+            thread_id = thread.thread_id
+            self._wait_for_abandoned_run(user_id, thread, budget)
+            for message in pending:
+                self.client.beta.threads.messages.create(
+                    thread_id=thread_id, **message)
+        if pending:
+            self.thread_registry.clear_pending_messages(user_id, len(pending))
+        return thread_id
+
+    def _defer_reply(self, user_id, user_message, response):
+        """Keep a reply given without a run for the user's next run to post
+        to their thread, so the assistant sees the exchange when they follow
+        up. The reply itself never waits on the assistant."""
+        try:
+            self.thread_registry.add_pending_messages(
+                user_id, self._reply_messages(user_message, response))
+        except Exception:
+            logger.exception('Keeping a reply for the next run failed')
+
+    def _response_cache_key(self, user_message):
+        """Cache key for the first message of a conversation, None when the
+        response cache is off"""
+        if self.response_cache is None:
+            return None
+        # the date is part of each run's instructions, so is the key
+        return (self.config_fingerprint, self._get_run_instructions(),
+                normalize_message(user_message))
+
+    def _get_cached_response(self, cache_key):
+        if cache_key is None:
+            return None
+        return self.response_cache.get(cache_key)
+
+    def _cache_response(self, cache_key, response, used_tools):
+        if cache_key is None:
+            return
+        if used_tools:
+            self.response_cache.skip()
+        else:
+            self.response_cache.set(cache_key, response)
+
+    def _get_tool_outputs(self, tool_calls, budget=None, timings=None):
+        """Run the assistant's function calls and collect their outputs.
+
+        Read-only calls run concurrently on the tool pool, each in its own
+        app context and database session. Calls that change state run one
+        at a time, in order, on the calling thread. With a budget, no call
+        is started and no result waited for once it has run out. With a
+        timings list, (name, seconds) is appended for every call made.
+        """
+        if len(tool_calls) > 1:
+            results = self._run_tool_calls_concurrently(
+                tool_calls, budget, timings)
+        else:
+            if budget is not None:
+                budget.check()
+            results = [self._run_timed_tool_call(call, timings)
+                       for call in tool_calls]
+
+        tool_outputs = [output for output in results if output is not None]
+
+        if not tool_outputs:
+            raise RuntimeError(
+                "No tool outputs generated for function calls")
+
+        return tool_outputs
+
+    def _run_tool_calls_concurrently(self, tool_calls, budget=None,
+                                     timings=None):
+        """Run tool calls with the read-only ones on the tool pool"""
+        app = current_app._get_current_object() if has_app_context() else None
+        pending = {}
+        for index, tool_call in enumerate(tool_calls):
+            if tool_call.function.name not in SERIAL_TOOLS:
+                pending[index] = self._get_tool_executor().submit(
+                    self._in_app_context, app, self._run_timed_tool_call,
+                    tool_call, timings)
+
+        results = []
+        for index, tool_call in enumerate(tool_calls):
+            if index in pending:
+                timeout = budget.remaining() if budget is not None else None
+                try:
+                    results.append(pending[index].result(timeout=timeout))
+                except FuturesTimeoutError:
+                    raise RunTimeout()
+            else:
+                if budget is not None:
+                    budget.check()
+                results.append(self._run_timed_tool_call(tool_call, timings))
+        return results
+
+    def _in_app_context(self, app, func, *args):
+        """Call func inside a new app context when an app is given"""
+        if app is None:
+            return func(*args)
+        # a fresh app context gets its own scoped database session, which
+        # is removed again when the context is popped
+        with app.app_context():
+            return func(*args)
+
+    def _get_tool_executor(self):
+        with self._tool_executor_lock:
+            if self.tool_executor is None:
+                self.tool_executor = ThreadPoolExecutor(
+                    max_workers=self.tool_workers,
+                    thread_name_prefix='ai-tool'
+                )
+            return self.tool_executor
+
+    def _run_timed_tool_call(self, tool_call, timings=None):
+        if timings is None:
+            return self._run_tool_call(tool_call)
+        started = time.perf_counter()
+        try:
+            return self._run_tool_call(tool_call)
+        finally:
+            timings.append(
+                (tool_call.function.name, time.perf_counter() - started))
+
+    def _run_tool_call(self, tool_call):
+        """Run one function call, returns None for unknown functions"""
+        if tool_call.function.name == "create_booking":
+            try:
+                booking_args = json.loads(
+                    tool_call.function.arguments)
+
+                try:
+                    from src.routes.booking_routes import create_booking_internal
+
+                    booking = create_booking_internal(booking_args)
+
+                    return {
+                        "tool_call_id": tool_call.id,
+                        "output": json.dumps({
+                            "status": "success",
+                            "message": "Booking created successfully",
+                            "data": booking.to_dict()
+                        })
+                    }
+                except ValueError as e:
+                    return {
+                        "tool_call_id": tool_call.id,
+                        "output": json.dumps({
+                            "status": "error",
+                            "message": str(e),
+                            "code": "INVALID_DATA"
+                        })
+                    }
+                except Exception as e:
+                    return {
+                        "tool_call_id": tool_call.id,
+                        "output": json.dumps({
+                            "status": "error",
+                            "message": str(e),
+                            "code": "SERVER_ERROR"
+                        })
+                    }
+            except Exception as e:
+                return {
+                    "tool_call_id": tool_call.id,
+                    "output": json.dumps({
+                        "status": "error",
+                        "message": f"Failed to process booking request: {str(e)}"
+                    })
+                }
+
+        elif tool_call.function.name == "get_availability":
+            try:
+                from src.routes.timeslot_routes import (
+                    get_availability_grid_internal,
+                    get_availability_internal
+                )
+
+                args = json.loads(tool_call.function.arguments)
+
+                if not args.get('start_date') or not args.get('end_date'):
+                    raise ValueError(
+                        "Missing required start_date or end_date")
+
+                if args.get('mode') == 'grid':
+                    availability_data = get_availability_grid_internal(
+                        args['start_date'],
+                        args['end_date']
+                    )
+                else:
+                    availability_data = get_availability_internal(
+                        args['start_date'],
+                        args['end_date']
+                    )
+
+                return {
+                    "tool_call_id": tool_call.id,
+                    "output": json.dumps({
+                        "status": "success",
+                        "data": availability_data
+                    })
+                }
+            except ValueError as e:
+                return {
+                    "tool_call_id": tool_call.id,
+                    "output": json.dumps({
+                        "status": "error",
+                        "code": "INVALID_DATA",
+                        "message": str(e)
+                    })
+                }
+            except Exception as e:
+                return {
+                    "tool_call_id": tool_call.id,
+                    "output": json.dumps({
+                        "status": "error",
+                        "code": "SERVER_ERROR",
+                        "message": str(e)
+                    })
+                }
+
+        elif tool_call.function.name == "get_videos":
+            try:
+                args = json.loads(tool_call.function.arguments)
+                category = args.get('category')
+                query = args.get('query', '').lower()
+
+                from src.data.videos import get_videos_by_category
+
+                videos = get_videos_by_category(category)
+
+                if query:
+                    videos = [
+                        v for v in videos if query in v.lower()]
+
+                return {
+                    "tool_call_id": tool_call.id,
+                    "output": json.dumps({
+                        "status": "success",
+                        "data": videos
+                    })
+                }
+            except ValueError as e:
+                return {
+                    "tool_call_id": tool_call.id,
+                    "output": json.dumps({
+                        "status": "error",
+                        "code": "INVALID_DATA",
+                        "message": str(e)
+                    })
+                }
+            except Exception as e:
+                return {
+                    "tool_call_id": tool_call.id,
+                    "output": json.dumps({
+                        "status": "error",
+                        "code": "SERVER_ERROR",
+                        "message": str(e)
+                    })
+                }
+
+        return None
+
+    def _answer_from_faq(self, user_message, user_id=None):
+        """FAQ answer for a close match to a known question, else None"""
+        if self.faq_index is None:
+            return None
+        faq_answer = self.faq_index.match(user_message)
+        if faq_answer is not None and user_id:
+            self._defer_reply(user_id, user_message, faq_answer)
+        return faq_answer
+
+    def get_ai_response(self, user_message, user_id=None):
+        """Get response using Azure OpenAI Assistant"""
+        faq_answer = self._answer_from_faq(user_message, user_id)
+        if faq_answer is not None:
+            return faq_answer
+
+        # skip the queue while the circuit is open
+        if not self.circuit_breaker.allows_calls():
+            return self._degraded_response(user_message)
+        try:
+            return self._get_assistant_response(user_message, user_id)
+        except CircuitOpen:
+            return self._degraded_response(user_message)
+
+    def _get_assistant_response(self, user_message, user_id):
+        if not self.is_initialized:
+            with self.circuit_breaker.guard():
+                self.ensure_initialized()
+        budget = RunBudget(self.run_timeout)
+
+        if not user_id:
+            return self._respond(None, [user_message], budget)
+
+        future = self.conversation_queue.enqueue(user_id, user_message)
+        if self._wait_for_turn(user_id, future, budget) is not LEAD:
+            # answered by the run of an earlier message's request
+            return future.result()
+
+        batch = self.conversation_queue.take_batch(user_id)
+        try:
+            token = self.conversation_lock.acquire(user_id, budget)
+            try:
+                response = self._respond(
+                    user_id, [message for message, _ in batch], budget)
+            finally:
+                self.conversation_lock.release(user_id, token)
+        except Exception as e:
+            self.conversation_queue.finish(user_id, batch, error=e)
+            raise
+        self.conversation_queue.finish(user_id, batch, response)
+        return response
+
+    def _wait_for_turn(self, user_id, future, budget):
+        """LEAD when this request should run the conversation's queued
+        messages, otherwise the reply another request got for them"""
+        try:
+            return future.result(timeout=budget.remaining())
+        except FuturesTimeoutError:
+            self.conversation_queue.withdraw(user_id, future)
+            raise RunTimeout(
+                "Timeout waiting for the previous message to be answered.")
+
+    def _respond(self, user_id, user_messages, budget):
+        """Post the messages to the user's thread and answer them with one
+        run"""
+        thread = self._find_thread(user_id)
+        cache_key = None
+        if thread is None and len(user_messages) == 1:
+            cache_key = self._response_cache_key(user_messages[0])
+            cached_response = self._get_cached_response(cache_key)
+            if cached_response is not None:
+                if user_id:
+                    self._defer_reply(
+                        user_id, user_messages[0], cached_response)
+                return cached_response
+
+        with self.circuit_breaker.guard():
+            response, used_tools = self._run_assistant(
+                user_id, thread, user_messages, budget)
+        self._cache_response(cache_key, response, used_tools)
+        return response
+
+    def _run_assistant(self, user_id, thread, user_messages, budget):
+        """Answer the messages with one run, returns the reply and whether
+        tools ran"""
+        thread_id = self._open_thread(user_id, thread, budget)
+
+        # Add the user's messages to the thread
+        for user_message in user_messages:
+            self.client.beta.threads.messages.create(
+                thread_id=thread_id,
+                role="user",
+                content=user_message
+            )
 
         # Run the assistant
         run = self.client.beta.threads.runs.create(
-            thread_id=thread.id,
-            assistant_id=self.assistant.id
+            thread_id=thread_id,
+            assistant_id=self.assistant.id,
+            additional_instructions=self._get_run_instructions()
         )
 
-        timeout_seconds = 30
-        start_time = time.time()
+        started = time.perf_counter()
+        tool_timings = []
+        try:
+            run, polls, used_tools = self._poll_run(
+                thread_id, run, budget, tool_timings)
+        except RunTimeout:
+            self.run_metrics.record_timeout()
+            self._record_usage(
+                run, thread_id, user_id, time.perf_counter() - started,
+                tool_timings, status='timeout')
+            self._cancel_run(user_id, thread_id, run.id)
+            raise
 
-        while run.status not in ['completed', 'failed']:
+        wall_time = time.perf_counter() - started
+        self.run_metrics.record(polls, wall_time)
+        self._record_usage(
+            run, thread_id, user_id, wall_time, tool_timings, polls=polls)
+
+        self._raise_if_failed(run)
 
-            if time.time() - start_time > timeout_seconds:
-                raise RuntimeError("Timeout waiting for assistant response.")
+        return self._get_reply(thread_id, run.id), used_tools
+
+    def _poll_run(self, thread_id, run, budget, tool_timings=None):
+        """Wait for the run to finish, running its tool calls, until the
+        budget runs out. Returns the run, polls made and whether tools ran"""
+        polls = 0
+        used_tools = False
+        backoff = PollBackoff(**self.poll_settings)
+
+        while run.status not in ['completed', 'failed']:
+            budget.check()
 
             if run.status in ['queued', 'in_progress', 'cancelling']:
-                time.sleep(1)
+                time.sleep(min(backoff.next_delay(), budget.remaining()))
+                previous_status = run.status
                 run = self.client.beta.threads.runs.retrieve(
-                    thread_id=thread.id,
+                    thread_id=thread_id,
                     run_id=run.id
                 )
+                polls += 1
+                if run.status != previous_status:
+                    backoff.reset()
 
             elif run.status == 'requires_action':
+                used_tools = True
                 tool_calls = run.required_action.submit_tool_outputs.tool_calls
-                tool_outputs = []
-
-                for tool_call in tool_calls:
-                    if tool_call.function.name == "create_booking":
-                        try:
-                            booking_args = json.loads(
-                                tool_call.function.arguments)
-
-                            try:
-                                from src.routes.booking_routes import create_booking_internal
-
-                                booking = create_booking_internal(booking_args)
-
-                                tool_outputs.append({
-                                    "tool_call_id": tool_call.id,
-                                    "output": json.dumps({
-                                        "status": "success",
-                                        "message": "Booking created successfully",
-                                        "data": booking.to_dict()
-                                    })
-                                })
-                            except ValueError as e:
-                                tool_outputs.append({
-                                    "tool_call_id": tool_call.id,
-                                    "output": json.dumps({
-                                        "status": "error",
-                                        "message": str(e),
-                                        "code": "INVALID_DATA"
-                                    })
-                                })
-                            except Exception as e:
-                                tool_outputs.append({
-                                    "tool_call_id": tool_call.id,
-                                    "output": json.dumps({
-                                        "status": "error",
-                                        "message": str(e),
-                                        "code": "SERVER_ERROR"
-                                    })
-                                })
-                        except Exception as e:
-                            tool_outputs.append({
-                                "tool_call_id": tool_call.id,
-                                "output": json.dumps({
-                                    "status": "error",
-                                    "message": f"Failed to process booking request: {str(e)}"
-                                })
-                            })
-
-                    elif tool_call.function.name == "get_availability":
-                        try:
-                            from src.routes.timeslot_routes import get_availability_internal
-
-                            args = json.loads(tool_call.function.arguments)
-
-                            if not args.get('start_date') or not args.get('end_date'):
-                                raise ValueError(
-                                    "Missing required start_date or end_date")
-
-                            availability_data = get_availability_internal(
-                                args['start_date'],
-                                args['end_date']
-                            )
-
-                            tool_outputs.append({
-                                "tool_call_id": tool_call.id,
-                                "output": json.dumps({
-                                    "status": "success",
-                                    "data": availability_data
-                                })
-                            })
-                        except ValueError as e:
-                            tool_outputs.append({
-                                "tool_call_id": tool_call.id,
-                                "output": json.dumps({
-                                    "status": "error",
-                                    "code": "INVALID_DATA",
-                                    "message": str(e)
-                                })
-                            })
-                        except Exception as e:
-                            tool_outputs.append({
-                                "tool_call_id": tool_call.id,
-                                "output": json.dumps({
-                                    "status": "error",
-                                    "code": "SERVER_ERROR",
-                                    "message": str(e)
-                                })
-                            })
-
-                    elif tool_call.function.name == "get_videos":
-                        try:
-                            args = json.loads(tool_call.function.arguments)
-                            category = args.get('category')
-                            query = args.get('query', '').lower()
-
-                            from src.data.videos import get_videos_by_category
-
-                            videos = get_videos_by_category(category)
-
-                            if query:
-                                videos = [
-                                    v for v in videos if query in v.lower()]
-
-                            tool_outputs.append({
-                                "tool_call_id": tool_call.id,
-                                "output": json.dumps({
-                                    "status": "success",
-                                    "data": videos
-                                })
-                            })
-                        except ValueError as e:
-                            tool_outputs.append({
-                                "tool_call_id": tool_call.id,
-                                "output": json.dumps({
-                                    "status": "error",
-                                    "code": "INVALID_DATA",
-                                    "message": str(e)
-                                })
-                            })
-                        except Exception as e:
-                            tool_outputs.append({
-                                "tool_call_id": tool_call.id,
-                                "output": json.dumps({
-                                    "status": "error",
-                                    "code": "SERVER_ERROR",
-                                    "message": str(e)
-                                })
-                            })
-
-                if not tool_outputs:
-                    raise RuntimeError(
-                        "No tool outputs generated for function calls")
+                tool_outputs = self._get_tool_outputs(
+                    tool_calls, budget, tool_timings)
 
                 run = self.client.beta.threads.runs.submit_tool_outputs(
-                    thread_id=thread.id,
+                    thread_id=thread_id,
                     run_id=run.id,
                     tool_outputs=tool_outputs
                 )
+                backoff.reset()
             else:
                 break
 
-        if run.status == 'failed':
-            error_msg = f"Assistant run failed with status: {run.status}"
-            if hasattr(run, 'last_error'):
-                error_msg += f" - {run.last_error}"
-            raise RuntimeError(error_msg)
+        return run, polls, used_tools
+
+    def _cancel_run(self, user_id, thread_id, run_id):
+        """Cancel a run nobody is waiting for and give it the cancel timeout
+        to stop. A run still active after that is remembered with the
+        user's thread, so the next message on it waits for the run whichever
+        worker it reaches. Anonymous threads are never reused."""
+        try:
+            run = self.client.beta.threads.runs.cancel(
+                thread_id=thread_id, run_id=run_id)
+            run = self._wait_for_run_to_finish(
+                thread_id, run, RunBudget(self.cancel_timeout))
+            finished = run.status in FINISHED_STATUSES
+        except Exception:
+            # e.g. the run finished just before the cancel request
+            finished = False
+
+        if not finished and user_id:
+            self.thread_registry.set_abandoned_run(user_id, run_id)
+        self.run_metrics.record_cancellation(finished)
 
+    def _wait_for_run_to_finish(self, thread_id, run, budget):
+        backoff = PollBackoff(**self.poll_settings)
+        while run.status not in FINISHED_STATUSES and not budget.expired():
+            time.sleep(min(backoff.next_delay(), budget.remaining()))
+            run = self.client.beta.threads.runs.retrieve(
+                thread_id=thread_id, run_id=run.id)
+        return run
+
+    def _wait_for_abandoned_run(self, user_id, thread, budget):
+        """A thread with an active run rejects new messages, so wait for a
+        run cancelled earlier to stop before reusing its thread"""
+        if thread.abandoned_run_id is None:
+            return
+        run = self.client.beta.threads.runs.retrieve(
+            thread_id=thread.thread_id, run_id=thread.abandoned_run_id)
+        run = self._wait_for_run_to_finish(thread.thread_id, run, budget)
+        if run.status not in FINISHED_STATUSES:
+            raise RunTimeout(
+                "Timeout waiting for the previous response to be cancelled.")
+        self.thread_registry.set_abandoned_run(user_id, None)
+
+    def _get_reply(self, thread_id, run_id):
+        """Text of the newest message the run added to the thread"""
         messages = self.client.beta.threads.messages.list(
-            thread_id=thread.id)
-        return messages.data[0].content[0].text.value
+            thread_id=thread_id, run_id=run_id, order='desc', limit=1)
+        return self._message_text(messages.data)
+
+    def _message_text(self, messages):
+        """Join the text blocks of the first message, without citation
+        markers"""
+        if not messages:
+            raise RuntimeError("Assistant run did not add a reply.")
+
+        parts = []
+        for part in messages[0].content:
+            # image blocks have no text
+            text = getattr(part, 'text', None)
+            if text is None:
+                continue
+            value = text.value
+            for annotation in getattr(text, 'annotations', None) or []:
+                if annotation.type == 'file_citation':
+                    value = value.replace(annotation.text, '')
+            parts.append(value)
+        return "\n\n".join(parts)
+
+    def _record_usage(self, run, thread_id, user_id, wall_time, tool_timings,
+                      polls=None, status=None):
+        """Queue the run's token usage and timings to be written"""
+        usage = getattr(run, 'usage', None)
+
+        def tokens(name):
+            # usage is None until the run finishes
+            value = getattr(usage, name, None)
+            return value if isinstance(value, int) else None
+
+        self.usage_recorder.record(
+            run_id=getattr(run, 'id', None),
+            thread_id=thread_id,
+            user_id=str(user_id) if user_id else None,
+            status=status or run.status,
+            prompt_tokens=tokens('prompt_tokens'),
+            completion_tokens=tokens('completion_tokens'),
+            total_tokens=tokens('total_tokens'),
+            wall_time=wall_time,
+            polls=polls,
+            tool_calls=list(tool_timings)
+        )
+
+    def _raise_if_failed(self, run):
+        if run.status == 'failed':
+            raise RunFailed(run)
+
+    def _is_backend_failure(self, error):
+        """whether an error counts against Azure OpenAI for the circuit
+        breaker, rather than being caused by the request or the client"""
+        if isinstance(error, RunFailed):
+            return error.code in BACKEND_RUN_ERRORS
+        return isinstance(error, (RunTimeout, APIConnectionError,
+                                  InternalServerError, RateLimitError))
+
+    def _degraded_response(self, user_message):
+        """Reply while the circuit is open: the closest FAQ answers and
+        where to book"""
+        parts = ["Sorry, D-Bot can't reach its assistant right now, so it "
+                 "can only help with common questions for the moment."]
+        suggestions = []
+        if self.faq_index is not None:
+            suggestions = self.faq_index.suggest(user_message)
+        if suggestions:
+            parts.append("These answers might help:")
+            parts.extend(f"{question}\n{answer}"
+                         for question, answer in suggestions)
+        parts.append(
+            f"You can still book a visit at {self.booking_url}, and any "
+            "other questions can be sent to info@dialoguehub.co.uk.")
+        return "\n\n".join(parts)
+
+    async def _find_thread_async(self, user_id, app):
+        if not user_id:
+            return None
+        return await self._call_registry_async(
+            app, self.thread_registry.lookup, user_id)
+
+    async def _create_thread_id_async(self, user_id, app, messages=()):
+        threads = self.async_client.beta.threads
+        if messages:
+            thread = await threads.create(messages=list(messages))
+        else:
+            thread = await threads.create()
+        if user_id:
+            await self._call_registry_async(
+                app, self.thread_registry.set, user_id, thread.id)
+        return thread.id
+
+    async def _open_thread_async(self, user_id, thread, budget, app):
+        pending = thread.pending_messages if thread else ()
+        if thread is None or thread.thread_id is None:
+            thread_id = await self._create_thread_id_async(
+                user_id, app, pending)
+        else:
+            thread_id = thread.thread_id
+            await self._wait_for_abandoned_run_async(
+                user_id, thread, budget, app)
+            for message in pending:
+                await self.async_client.beta.threads.messages.create(
+                    thread_id=thread_id, **message)
+        if pending:
+            await self._call_registry_async(
+                app, self.thread_registry.clear_pending_messages, user_id,
+                len(pending))
+        return thread_id
+
+    async def _answer_from_faq_async(self, user_message, user_id, app):
+        if self.faq_index is None:
+            return None
+        faq_answer = self.faq_index.match(user_message)
+        if faq_answer is not None and user_id:
+            await self._call_registry_async(
+                app, self._defer_reply, user_id, user_message, faq_answer)
+        return faq_answer
+
+    async def _call_registry_async(self, app, func, *args):
+        if not self.thread_registry.uses_database:
+            return func(*args)
+        return await asyncio.get_running_loop().run_in_executor(
+            None, self._in_app_context, app, func, *args)
+
+    async def get_ai_response_async(self, user_message, user_id=None):
+        """Get response using Azure OpenAI Assistant without blocking.
+
+        Polls on the event loop with AsyncAzureOpenAI, tool calls use the
+        database so they run on an executor thread in their own app context.
+        """
+        app = current_app._get_current_object() if has_app_context() else None
+        faq_answer = await self._answer_from_faq_async(
+            user_message, user_id, app)
+        if faq_answer is not None:
+            return faq_answer
+
+        if not self.circuit_breaker.allows_calls():
+            return self._degraded_response(user_message)
+        try:
+            return await self._get_assistant_response_async(
+                user_message, user_id)
+        except CircuitOpen:
+            return self._degraded_response(user_message)
+
+    async def _get_assistant_response_async(self, user_message, user_id):
+        loop = asyncio.get_running_loop()
+        if not self.async_client or not self.assistant:
+            # first use blocks on Key Vault and the assistants API
+            with self.circuit_breaker.guard():
+                await loop.run_in_executor(None, self.ensure_initialized)
+
+        app = current_app._get_current_object() if has_app_context() else None
+        budget = RunBudget(self.run_timeout)
+
+        if not user_id:
+            return await self._respond_async(None, [user_message], budget, app)
+
+        future = self.conversation_queue.enqueue(user_id, user_message)
+        try:
+            turn = await asyncio.wait_for(
+                asyncio.wrap_future(future), budget.remaining())
+        except asyncio.TimeoutError:
+            self.conversation_queue.withdraw(user_id, future)
+            raise RunTimeout(
+                "Timeout waiting for the previous message to be answered.")
+        if turn is not LEAD:
+            return turn
+
+        batch = self.conversation_queue.take_batch(user_id)
+        try:
+            token = await self._call_lock_async(
+                app, self.conversation_lock.acquire, user_id, budget)
+            try:
+                response = await self._respond_async(
+                    user_id, [message for message, _ in batch], budget, app)
+            finally:
+                await self._call_lock_async(
+                    app, self.conversation_lock.release, user_id, token)
+        except Exception as e:
+            self.conversation_queue.finish(user_id, batch, error=e)
+            raise
+        self.conversation_queue.finish(user_id, batch, response)
+        return response
+
+    async def _call_lock_async(self, app, func, *args):
+        if not self.conversation_lock.uses_database:
+            return func(*args)
+        return await asyncio.get_running_loop().run_in_executor(
+            None, self._in_app_context, app, func, *args)
+
+    async def _respond_async(self, user_id, user_messages, budget, app):
+        thread = await self._find_thread_async(user_id, app)
+        cache_key = None
+        if thread is None and len(user_messages) == 1:
+            cache_key = self._response_cache_key(user_messages[0])
+            cached_response = self._get_cached_response(cache_key)
+            if cached_response is not None:
+                if user_id:
+                    await self._call_registry_async(
+                        app, self._defer_reply, user_id, user_messages[0],
+                        cached_response)
+                return cached_response
+
+        with self.circuit_breaker.guard():
+            response, used_tools = await self._run_assistant_async(
+                user_id, thread, user_messages, budget, app)
+        self._cache_response(cache_key, response, used_tools)
+        return response
+
+    async def _run_assistant_async(self, user_id, thread, user_messages,
+                                   budget, app):
+        client = self.async_client
+        loop = asyncio.get_running_loop()
+
+        thread_id = await self._open_thread_async(user_id, thread, budget, app)
+
+        # Add the user's messages to the thread
+        for user_message in user_messages:
+            await client.beta.threads.messages.create(
+                thread_id=thread_id,
+                role="user",
+                content=user_message
+            )
+
+        # Run the assistant
+        run = await client.beta.threads.runs.create(
+            thread_id=thread_id,
+            assistant_id=self.assistant.id,
+            additional_instructions=self._get_run_instructions()
+        )
+
+        started = loop.time()
+        tool_timings = []
+        try:
+            run, polls, used_tools = await self._poll_run_async(
+                thread_id, run, budget, app, tool_timings)
+        except RunTimeout:
+            self.run_metrics.record_timeout()
+            self._record_usage(
+                run, thread_id, user_id, loop.time() - started,
+                tool_timings, status='timeout')
+            await self._cancel_run_async(user_id, thread_id, run.id, app)
+            raise
+
+        wall_time = loop.time() - started
+        self.run_metrics.record(polls, wall_time)
+        self._record_usage(
+            run, thread_id, user_id, wall_time, tool_timings, polls=polls)
+        self._raise_if_failed(run)
+
+        messages = await client.beta.threads.messages.list(
+            thread_id=thread_id, run_id=run.id, order='desc', limit=1)
+        return self._message_text(messages.data), used_tools
+
+    async def _poll_run_async(self, thread_id, run, budget, app,
+                              tool_timings=None):
+        client = self.async_client
+        loop = asyncio.get_running_loop()
+        polls = 0
+        used_tools = False
+        backoff = PollBackoff(**self.poll_settings)
+
+        while run.status not in ['completed', 'failed']:
+            budget.check()
+
+            if run.status in ['queued', 'in_progress', 'cancelling']:
+                await asyncio.sleep(
+                    min(backoff.next_delay(), budget.remaining()))
+                previous_status = run.status
+                run = await client.beta.threads.runs.retrieve(
+                    thread_id=thread_id,
+                    run_id=run.id
+                )
+                polls += 1
+                if run.status != previous_status:
+                    backoff.reset()
+
+            elif run.status == 'requires_action':
+                used_tools = True
+                tool_calls = run.required_action.submit_tool_outputs.tool_calls
+                try:
+                    tool_outputs = await asyncio.wait_for(
+                        loop.run_in_executor(
+                            None, self._in_app_context, app,
+                            self._get_tool_outputs, tool_calls, budget,
+                            tool_timings
+                        ),
+                        budget.remaining()
+                    )
+                except asyncio.TimeoutError:
+                    raise RunTimeout()
+
+                run = await client.beta.threads.runs.submit_tool_outputs(
+                    thread_id=thread_id,
+                    run_id=run.id,
+                    tool_outputs=tool_outputs
+                )
+                backoff.reset()
+            else:
+                break
+
+        return run, polls, used_tools
+
+    async def _cancel_run_async(self, user_id, thread_id, run_id, app):
+        try:
+            run = await self.async_client.beta.threads.runs.cancel(
+                thread_id=thread_id, run_id=run_id)
+            run = await self._wait_for_run_to_finish_async(
+                thread_id, run, RunBudget(self.cancel_timeout))
+            finished = run.status in FINISHED_STATUSES
+        except Exception:
+            finished = False
+
+        if not finished and user_id:
+            await self._call_registry_async(
+                app, self.thread_registry.set_abandoned_run, user_id, run_id)
+        self.run_metrics.record_cancellation(finished)
+
+    async def _wait_for_run_to_finish_async(self, thread_id, run, budget):
+        backoff = PollBackoff(**self.poll_settings)
+        while run.status not in FINISHED_STATUSES and not budget.expired():
+            await asyncio.sleep(min(backoff.next_delay(), budget.remaining()))
+            run = await self.async_client.beta.threads.runs.retrieve(
+                thread_id=thread_id, run_id=run.id)
+        return run
+
+    async def _wait_for_abandoned_run_async(self, user_id, thread, budget,
+                                            app):
+        if thread.abandoned_run_id is None:
+            return
+        run = await self.async_client.beta.threads.runs.retrieve(
+            thread_id=thread.thread_id, run_id=thread.abandoned_run_id)
+        run = await self._wait_for_run_to_finish_async(
+            thread.thread_id, run, budget)
+        if run.status not in FINISHED_STATUSES:
+            raise RunTimeout(
+                "Timeout waiting for the previous response to be cancelled.")
+        await self._call_registry_async(
+            app, self.thread_registry.set_abandoned_run, user_id, None)
+
+    def stream_ai_response(self, user_message, user_id=None):
+        """Stream the assistant's response as (event, data) tuples.
+
+        Yields ('delta', {'text': ...}) for each text fragment,
+        ('tool_call', {'names': [...]}) when the run calls functions and
+        finally ('done', {'response': full_text}).
+        """
+        faq_answer = self._answer_from_faq(user_message, user_id)
+        if faq_answer is not None:
+            yield 'delta', {'text': faq_answer}
+            yield 'done', {'response': faq_answer}
+            return
+
+        try:
+            if not self.circuit_breaker.allows_calls():
+                raise CircuitOpen()
+            yield from self._stream_assistant_response(user_message, user_id)
+        except CircuitOpen:
+            # raised before the run started, nothing was streamed yet
+            degraded = self._degraded_response(user_message)
+            yield 'delta', {'text': degraded}
+            yield 'done', {'response': degraded}
+
+    def _stream_assistant_response(self, user_message, user_id):
+        if not self.is_initialized:
+            with self.circuit_breaker.guard():
+                self.ensure_initialized()
+        budget = RunBudget(self.run_timeout)
+
+        if not user_id:
+            yield from self._stream_response(None, [user_message], budget)
+            return
+
+        future = self.conversation_queue.enqueue(user_id, user_message)
+        if self._wait_for_turn(user_id, future, budget) is not LEAD:
+            response = future.result()
+            yield 'delta', {'text': response}
+            yield 'done', {'response': response}
+            return
+
+        batch = self.conversation_queue.take_batch(user_id)
+        finished = False
+        try:
+            token = self.conversation_lock.acquire(user_id, budget)
+            try:
+                for event, data in self._stream_response(
+                        user_id, [message for message, _ in batch], budget):
+                    if event == 'done':
+                        self.conversation_queue.finish(
+                            user_id, batch, data['response'])
+                        finished = True
+                    yield event, data
+            finally:
+                self.conversation_lock.release(user_id, token)
+        except BaseException as e:
+            # GeneratorExit included, the client left before the reply
+            if not finished:
+                error = e if isinstance(e, Exception) else RuntimeError(
+                    "The previous message's response was abandoned.")
+                self.conversation_queue.finish(user_id, batch, error=error)
+            raise
+
+    def _stream_response(self, user_id, user_messages, budget):
+        thread = self._find_thread(user_id)
+        cache_key = None
+        if thread is None and len(user_messages) == 1:
+            cache_key = self._response_cache_key(user_messages[0])
+            cached_response = self._get_cached_response(cache_key)
+            if cached_response is not None:
+                if user_id:
+                    self._defer_reply(
+                        user_id, user_messages[0], cached_response)
+                yield 'delta', {'text': cached_response}
+                yield 'done', {'response': cached_response}
+                return
+
+        with self.circuit_breaker.guard():
+            response, used_tools = yield from self._stream_run(
+                user_id, thread, user_messages, budget)
+        self._cache_response(cache_key, response, used_tools)
+        yield 'done', {'response': response}
+
+    def _stream_run(self, user_id, thread, user_messages, budget):
+        """Yield the run's events, returns the reply and whether tools
+        ran"""
+        thread_id = self._open_thread(user_id, thread, budget)
+
+        # Add the user's messages to the thread
+        for user_message in user_messages:
+            self.client.beta.threads.messages.create(
+                thread_id=thread_id,
+                role="user",
+                content=user_message
+            )
+
+        stream = self._open_stream(
+            budget, self.client.beta.threads.runs.create,
+            thread_id=thread_id,
+            assistant_id=self.assistant.id,
+            additional_instructions=self._get_run_instructions()
+        )
+
+        response_parts = []
+        used_tools = False
+        run_id = None
+        tool_timings = []
+        started = time.perf_counter()
+
+        try:
+            while stream is not None:
+                action_run = None
+
+                with stream:
+                    for event in stream:
+                        budget.check()
+
+                        if event.event == 'thread.run.created':
+                            run_id = event.data.id
+
+                        elif event.event == 'thread.message.delta':
+                            for part in event.data.delta.content or []:
+                                if part.type == 'text' and part.text.value:
+                                    response_parts.append(part.text.value)
+                                    yield 'delta', {'text': part.text.value}
+
+                        elif event.event == 'thread.run.requires_action':
+                            action_run = event.data
+
+                        elif event.event == 'thread.run.completed':
+                            self._record_usage(
+                                event.data, thread_id, user_id,
+                                time.perf_counter() - started, tool_timings)
+
+                        elif event.event in ['thread.run.failed',
+                                             'thread.run.cancelled',
+                                             'thread.run.expired']:
+                            run = event.data
+                            self._record_usage(
+                                run, thread_id, user_id,
+                                time.perf_counter() - started, tool_timings)
+                            raise RunFailed(run)
+
+                stream = None
+                if action_run is not None:
+                    used_tools = True
+                    tool_calls = (
+                        action_run.required_action.submit_tool_outputs.tool_calls)
+                    yield 'tool_call', {
+                        'names': [call.function.name for call in tool_calls]
+                    }
+                    tool_outputs = self._get_tool_outputs(
+                        tool_calls, budget, tool_timings)
+
+                    # the run resumes on a new event stream
+                    runs = self.client.beta.threads.runs
+                    stream = self._open_stream(
+                        budget, runs.submit_tool_outputs,
+                        thread_id=thread_id,
+                        run_id=action_run.id,
+                        tool_outputs=tool_outputs
+                    )
+        except (RunTimeout, httpx.TimeoutException, GeneratorExit) as e:
+            # timed out, the stream stalled until the budget ran out or the
+            # client went away mid-stream, either way nobody will read the
+            # rest of this run
+            timed_out = not isinstance(e, GeneratorExit)
+            if timed_out:
+                self.run_metrics.record_timeout()
+            if run_id is not None:
+                self._record_usage(
+                    SimpleNamespace(id=run_id), thread_id, user_id,
+                    time.perf_counter() - started, tool_timings,
+                    status='timeout' if timed_out else 'abandoned')
+                self._cancel_run(user_id, thread_id, run_id)
+            if isinstance(e, httpx.TimeoutException):
+                raise RunTimeout() from e
+            raise
+
+        return ''.join(response_parts), used_tools
+
+    def _open_stream(self, budget, create, **kwargs):
+        """Start a streamed run request whose reads wait no longer than the
+        budget has left, polling checks the budget between requests but a
+        stream only sees it when an event arrives"""
+        budget.check()
+        try:
+            return create(
+                stream=True,
+                timeout=min(self.http_timeout, budget.remaining()),
+                **kwargs)
+        except APITimeoutError:
+            raise RunTimeout()
@@ -0,0 +1,141 @@
+from collections import OrderedDict
+from datetime import datetime, time as dt_time, timezone
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+import threading
+import time
+
+# session.info key holding the days touched by the current transaction
+_PENDING_DAYS_KEY = 'availability_cache_days'
+
+
+def as_utc(value):
+    """normalise naive (assumed UTC) or aware datetimes to aware UTC"""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def day_of(value):
+    """UTC calendar day a datetime falls on"""
+    return as_utc(value).date()
+
+
+def day_start(day):
+    """aware UTC midnight at the start of the given day"""
+    return datetime.combine(day, dt_time.min, tzinfo=timezone.utc)
+
+
+class AvailabilityCache:
+    """Per-day availability cache with TTL and LRU eviction.
+
+    Values are {start_time: (booked_count, capacity)} dicts for a single
+    UTC day.
+    Booking writes record the days they touch on the SQLAlchemy session and
+    those days are invalidated once the transaction commits.
+    """
+
+    def __init__(self, app=None):
+        self.ttl = 300
+        self.max_days = 366
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.ttl = app.config.get('AVAILABILITY_CACHE_TTL', self.ttl)
+        self.max_days = app.config.get(
+            'AVAILABILITY_CACHE_MAX_DAYS', self.max_days)
+        self.clear()
+
+    @property
+    def generation(self):
+        """incremented on every invalidation, used to drop stale fills"""
+        return self._generation
+
+    def get_many(self, days):
+        """return {day: counts} for the cached, unexpired days"""
+        now = time.monotonic()
+        found = {}
+        with self._lock:
+            for day in days:
+                entry = self._entries.get(day)
+                if entry is None:
+                    self.misses += 1
+                    continue
+                expires_at, counts = entry
+                if expires_at <= now:
+                    del self._entries[day]
+                    self.misses += 1
+                    continue
+                self._entries.move_to_end(day)
+                self.hits += 1
+                found[day] = counts
+        return found
+
+    def put_many(self, values, generation):
+        """store {day: counts} unless an invalidation happened since
+        the caller read the generation"""
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            if generation != self._generation:
+                return
+            for day, counts in values.items():
+                self._entries[day] = (expires_at, counts)
+                self._entries.move_to_end(day)
+            while len(self._entries) > self.max_days:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, days):
+        with self._lock:
+            self._generation += 1
+            for day in days:
+                self._entries.pop(day, None)
+
+    def invalidate_on_commit(self, session, start_times):
+        """invalidate the days of the given start times once the session's
+        transaction commits"""
+        pending = session.info.setdefault(_PENDING_DAYS_KEY, set())
+        pending.update(day_of(start_time) for start_time in start_times)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_days': self.max_days,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
+
+
+def _on_commit(session):
+    days = session.info.pop(_PENDING_DAYS_KEY, None)
+    if days:
+        from src import availability_cache
+        availability_cache.invalidate(days)
+
+
+def _on_rollback(session, previous_transaction):
+    session.info.pop(_PENDING_DAYS_KEY, None)
+
+
+event.listen(Session, 'after_commit', _on_commit)
+event.listen(Session, 'after_soft_rollback', _on_rollback)
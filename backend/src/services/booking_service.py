@@ -1,14 +1,15 @@
-from datetime import datetime, timezone
 from src.models.booking import Booking
 from src.services.user_service import UserService
 from src.services.timeslot_service import TimeslotService
-from src import db
+from src.services.email_outbox_service import EmailOutboxService
+from src import db, availability_cache
 
 
 class BookingService:
     def __init__(self):
         self.user_service = UserService()
         self.timeslot_service = TimeslotService()
+        self.email_outbox_service = EmailOutboxService()
 
     def create_booking(self, booking_data):
         """create booking with given data"""
@@ -25,14 +26,19 @@ class BookingService:
             booking = Booking(user=user)
             db.session.add(booking)
 
-            for timeslot_data in booking_data['timeslots']:
-                start_time = datetime.fromisoformat(
-                    timeslot_data['start_time']).astimezone(timezone.utc)
+            start_times = sorted(self.timeslot_service.get_start_times(
+                booking_data['timeslots']))
 
-                timeslot = self.timeslot_service.get_or_create_timeslot(
-                    start_time)
-                booking.timeslots.append(timeslot)
+            timeslots = self.timeslot_service.get_or_create_timeslots(
+                start_times)
+            self.timeslot_service.reserve_timeslots(timeslots)
+            booking.timeslots.extend(timeslots)
 
+            # confirmation email is sent by the outbox dispatcher after commit
+            self.email_outbox_service.enqueue_confirmation(booking)
+
+            availability_cache.invalidate_on_commit(
+                db.session, [ts.start_time for ts in booking.timeslots])
             db.session.commit()
             return booking
 
@@ -0,0 +1,141 @@
+from collections import deque
+from contextlib import contextmanager
+import threading
+import time
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpen(RuntimeError):
+    """Calls are not being made to a backend that keeps failing."""
+
+
+class CircuitBreaker:
+    """Stops calling a backend that keeps failing or answering slowly.
+
+    The outcomes of the last `window` calls are kept. With at least
+    `min_calls` of them, the circuit opens when `failure_rate` of them
+    failed or `slow_call_rate` took `slow_call_seconds` or longer, and
+    calls then raise CircuitOpen straight away. After `open_seconds` the
+    circuit is half open and lets `probes` calls through: it closes once
+    they all succeed and opens again as soon as one fails or is slow.
+    """
+
+    def __init__(self, window=20, min_calls=5, failure_rate=0.5,
+                 slow_call_seconds=15, slow_call_rate=0.5, open_seconds=30,
+                 probes=1, is_failure=None, clock=time.monotonic):
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate = slow_call_rate
+        self.open_seconds = open_seconds
+        self.probes = probes
+        # exceptions that don't count against the backend, e.g. the client
+        # going away, are passed through without recording a failure
+        self.is_failure = is_failure or (
+            lambda error: isinstance(error, Exception))
+        self.clock = clock
+        self.state = CLOSED
+        # (failed, slow) of the most recent calls
+        self._outcomes = deque(maxlen=window)
+        self._opened_at = None
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        self._lock = threading.Lock()
+        self.opened = 0
+        self.rejected = 0
+
+    def allows_calls(self):
+        """whether a call would be let through now, without taking a probe"""
+        with self._lock:
+            if self.state == OPEN:
+                return self.clock() - self._opened_at >= self.open_seconds
+            if self.state == HALF_OPEN:
+                return self._probes_in_flight < self.probes
+            return True
+
+    def acquire(self):
+        """raise CircuitOpen unless a call may be made, returns whether the
+        call is a half-open probe"""
+        with self._lock:
+            if self.state == OPEN:
+                if self.clock() - self._opened_at < self.open_seconds:
+                    self.rejected += 1
+                    raise CircuitOpen("The assistant is unavailable.")
+                self.state = HALF_OPEN
+                self._probes_in_flight = 0
+                self._probe_successes = 0
+            if self.state == HALF_OPEN:
+                if self._probes_in_flight >= self.probes:
+                    self.rejected += 1
+                    raise CircuitOpen("The assistant is unavailable.")
+                self._probes_in_flight += 1
+                return True
+            return False
+
+    def record(self, duration, failed=False, probe=False):
+        slow = duration >= self.slow_call_seconds
+        with self._lock:
+            if probe:
+                if self.state != HALF_OPEN:
+                    return
+                self._probes_in_flight -= 1
+                if failed or slow:
+                    self._open()
+                    return
+                self._probe_successes += 1
+                if self._probe_successes >= self.probes:
+                    self.state = CLOSED
+                    self._outcomes.clear()
+                return
+
+            # calls started before the circuit opened don't count
+            if self.state != CLOSED:
+                return
+            self._outcomes.append((failed, slow))
+            if len(self._outcomes) < self.min_calls:
+                return
+            failure_rate, slow_call_rate = self._rates()
+            if (failure_rate >= self.failure_rate
+                    or slow_call_rate >= self.slow_call_rate):
+                self._open()
+
+    def _rates(self):
+        calls = len(self._outcomes)
+        if not calls:
+            return 0.0, 0.0
+        return (sum(failed for failed, _ in self._outcomes) / calls,
+                sum(slow for _, slow in self._outcomes) / calls)
+
+    def _open(self):
+        self.state = OPEN
+        self._opened_at = self.clock()
+        self._outcomes.clear()
+        self.opened += 1
+
+    @contextmanager
+    def guard(self):
+        """record the outcome and duration of the calls made in the block"""
+        probe = self.acquire()
+        started = self.clock()
+        try:
+            yield
+        except BaseException as error:
+            self.record(self.clock() - started,
+                        failed=self.is_failure(error), probe=probe)
+            raise
+        self.record(self.clock() - started, probe=probe)
+
+    def stats(self):
+        with self._lock:
+            failure_rate, slow_call_rate = self._rates()
+            return {
+                'state': self.state,
+                'calls': len(self._outcomes),
+                'failure_rate': failure_rate,
+                'slow_call_rate': slow_call_rate,
+                'opened': self.opened,
+                'rejected': self.rejected
+            }
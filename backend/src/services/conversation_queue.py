@@ -0,0 +1,215 @@
+from concurrent.futures import Future, InvalidStateError
+from datetime import datetime, timedelta, timezone
+import threading
+import time
+import uuid
+from src.services.run_polling import PollBackoff, RunTimeout
+
+# result of a queued message's future when its caller should run the next
+# batch of the conversation's messages itself
+LEAD = object()
+
+
+class ConversationBusy(RuntimeError):
+    """Too many of a conversation's messages are waiting for a reply."""
+
+
+class _Conversation:
+    def __init__(self):
+        self.pending = []
+        self.running = False
+
+
+class ConversationQueue:
+    """Runs one assistant run at a time per conversation in this process.
+
+    Every message is queued with a future. The caller whose future resolves
+    to LEAD takes the queued messages with take_batch(), answers them with
+    one run and passes the reply to finish(), which resolves the other
+    callers' futures with it and hands LEAD to the next queued message.
+    Messages sent while a run is in flight are therefore answered together
+    by the next run instead of failing against the active run.
+    """
+
+    def __init__(self, max_pending=5):
+        self.max_pending = max_pending
+        self._conversations = {}
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.coalesced = 0
+        self.rejected = 0
+
+    def enqueue(self, key, message):
+        future = Future()
+        with self._lock:
+            conversation = self._conversations.setdefault(
+                key, _Conversation())
+            if len(conversation.pending) >= self.max_pending:
+                self.rejected += 1
+                raise ConversationBusy(
+                    "Too many messages are waiting for a reply, please "
+                    "wait for the assistant to answer.")
+            conversation.pending.append((message, future))
+            if not conversation.running:
+                conversation.running = True
+                future.set_result(LEAD)
+        return future
+
+    def take_batch(self, key):
+        """queued (message, future) pairs for the leader to answer"""
+        with self._lock:
+            conversation = self._conversations[key]
+            batch = conversation.pending
+            conversation.pending = []
+            self.batches += 1
+            self.coalesced += len(batch) - 1
+        return batch
+
+    def finish(self, key, batch, reply=None, error=None):
+        """resolve the batch's futures and let the next message lead"""
+        for _, future in batch:
+            if future.done():
+                continue
+            try:
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(reply)
+            except InvalidStateError:
+                # cancelled by a caller that stopped waiting
+                pass
+        with self._lock:
+            self._hand_over(key)
+
+    def withdraw(self, key, future):
+        """drop the message of a caller that stopped waiting for a reply"""
+        with self._lock:
+            conversation = self._conversations.get(key)
+            if conversation is None:
+                return
+            conversation.pending = [
+                (message, queued) for message, queued in conversation.pending
+                if queued is not future]
+            # it was made leader just as it gave up, pass that on
+            if (future.done() and not future.cancelled()
+                    and future.result() is LEAD):
+                self._hand_over(key)
+
+    def _hand_over(self, key):
+        conversation = self._conversations[key]
+        while conversation.pending:
+            message, future = conversation.pending[0]
+            try:
+                future.set_result(LEAD)
+                return
+            except InvalidStateError:
+                conversation.pending.pop(0)
+        conversation.running = False
+        del self._conversations[key]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'conversations': len(self._conversations),
+                'pending': sum(len(conversation.pending) for conversation
+                               in self._conversations.values()),
+                'max_pending': self.max_pending,
+                'batches': self.batches,
+                'coalesced': self.coalesced,
+                'rejected': self.rejected
+            }
+
+
+class ConversationLock:
+    """Serialises a conversation's runs across processes."""
+
+    uses_database = False
+
+    def acquire(self, key, budget):
+        """wait for the conversation, returns a token for release()"""
+        return None
+
+    def release(self, key, token):
+        pass
+
+
+class DatabaseConversationLock(ConversationLock):
+    """Lease on a conversation_lock row, shared by every worker.
+
+    A lease expires after `lease` seconds so a worker that dies mid-run
+    doesn't lock the conversation forever.
+    """
+
+    uses_database = True
+
+    def __init__(self, lease=60):
+        self.lease = lease
+
+    def acquire(self, key, budget):
+        token = uuid.uuid4().hex
+        backoff = PollBackoff(initial_delay=0.05, max_delay=0.5)
+        while not self._try_acquire(key, token):
+            if budget.expired():
+                raise RunTimeout("Timeout waiting for the previous message "
+                                 "to be answered.")
+            time.sleep(min(backoff.next_delay(), budget.remaining()))
+        return token
+
+    def _try_acquire(self, key, token):
+        from sqlalchemy.exc import IntegrityError
+        from src.models.conversation_lease import ConversationLease
+        from src.services.timeslot_service import UPSERT_INSERTS
+        from src import db
+
+        now = datetime.now(timezone.utc)
+        values = {
+            'conversation_key': str(key),
+            'owner': token,
+            'expires_at': now + timedelta(seconds=self.lease)
+        }
+        insert = UPSERT_INSERTS.get(db.session.get_bind().dialect.name)
+        if insert is not None:
+            # take the row when it is missing or its lease has run out
+            statement = insert(ConversationLease).values(**values)
+            result = db.session.execute(statement.on_conflict_do_update(
+                index_elements=[ConversationLease.conversation_key],
+                set_={
+                    'owner': statement.excluded.owner,
+                    'expires_at': statement.excluded.expires_at
+                },
+                where=ConversationLease.expires_at <= now
+            ))
+            db.session.commit()
+            return result.rowcount == 1
+
+        try:
+            db.session.add(ConversationLease(**values))
+            db.session.commit()
+            return True
+        except IntegrityError:
+            db.session.rollback()
+        updated = ConversationLease.query.filter(
+            ConversationLease.conversation_key == str(key),
+            ConversationLease.expires_at <= now
+        ).update({'owner': token, 'expires_at': values['expires_at']})
+        db.session.commit()
+        return updated == 1
+
+    def release(self, key, token):
+        from src.models.conversation_lease import ConversationLease
+        from src import db
+
+        ConversationLease.query.filter_by(
+            conversation_key=str(key), owner=token).delete()
+        db.session.commit()
+
+
+def create_conversation_lock(config):
+    """build the lock selected by AI_CONVERSATION_LOCK"""
+    backend = config.get('AI_CONVERSATION_LOCK', 'local')
+    if backend == 'database':
+        return DatabaseConversationLock(
+            lease=config.get('AI_CONVERSATION_LOCK_LEASE', 60))
+    if backend == 'local':
+        return ConversationLock()
+    raise ValueError(f"Unknown conversation lock: {backend}")
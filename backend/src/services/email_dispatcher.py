@@ -0,0 +1,75 @@
+import threading
+
+
+class EmailDispatcher:
+    """Drains the email outbox from a background thread.
+
+    Emails are written to the outbox in the same transaction as the booking,
+    so requests only wait for the commit. The thread wakes when notified of
+    new emails and otherwise polls for due retries.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.enabled = True
+        self.poll_interval = 30
+        self._outbox_service = None
+        self._thread = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.enabled = app.config.get('EMAIL_OUTBOX_DISPATCH', True)
+        self.poll_interval = app.config.get(
+            'EMAIL_OUTBOX_POLL_INTERVAL', self.poll_interval)
+
+        # start with the first request rather than at app creation so CLI
+        # commands such as `flask db upgrade` don't spawn the thread
+        app.before_request(self.start)
+
+    def notify(self):
+        """wake the dispatcher after new emails were committed"""
+        self.start()
+        self._wake.set()
+
+    def start(self):
+        if not self.enabled or self.app is None:
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, name='email-dispatcher', daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        from src.services.email_outbox_service import EmailOutboxService
+        from src import db
+
+        if self._outbox_service is None:
+            self._outbox_service = EmailOutboxService()
+        batch_size = self.app.config.get('EMAIL_OUTBOX_BATCH_SIZE')
+
+        while not self._stop.is_set():
+            self._wake.clear()
+            with self.app.app_context():
+                try:
+                    # keep draining while full batches come back
+                    while self._outbox_service.dispatch_due() == batch_size:
+                        pass
+                except Exception:
+                    self.app.logger.exception('Email outbox dispatch failed')
+                finally:
+                    db.session.remove()
+            self._wake.wait(self.poll_interval)
@@ -0,0 +1,78 @@
+from datetime import datetime, timedelta, timezone
+from flask import current_app
+from src.models.email_outbox import OutboxEmail, OutboxStatus
+from src.services.email_service import EmailService
+from src import db
+
+BOOKING_CONFIRMATION = 'booking_confirmation'
+
+
+class EmailOutboxService:
+    def __init__(self):
+        self.email_service = EmailService()
+
+    def enqueue_confirmation(self, booking):
+        """add booking confirmation to the outbox (sent after commit)"""
+        email = OutboxEmail(
+            kind=BOOKING_CONFIRMATION,
+            payload={
+                'email': booking.user.email,
+                'booking_date': booking.date.isoformat(),
+                'booking_time': booking.time_range
+            }
+        )
+        db.session.add(email)
+        return email
+
+    def dispatch_due(self):
+        """send one batch of due outbox emails, return number handled"""
+        config = current_app.config
+        now = datetime.now(timezone.utc)
+
+        # SKIP LOCKED lets dispatchers in other workers take other rows
+        emails = OutboxEmail.query.filter(
+            OutboxEmail.status == OutboxStatus.PENDING,
+            OutboxEmail.next_attempt_at <= now
+        ).order_by(
+            OutboxEmail.next_attempt_at
+        ).limit(
+            config['EMAIL_OUTBOX_BATCH_SIZE']
+        ).with_for_update(skip_locked=True).all()
+
+        # reuse one SMTP connection for the whole batch
+        with self.email_service.pooled_sender() as sender:
+            for email in emails:
+                self._deliver(sender, email, now)
+
+        db.session.commit()
+        return len(emails)
+
+    def _deliver(self, sender, email, now):
+        """send one outbox email, scheduling a retry if it fails"""
+        config = current_app.config
+        try:
+            sender.send(self._build_message(email))
+            email.status = OutboxStatus.SENT
+            email.sent_at = now
+            email.last_error = None
+        except Exception as e:
+            email.attempts += 1
+            email.last_error = str(e)[:500]
+            if email.attempts >= config['EMAIL_OUTBOX_MAX_ATTEMPTS']:
+                email.status = OutboxStatus.FAILED
+            else:
+                email.next_attempt_at = now + self._retry_delay(
+                    email.attempts)
+
+    def _retry_delay(self, attempts):
+        """exponential backoff capped at EMAIL_OUTBOX_MAX_BACKOFF"""
+        config = current_app.config
+        return timedelta(seconds=min(
+            config['EMAIL_OUTBOX_MAX_BACKOFF'],
+            config['EMAIL_OUTBOX_BACKOFF'] * 2 ** (attempts - 1)
+        ))
+
+    def _build_message(self, email):
+        if email.kind == BOOKING_CONFIRMATION:
+            return self.email_service.build_confirmation(**email.payload)
+        raise ValueError(f"Unknown outbox email kind: {email.kind}")
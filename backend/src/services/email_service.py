@@ -1,7 +1,65 @@
 from flask import current_app
 from flask_mail import Message
-from ics import Calendar, Event
 from datetime import datetime, timezone
+import smtplib
+from src.services.ics_renderer import IcsRenderer
+
+# errors meaning the SMTP connection itself is unusable
+CONNECTION_ERRORS = (
+    smtplib.SMTPServerDisconnected,
+    smtplib.SMTPConnectError,
+    ConnectionError,
+    TimeoutError
+)
+
+
+class PooledSender:
+    """Sends messages over one reused SMTP connection.
+
+    The connection is opened on the first message, recycled by Flask-Mail
+    every MAIL_MAX_EMAILS messages and reopened once if the server drops it
+    mid-batch.
+    """
+
+    def __init__(self, mail):
+        self.mail = mail
+        self.connection = None
+        self.connections_opened = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.close()
+
+    def send(self, message):
+        try:
+            self._get_connection().send(message)
+        except CONNECTION_ERRORS:
+            # stale or dropped connection, retry once on a fresh one
+            self._discard()
+            self._get_connection().send(message)
+
+    def close(self):
+        connection, self.connection = self.connection, None
+        if connection is not None:
+            try:
+                connection.__exit__(None, None, None)
+            except (smtplib.SMTPException, OSError):
+                pass
+
+    def _get_connection(self):
+        if self.connection is None:
+            connection = self.mail.connect()
+            connection.__enter__()
+            self.connection = connection
+            self.connections_opened += 1
+        return self.connection
+
+    def _discard(self):
+        connection, self.connection = self.connection, None
+        if connection is not None and connection.host is not None:
+            connection.host.close()
 
 
 class EmailService:
@@ -13,6 +71,8 @@ class EmailService:
 
     def __init__(self):
         self.mail = None
+        self.ics_renderer = None
+        self.ics_renderer_email = None
 
     def _get_mail(self):
         """get mail instance from current app context"""
@@ -22,27 +82,24 @@ class EmailService:
                 raise RuntimeError("Mail extension not initialized")
         return self.mail
 
-    def _create_calendar_event(self, email, start_time, end_time):
-        """generate .ics file"""
-        c = Calendar()
-        e = Event()
-        e.name = "Dialogue Cafe Booking"
-        e.begin = start_time
-        e.end = end_time
-        e.location = self.LOCATION
-        e.description = "Your booking at Dialogue Cafe is confirmed!"
-
+    def _get_ics_renderer(self):
+        """get invitation renderer for the configured organizer address"""
         organizer_email = current_app.config['MAIL_USERNAME']
-        e.organizer = f"{self.ORGANIZER_NAME};mailto:{organizer_email}"
-        e.attendees = [f"mailto:{email}"]
-
-        c.events.add(e)
-        return c
+        if (self.ics_renderer is None
+                or self.ics_renderer_email != organizer_email):
+            self.ics_renderer = IcsRenderer(
+                summary="Dialogue Cafe Booking",
+                description="Your booking at Dialogue Cafe is confirmed!",
+                location=self.LOCATION,
+                organizer_name=self.ORGANIZER_NAME,
+                organizer_email=organizer_email
+            )
+            self.ics_renderer_email = organizer_email
+        return self.ics_renderer
 
-    def _format_calendar_content(self, calendar):
-        """format calendar content with METHOD:REQUEST"""
-        ics_content = calendar.serialize().replace("\n", "\r\n")
-        return f"BEGIN:VCALENDAR\r\nMETHOD:REQUEST\r\n{ics_content[13:]}"
+    def _create_calendar_event(self, email, start_time, end_time):
+        """generate .ics file content"""
+        return self._get_ics_renderer().render(email, start_time, end_time)
 
     def _create_email_body(self, booking_date, booking_time,
                            start_time, end_time):
@@ -63,49 +120,43 @@ class EmailService:
         - Apple Calendar: See attached .ics file
         """
 
-    def send_confirmation(self, email, booking_date, booking_time):
-        """send booking confirmation email"""
-        try:
-            if not all([email, booking_date, booking_time]):
-                raise ValueError("Missing required parameters")
-
-            # parse date and time
-            start_time = datetime.strptime(
-                f"{booking_date} {booking_time['start']}",
-                "%Y-%m-%d %H:%M"
-            ).replace(tzinfo=timezone.utc)
-            end_time = datetime.strptime(
-                f"{booking_date} {booking_time['end']}",
-                "%Y-%m-%d %H:%M"
-            ).replace(tzinfo=timezone.utc)
-
-            # create calendar event
-            calendar = self._create_calendar_event(email, start_time, end_time)
-            ics_content = self._format_calendar_content(calendar)
-
-            # create email message
-            msg = Message(
-                'Dialogue Cafe Booking Confirmation',
-                sender=current_app.config['MAIL_USERNAME'],
-                recipients=[email]
-            )
-
-            msg.body = self._create_email_body(
-                booking_date, booking_time, start_time, end_time
-            )
-
-            # attach calendar invitation
-            msg.attach(
-                "booking.ics",
-                "text/calendar; charset=UTF-8; method=REQUEST",
-                ics_content
-            )
-
-            # send email
-            self._get_mail().send(msg)
-            return True
-
-        except ValueError as e:
-            raise ValueError(str(e))
-        except Exception as e:
-            raise RuntimeError(f"Email service error: {str(e)}")
+    def build_confirmation(self, email, booking_date, booking_time):
+        """build booking confirmation message with calendar invitation"""
+        if not all([email, booking_date, booking_time]):
+            raise ValueError("Missing required parameters")
+
+        # parse date and time
+        start_time = datetime.strptime(
+            f"{booking_date} {booking_time['start']}",
+            "%Y-%m-%d %H:%M"
+        ).replace(tzinfo=timezone.utc)
+        end_time = datetime.strptime(
+            f"{booking_date} {booking_time['end']}",
+            "%Y-%m-%d %H:%M"
+        ).replace(tzinfo=timezone.utc)
+
+        # create calendar event
+        ics_content = self._create_calendar_event(email, start_time, end_time)
+
+        # create email message
+        msg = Message(
+            'Dialogue Cafe Booking Confirmation',
+            sender=current_app.config['MAIL_USERNAME'],
+            recipients=[email]
+        )
+
+        msg.body = self._create_email_body(
+            booking_date, booking_time, start_time, end_time
+        )
+
+        # attach calendar invitation
+        msg.attach(
+            "booking.ics",
+            "text/calendar; charset=UTF-8; method=REQUEST",
+            ics_content
+        )
+        return msg
+
+    def pooled_sender(self):
+        """sender reusing one SMTP connection across messages"""
+        return PooledSender(self._get_mail())
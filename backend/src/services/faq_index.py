@@ -0,0 +1,115 @@
+from collections import Counter
+import math
+import re
+import threading
+import unicodedata
+
+STOP_WORDS = frozenset("""
+a an the and or of to in on at for with from by about is are was be do does
+did can could would should will i me my we our you your it its this that
+there any some if as so just please hi hello hey have
+""".split())
+
+
+def tokenize(text):
+    """lowercase, accent-free word stems with stop words removed"""
+    text = unicodedata.normalize('NFKD', text)
+    text = text.encode('ascii', 'ignore').decode().lower()
+    # wi-fi and wifi, take-away and takeaway are the same word
+    text = re.sub(r"(?<=[a-z])-(?=[a-z])", "", text)
+    tokens = []
+    for word in re.findall(r"[a-z0-9]+", text):
+        if word in STOP_WORDS:
+            continue
+        if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+            word = word[:-1]
+        tokens.append(word)
+    return tokens
+
+
+class FaqIndex:
+    """TF-IDF index over FAQ questions for answering them without the LLM.
+
+    match() returns the answer of the closest question when its cosine
+    similarity is at least min_score and beats the runner-up by min_margin,
+    otherwise None so the message goes to the assistant.
+    """
+
+    def __init__(self, faq_responses, min_score=0.5, min_margin=0.15):
+        self.min_score = min_score
+        self.min_margin = min_margin
+        # answers of "." are section headings, not questions
+        self.entries = [(question, answer)
+                        for question, answer in faq_responses
+                        if answer != "."]
+
+        documents = [Counter(tokenize(question))
+                     for question, _ in self.entries]
+        document_frequency = Counter()
+        for terms in documents:
+            document_frequency.update(terms.keys())
+        total = len(documents)
+        self.idf = {
+            term: math.log((1 + total) / (1 + count)) + 1
+            for term, count in document_frequency.items()
+        }
+        # words no question uses count as the rarest term, so a message
+        # about something else scores low rather than being ignored
+        self.unknown_idf = math.log(1 + total) + 1
+        self.vectors = [self._vector(terms) for terms in documents]
+
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.hits = 0
+
+    def _vector(self, terms):
+        vector = {
+            term: (1 + math.log(count)) * self.idf.get(term, self.unknown_idf)
+            for term, count in terms.items()
+        }
+        norm = math.sqrt(sum(weight * weight for weight in vector.values()))
+        if not norm:
+            return {}
+        return {term: weight / norm for term, weight in vector.items()}
+
+    def scores(self, text):
+        """(similarity, question, answer) for every entry, best first"""
+        query = self._vector(Counter(tokenize(text)))
+        scored = [
+            (sum(weight * vector.get(term, 0.0)
+                 for term, weight in query.items()), question, answer)
+            for vector, (question, answer) in zip(self.vectors, self.entries)
+        ]
+        return sorted(scored, key=lambda entry: entry[0], reverse=True)
+
+    def match(self, text):
+        scored = self.scores(text)
+        best = scored[0][0] if scored else 0.0
+        runner_up = scored[1][0] if len(scored) > 1 else 0.0
+        answer = None
+        if best >= self.min_score and best - runner_up >= self.min_margin:
+            answer = scored[0][2]
+
+        with self._lock:
+            self.lookups += 1
+            if answer is not None:
+                self.hits += 1
+        return answer
+
+    def suggest(self, text, limit=2, min_score=0.2):
+        """(question, answer) of the closest questions, for when the
+        assistant can't answer and a loose match beats nothing"""
+        return [(question, answer)
+                for score, question, answer in self.scores(text)[:limit]
+                if score >= min_score]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self.entries),
+                'min_score': self.min_score,
+                'min_margin': self.min_margin,
+                'lookups': self.lookups,
+                'hits': self.hits,
+                'hit_rate': self.hits / self.lookups if self.lookups else 0.0
+            }
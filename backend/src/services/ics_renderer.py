@@ -0,0 +1,106 @@
+from datetime import datetime, timezone
+import uuid
+
+CRLF = "\r\n"
+# RFC 5545 3.1: content lines are folded at 75 octets
+MAX_LINE_OCTETS = 75
+UTC_FORMAT = "%Y%m%dT%H%M%SZ"
+
+
+def escape_text(value):
+    """escape a TEXT property value (RFC 5545 3.3.11)"""
+    return (
+        value.replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+    )
+
+
+def escape_param(value):
+    """quote a parameter value containing separators (RFC 5545 3.2)"""
+    value = value.replace('"', "'")
+    if any(char in value for char in ':;,'):
+        return f'"{value}"'
+    return value
+
+
+def fold_line(line):
+    """fold a content line at 75 octets without splitting UTF-8 characters"""
+    if len(line.encode("utf-8")) <= MAX_LINE_OCTETS:
+        return line
+    parts = []
+    current = ""
+    size = 0
+    for char in line:
+        octets = len(char.encode("utf-8"))
+        if size + octets > MAX_LINE_OCTETS:
+            parts.append(current)
+            # continuation lines start with a space that counts to the limit
+            current = " "
+            size = 1
+        current += char
+        size += octets
+    parts.append(current)
+    return CRLF.join(parts)
+
+
+def format_utc(value):
+    """format an aware datetime as an RFC 5545 UTC DATE-TIME"""
+    return value.astimezone(timezone.utc).strftime(UTC_FORMAT)
+
+
+class IcsRenderer:
+    """Renders single-event METHOD:REQUEST invitations.
+
+    Everything that is the same for every booking (summary, location,
+    organizer, ...) is escaped and folded once when the renderer is built,
+    so rendering an invitation only formats the per-booking lines.
+    """
+
+    PRODID = "-//Dialogue Cafe//Booking Confirmation//EN"
+
+    def __init__(self, summary, description, location, organizer_name,
+                 organizer_email, uid_domain="dialoguecafe"):
+        self.uid_domain = uid_domain
+        self._head = CRLF.join([
+            "BEGIN:VCALENDAR",
+            "VERSION:2.0",
+            f"PRODID:{self.PRODID}",
+            "METHOD:REQUEST",
+            "BEGIN:VEVENT",
+        ]) + CRLF
+        self._event_lines = CRLF.join([
+            fold_line(f"SUMMARY:{escape_text(summary)}"),
+            fold_line(f"DESCRIPTION:{escape_text(description)}"),
+            fold_line(f"LOCATION:{escape_text(location)}"),
+            fold_line(
+                f"ORGANIZER;CN={escape_param(organizer_name)}"
+                f":mailto:{organizer_email}"
+            ),
+        ]) + CRLF
+        self._tail = CRLF.join([
+            "STATUS:CONFIRMED",
+            "END:VEVENT",
+            "END:VCALENDAR",
+        ]) + CRLF
+
+    def render(self, attendee_email, start_time, end_time,
+               uid=None, dtstamp=None):
+        """render the invitation for one attendee as a CRLF string"""
+        uid = uid or f"{uuid.uuid4()}@{self.uid_domain}"
+        dtstamp = dtstamp or datetime.now(timezone.utc)
+        return "".join([
+            self._head,
+            fold_line(f"UID:{uid}"), CRLF,
+            "DTSTAMP:", format_utc(dtstamp), CRLF,
+            "DTSTART:", format_utc(start_time), CRLF,
+            "DTEND:", format_utc(end_time), CRLF,
+            self._event_lines,
+            fold_line(
+                "ATTENDEE;ROLE=REQ-PARTICIPANT;PARTSTAT=NEEDS-ACTION;"
+                f"RSVP=TRUE:mailto:{attendee_email}"
+            ), CRLF,
+            self._tail,
+        ])
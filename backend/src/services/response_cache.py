@@ -0,0 +1,82 @@
+from collections import OrderedDict
+import re
+import threading
+import time
+import unicodedata
+
+# replies that talk about bookings or availability depend on the timetable
+STATEFUL_REPLY = re.compile(r"\b(book|availab|timeslot|slot)", re.IGNORECASE)
+
+
+def normalize_message(text):
+    """case, accent, punctuation and whitespace insensitive message text"""
+    text = unicodedata.normalize('NFKD', text)
+    text = text.encode('ascii', 'ignore').decode().lower()
+    return " ".join(re.findall(r"[a-z0-9]+", text))
+
+
+class ResponseCache:
+    """Assistant replies to first messages, with LRU eviction and a TTL.
+
+    Only replies produced without tool calls are stored, and replies that
+    mention bookings or availability are skipped, so cached answers never
+    depend on the booking state.
+    """
+
+    def __init__(self, max_entries=1000, ttl=3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.skipped = 0
+        self.evictions = 0
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, response):
+        """store the reply, returns False when it isn't cacheable"""
+        with self._lock:
+            if not response or STATEFUL_REPLY.search(response):
+                self.skipped += 1
+                return False
+            self._entries[key] = (time.monotonic() + self.ttl, response)
+            self._entries.move_to_end(key)
+            self.stores += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            return True
+
+    def skip(self):
+        """count a reply that wasn't offered to the cache"""
+        with self._lock:
+            self.skipped += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'stores': self.stores,
+                'skipped': self.skipped,
+                'evictions': self.evictions
+            }
@@ -0,0 +1,133 @@
+from collections import deque
+import random
+import threading
+import time
+
+# run statuses after which the thread accepts new messages and runs
+FINISHED_STATUSES = {'completed', 'failed', 'cancelled', 'expired',
+                     'incomplete'}
+
+
+class RunTimeout(RuntimeError):
+    """The request's latency budget ran out before the run finished."""
+
+    def __init__(self, message="Timeout waiting for assistant response."):
+        super().__init__(message)
+
+
+class RunFailed(RuntimeError):
+    """The run ended without a reply, `code` is its last_error code."""
+
+    def __init__(self, run):
+        message = f"Assistant run failed with status: {run.status}"
+        last_error = getattr(run, 'last_error', None)
+        if last_error:
+            message += f" - {last_error}"
+        super().__init__(message)
+        self.status = run.status
+        self.code = getattr(last_error, 'code', None)
+
+
+class RunBudget:
+    """Time left for one chat request, shared by polling and tool calls."""
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.deadline = time.monotonic() + seconds
+
+    def remaining(self):
+        return max(0.0, self.deadline - time.monotonic())
+
+    def expired(self):
+        return self.remaining() <= 0
+
+    def check(self):
+        """raise RunTimeout when the budget has run out"""
+        if self.expired():
+            raise RunTimeout()
+
+
+class PollBackoff:
+    """Delays between runs.retrieve calls while waiting on an assistant run.
+
+    Starts with a short delay and grows it exponentially up to max_delay.
+    Each delay is reduced by a random fraction of up to `jitter` so runs
+    started together don't poll in lockstep. Call reset() when the run
+    changes status so the next change is picked up quickly.
+    """
+
+    def __init__(self, initial_delay=0.2, max_delay=0.5, multiplier=2.0,
+                 jitter=0.2):
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+        self.jitter = jitter
+        self._delay = initial_delay
+
+    def reset(self):
+        self._delay = self.initial_delay
+
+    def next_delay(self):
+        delay = self._delay
+        self._delay = min(self.max_delay, self._delay * self.multiplier)
+        return delay * (1 - self.jitter * random.random())
+
+
+class RunMetrics:
+    """Polls used and end-to-end latency of recent assistant runs, and how
+    many runs timed out and were cancelled."""
+
+    def __init__(self, window=1000):
+        self._runs = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.total_runs = 0
+        self.total_polls = 0
+        self.timeouts = 0
+        self.cancellations = 0
+        self.cancellations_pending = 0
+
+    def record(self, polls, latency):
+        with self._lock:
+            self._runs.append((polls, latency))
+            self.total_runs += 1
+            self.total_polls += polls
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def record_cancellation(self, finished):
+        """count a cancelled run, finished is False when it was still
+        active once the cancel grace period ran out"""
+        with self._lock:
+            if finished:
+                self.cancellations += 1
+            else:
+                self.cancellations_pending += 1
+
+    def stats(self):
+        with self._lock:
+            runs = list(self._runs)
+            total_runs = self.total_runs
+            total_polls = self.total_polls
+            counters = {
+                'timeouts': self.timeouts,
+                'cancellations': self.cancellations,
+                'cancellations_pending': self.cancellations_pending
+            }
+        latencies = sorted(latency for _, latency in runs)
+        return {
+            'runs': total_runs,
+            'polls': total_polls,
+            'polls_per_run': total_polls / total_runs if total_runs else 0.0,
+            'latency_p50': _percentile(latencies, 50),
+            'latency_p95': _percentile(latencies, 95),
+            **counters
+        }
+
+
+def _percentile(ordered, pct):
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))
+    return ordered[index]
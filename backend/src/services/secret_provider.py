@@ -0,0 +1,271 @@
+from abc import ABC, abstractmethod
+from azure.identity import DefaultAzureCredential
+from azure.keyvault.secrets import SecretClient
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class SecretNotFound(KeyError):
+    """The provider has no secret with the given name."""
+
+
+class SecretProvider(ABC):
+    """Looks up secrets such as API keys by name."""
+
+    @abstractmethod
+    def get_secret(self, name):
+        """value of the named secret, SecretNotFound if there is none"""
+
+    def subscribe(self, callback):
+        """call callback(name, value) when a secret's value changes, only
+        providers that refresh secrets ever call it"""
+
+
+class KeyVaultSecretProvider(SecretProvider):
+    """Secrets stored in Azure Key Vault.
+
+    The credential and client are built on the first lookup, credential
+    discovery can take seconds.
+    """
+
+    def __init__(self, vault_name):
+        self.vault_url = f"https://{vault_name}.vault.azure.net"
+        self._client = None
+        self._lock = threading.Lock()
+
+    def get_secret(self, name):
+        return self._get_client().get_secret(name).value
+
+    def _get_client(self):
+        with self._lock:
+            if self._client is None:
+                self._client = SecretClient(
+                    vault_url=self.vault_url,
+                    credential=DefaultAzureCredential())
+            return self._client
+
+
+class EnvironmentSecretProvider(SecretProvider):
+    """Secrets in environment variables, `openai-api-key` is read from
+    OPENAI_API_KEY"""
+
+    def __init__(self, environ=None):
+        self.environ = os.environ if environ is None else environ
+
+    def get_secret(self, name):
+        variable = name.upper().replace('-', '_')
+        value = self.environ.get(variable)
+        if value is None:
+            raise SecretNotFound(
+                f"Secret {name} not found, set {variable}")
+        return value
+
+
+class FileSecretProvider(SecretProvider):
+    """Secrets in a JSON file of name -> value, for local development"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def get_secret(self, name):
+        # read on every lookup so edits are picked up by the next refresh
+        try:
+            with open(self.path) as secrets_file:
+                secrets = json.load(secrets_file)
+        except FileNotFoundError:
+            raise SecretNotFound(
+                f"Secret {name} not found, {self.path} does not exist")
+        if name not in secrets:
+            raise SecretNotFound(f"Secret {name} not found in {self.path}")
+        return secrets[name]
+
+
+class _CachedSecret:
+    def __init__(self, value, expires_at, refresh_at):
+        self.value = value
+        self.expires_at = expires_at
+        self.refresh_at = refresh_at
+
+
+class CachedSecretProvider(SecretProvider):
+    """Caches another provider's secrets and refreshes them in the
+    background.
+
+    Only the first lookup of a secret waits for the provider. A daemon
+    thread, started by that lookup, fetches it again `refresh_ahead`
+    seconds before it expires, so a rotated secret is picked up within
+    `ttl` seconds without any request waiting. Subscribers are told when
+    a refresh returns a new value. A failed refresh is retried every
+    `retry_interval` seconds and the cached value is kept. A secret is
+    only fetched on the request path again once it has expired, and the
+    expired value is still returned if that fetch fails.
+
+    `refresh_ahead` is capped at half the TTL and the thread waits at least
+    `min_refresh_interval` seconds after refreshing, so a short TTL can't
+    make it fetch in a tight loop.
+    """
+
+    def __init__(self, provider, ttl=900, refresh_ahead=120,
+                 retry_interval=30, min_refresh_interval=1,
+                 clock=time.monotonic):
+        self.provider = provider
+        self.ttl = ttl
+        self.refresh_ahead = min(refresh_ahead, ttl / 2)
+        self.retry_interval = retry_interval
+        self.min_refresh_interval = min_refresh_interval
+        self.clock = clock
+        self._secrets = {}
+        self._callbacks = []
+        self._lock = threading.Lock()
+        self._fetch_locks = {}
+        self._thread = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.refresh_failures = 0
+        self.changes = 0
+
+    def get_secret(self, name):
+        with self._lock:
+            cached = self._secrets.get(name)
+            if cached is not None and cached.expires_at > self.clock():
+                self.hits += 1
+                return cached.value
+            self.misses += 1
+            fetch_lock = self._fetch_locks.setdefault(name, threading.Lock())
+
+        # one fetch per secret, concurrent lookups wait for it
+        with fetch_lock:
+            with self._lock:
+                cached = self._secrets.get(name)
+                if cached is not None and cached.expires_at > self.clock():
+                    return cached.value
+            try:
+                self._fetch(name)
+            except Exception:
+                if cached is None:
+                    raise
+                # the expired value beats failing the request, the key
+                # is most likely still valid
+                logger.exception('Fetching secret %s failed', name)
+                return cached.value
+            self._start()
+            return self._secrets[name].value
+
+    def subscribe(self, callback):
+        self._callbacks.append(callback)
+
+    def refresh(self, name):
+        """fetch the secret again now, returns whether that succeeded"""
+        try:
+            self._fetch(name)
+        except Exception:
+            logger.exception('Refreshing secret %s failed', name)
+            with self._lock:
+                self.refresh_failures += 1
+                cached = self._secrets.get(name)
+                if cached is not None:
+                    cached.refresh_at = self.clock() + self.retry_interval
+            return False
+        with self._lock:
+            self.refreshes += 1
+        return True
+
+    def _fetch(self, name):
+        value = self.provider.get_secret(name)
+        now = self.clock()
+        with self._lock:
+            previous = self._secrets.get(name)
+            self._secrets[name] = _CachedSecret(
+                value, now + self.ttl, now + self.ttl - self.refresh_ahead)
+            changed = previous is not None and previous.value != value
+            if changed:
+                self.changes += 1
+        self._wake.set()
+        if changed:
+            for callback in list(self._callbacks):
+                try:
+                    callback(name, value)
+                except Exception:
+                    logger.exception('Secret %s change callback failed', name)
+
+    def _start(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, name='secret-refresh', daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.clear()
+            now = self.clock()
+            with self._lock:
+                due = [name for name, cached in self._secrets.items()
+                       if cached.refresh_at <= now]
+                next_refresh = min(
+                    (cached.refresh_at for cached in self._secrets.values()),
+                    default=None)
+            for name in due:
+                self.refresh(name)
+            if due:
+                self._stop.wait(self.min_refresh_interval)
+                continue
+            timeout = None if next_refresh is None else next_refresh - now
+            self._wake.wait(timeout)
+
+    def stats(self):
+        with self._lock:
+            now = self.clock()
+            return {
+                'secrets': len(self._secrets),
+                'hits': self.hits,
+                'misses': self.misses,
+                'refreshes': self.refreshes,
+                'refresh_failures': self.refresh_failures,
+                'changes': self.changes,
+                'next_refresh': min(
+                    (max(cached.refresh_at - now, 0)
+                     for cached in self._secrets.values()),
+                    default=None)
+            }
+
+
+def create_secret_provider(config):
+    """build the provider selected by SECRET_PROVIDER, cached unless
+    SECRET_CACHE_TTL is 0"""
+    backend = config.get('SECRET_PROVIDER', 'keyvault')
+    if backend == 'keyvault':
+        provider = KeyVaultSecretProvider(config['KEY_VAULT_NAME'])
+    elif backend == 'env':
+        provider = EnvironmentSecretProvider()
+    elif backend == 'file':
+        provider = FileSecretProvider(
+            config.get('SECRET_FILE', 'secrets.json'))
+    else:
+        raise ValueError(f"Unknown secret provider: {backend}")
+
+    ttl = config.get('SECRET_CACHE_TTL', 900)
+    if not ttl:
+        return provider
+    return CachedSecretProvider(
+        provider,
+        ttl=ttl,
+        refresh_ahead=config.get('SECRET_REFRESH_AHEAD', 120),
+        retry_interval=config.get('SECRET_RETRY_INTERVAL', 30)
+    )
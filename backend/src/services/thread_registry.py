@@ -0,0 +1,360 @@
+from abc import ABC, abstractmethod
+from collections import OrderedDict, namedtuple
+from datetime import datetime, timedelta, timezone
+import threading
+import time
+
+
+# replies given without a run that are kept for the user's next run, the
+# oldest are dropped past this
+MAX_PENDING_MESSAGES = 20
+
+# what a turn needs to know about the user's thread, looked up once per turn.
+# thread_id is None until the user's first run, abandoned_run_id is a run on
+# the thread that was cancelled but not yet seen to stop and
+# pending_messages are exchanges answered without a run, still to be posted
+# to the thread.
+ThreadEntry = namedtuple(
+    'ThreadEntry', ['thread_id', 'abandoned_run_id', 'pending_messages'])
+
+
+class ThreadRegistry(ABC):
+    """Maps a chat user to the assistant thread their conversation is on.
+
+    Entries expire once a user has been idle for longer than the TTL.
+    """
+
+    # registries that query the database block, async callers run them on
+    # an executor thread inside an app context
+    uses_database = False
+
+    @abstractmethod
+    def lookup(self, user_id):
+        """ThreadEntry for the user, None if unknown or expired. Keeps the
+        entry from expiring."""
+
+    def get(self, user_id):
+        """thread id for the user, None if unknown or expired"""
+        entry = self.lookup(user_id)
+        return entry.thread_id if entry else None
+
+    @abstractmethod
+    def set(self, user_id, thread_id):
+        """remember the thread the user's conversation is on"""
+
+    @abstractmethod
+    def set_abandoned_run(self, user_id, run_id):
+        """remember a cancelled run still winding down, None once it has
+        stopped. Setting a new thread forgets it too."""
+
+    @abstractmethod
+    def add_pending_messages(self, user_id, messages):
+        """keep messages of an exchange answered without a run for the
+        user's next run to post to their thread"""
+
+    @abstractmethod
+    def clear_pending_messages(self, user_id, count):
+        """forget the oldest `count` pending messages once they have been
+        posted"""
+
+    @abstractmethod
+    def stats(self):
+        """size and hit/miss counters for /api/ai/threads"""
+
+
+class InMemoryThreadRegistry(ThreadRegistry):
+    """Per-process registry with LRU eviction and a sliding TTL."""
+
+    def __init__(self, max_entries=10000, ttl=86400):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._abandoned_runs = {}
+        self._pending_messages = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def lookup(self, user_id):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, thread_id = entry
+            if expires_at <= now:
+                self._forget(user_id)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries[user_id] = (now + self.ttl, thread_id)
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return ThreadEntry(
+                thread_id, self._abandoned_runs.get(user_id),
+                tuple(self._pending_messages.get(user_id, ())))
+
+    def set(self, user_id, thread_id):
+        with self._lock:
+            self._abandoned_runs.pop(user_id, None)
+            self._touch(user_id, thread_id)
+
+    def add_pending_messages(self, user_id, messages):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry[0] <= now:
+                self._forget(user_id)
+                thread_id = None
+            else:
+                thread_id = entry[1]
+            pending = self._pending_messages.setdefault(user_id, [])
+            pending.extend(messages)
+            del pending[:-MAX_PENDING_MESSAGES]
+            self._touch(user_id, thread_id)
+
+    def clear_pending_messages(self, user_id, count):
+        with self._lock:
+            pending = self._pending_messages.get(user_id)
+            if pending is not None:
+                del pending[:count]
+                if not pending:
+                    del self._pending_messages[user_id]
+
+    def _touch(self, user_id, thread_id):
+        self._entries[user_id] = (time.monotonic() + self.ttl, thread_id)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_entries:
+            evicted, _ = self._entries.popitem(last=False)
+            self._abandoned_runs.pop(evicted, None)
+            self._pending_messages.pop(evicted, None)
+            self.evictions += 1
+
+    def _forget(self, user_id):
+        self._entries.pop(user_id, None)
+        self._abandoned_runs.pop(user_id, None)
+        self._pending_messages.pop(user_id, None)
+
+    def set_abandoned_run(self, user_id, run_id):
+        with self._lock:
+            if run_id is None:
+                self._abandoned_runs.pop(user_id, None)
+            elif user_id in self._entries:
+                self._abandoned_runs[user_id] = run_id
+
+    def stats(self):
+        with self._lock:
+            return {
+                'backend': 'memory',
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations
+            }
+
+
+class DatabaseThreadRegistry(ThreadRegistry):
+    """Registry in the conversation_thread table, shared by every worker.
+
+    Each call runs in a transaction of its own rather than on the caller's
+    session, which it would otherwise have to commit. Expired rows are
+    ignored on lookup and deleted by purge_expired()
+    (`flask ai purge-threads`).
+    """
+
+    uses_database = True
+
+    def __init__(self, ttl=86400):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+
+    def lookup(self, user_id):
+        from sqlalchemy import update
+        from src.models.conversation_thread import ConversationThread
+        from src import db
+
+        now = datetime.now(timezone.utc)
+        # look up and refresh last_used_at in one statement
+        with db.engine.begin() as connection:
+            row = connection.execute(
+                update(ConversationThread)
+                .where(
+                    ConversationThread.user_id == str(user_id),
+                    ConversationThread.last_used_at > self._cutoff(now)
+                )
+                .values(last_used_at=now)
+                .returning(ConversationThread.thread_id,
+                           ConversationThread.abandoned_run_id,
+                           ConversationThread.pending_messages)
+            ).first()
+
+        with self._lock:
+            if row is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if row is None:
+            return None
+        thread_id, abandoned_run_id, pending_messages = row
+        return ThreadEntry(
+            thread_id, abandoned_run_id, tuple(pending_messages or ()))
+
+    def set(self, user_id, thread_id):
+        from sqlalchemy import update
+        from src.models.conversation_thread import ConversationThread
+        from src.services.timeslot_service import UPSERT_INSERTS
+        from src import db
+
+        values = {
+            'user_id': str(user_id),
+            'thread_id': thread_id,
+            'abandoned_run_id': None,
+            'last_used_at': datetime.now(timezone.utc)
+        }
+        with db.engine.begin() as connection:
+            insert = UPSERT_INSERTS.get(connection.dialect.name)
+            if insert is None:
+                updated = connection.execute(
+                    update(ConversationThread)
+                    .where(ConversationThread.user_id == values['user_id'])
+                    .values(**values)
+                )
+                if updated.rowcount == 0:
+                    connection.execute(
+                        ConversationThread.__table__.insert().values(**values))
+                return
+            statement = insert(ConversationThread).values(**values)
+            connection.execute(statement.on_conflict_do_update(
+                index_elements=[ConversationThread.user_id],
+                set_={
+                    'thread_id': statement.excluded.thread_id,
+                    'abandoned_run_id': None,
+                    'last_used_at': statement.excluded.last_used_at
+                }
+            ))
+
+    def set_abandoned_run(self, user_id, run_id):
+        from sqlalchemy import update
+        from src.models.conversation_thread import ConversationThread
+        from src import db
+
+        with db.engine.begin() as connection:
+            connection.execute(
+                update(ConversationThread)
+                .where(ConversationThread.user_id == str(user_id))
+                .values(abandoned_run_id=run_id)
+            )
+
+    def add_pending_messages(self, user_id, messages):
+        from sqlalchemy import select, update
+        from src.models.conversation_thread import ConversationThread
+        from src.services.availability_cache import as_utc
+        from src import db
+
+        now = datetime.now(timezone.utc)
+        with db.engine.begin() as connection:
+            row = connection.execute(
+                select(ConversationThread.last_used_at,
+                       ConversationThread.pending_messages)
+                .where(ConversationThread.user_id == str(user_id))
+                .with_for_update()
+            ).first()
+            if row is None:
+                connection.execute(
+                    ConversationThread.__table__.insert().values(
+                        user_id=str(user_id),
+                        pending_messages=list(messages)[
+                            -MAX_PENDING_MESSAGES:],
+                        last_used_at=now))
+                return
+
+            values = {'last_used_at': now}
+            last_used_at, pending = row
+            if as_utc(last_used_at) <= self._cutoff(now):
+                # an expired thread is not continued
+                values.update(thread_id=None, abandoned_run_id=None)
+                pending = None
+            values['pending_messages'] = (
+                (pending or []) + list(messages))[-MAX_PENDING_MESSAGES:]
+            connection.execute(
+                update(ConversationThread)
+                .where(ConversationThread.user_id == str(user_id))
+                .values(**values)
+            )
+
+    def clear_pending_messages(self, user_id, count):
+        from sqlalchemy import select, update
+        from src.models.conversation_thread import ConversationThread
+        from src import db
+
+        with db.engine.begin() as connection:
+            pending = connection.scalar(
+                select(ConversationThread.pending_messages)
+                .where(ConversationThread.user_id == str(user_id))
+                .with_for_update()
+            )
+            if not pending:
+                return
+            connection.execute(
+                update(ConversationThread)
+                .where(ConversationThread.user_id == str(user_id))
+                .values(pending_messages=pending[count:] or None)
+            )
+
+    def purge_expired(self):
+        """delete expired rows, returns how many were removed"""
+        from sqlalchemy import delete
+        from src.models.conversation_thread import ConversationThread
+        from src import db
+
+        with db.engine.begin() as connection:
+            result = connection.execute(
+                delete(ConversationThread).where(
+                    ConversationThread.last_used_at <= self._cutoff(
+                        datetime.now(timezone.utc)))
+            )
+        with self._lock:
+            self.expirations += result.rowcount
+        return result.rowcount
+
+    def stats(self):
+        from sqlalchemy import func, select
+        from src.models.conversation_thread import ConversationThread
+        from src import db
+
+        with db.engine.connect() as connection:
+            size = connection.scalar(
+                select(func.count()).select_from(ConversationThread))
+        with self._lock:
+            return {
+                'backend': 'database',
+                'size': size,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'expirations': self.expirations
+            }
+
+    def _cutoff(self, now):
+        return now - timedelta(seconds=self.ttl)
+
+
+def create_thread_registry(config):
+    """build the registry selected by AI_THREAD_REGISTRY"""
+    backend = config.get('AI_THREAD_REGISTRY', 'memory')
+    ttl = config.get('AI_THREAD_TTL', 86400)
+    if backend == 'database':
+        return DatabaseThreadRegistry(ttl=ttl)
+    if backend == 'memory':
+        return InMemoryThreadRegistry(
+            max_entries=config.get('AI_THREAD_MAX_ENTRIES', 10000), ttl=ttl)
+    raise ValueError(f"Unknown thread registry: {backend}")
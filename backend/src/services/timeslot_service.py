@@ -1,8 +1,33 @@
 from datetime import datetime, timedelta, timezone
+from sqlalchemy import and_, exists, func, select, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from src.models.timeslot import Timeslot
-from src.models.booking import BookingStatus
+from src.models.booking import Booking, BookingStatus, booking_timeslot
+from src.services.availability_cache import as_utc
 from src import db
 
+# opening hours as [open, close) UTC hours per weekday (Mon=0), weekends closed
+OPENING_HOURS = {
+    0: (8, 17),
+    1: (8, 17),
+    2: (8, 17),
+    3: (8, 17),
+    4: (8, 13),
+}
+
+# precomputed slot offsets from midnight for each open weekday
+OPENING_SLOTS = {
+    weekday: tuple(timedelta(hours=hour) for hour in range(open_, close))
+    for weekday, (open_, close) in OPENING_HOURS.items()
+}
+
+# dialect specific INSERT constructs supporting ON CONFLICT DO NOTHING
+UPSERT_INSERTS = {
+    'postgresql': postgresql_insert,
+    'sqlite': sqlite_insert,
+}
+
 
 class TimeslotService:
     def get_or_create_timeslot(self, start_time):
@@ -14,6 +39,140 @@ class TimeslotService:
             db.session.flush()
         return timeslot
 
+    def get_timeslot_usage(self, start_time, end_time):
+        """get {start_time: (booked_count, capacity)} for timeslots in range
+        (single query)"""
+        rows = db.session.query(
+            Timeslot.start_time,
+            Timeslot.booked_count,
+            Timeslot.capacity
+        ).filter(
+            Timeslot.start_time >= start_time,
+            Timeslot.start_time <= end_time
+        ).all()
+
+        return {
+            start_time: (booked_count, capacity)
+            for start_time, booked_count, capacity in rows
+        }
+
+    def get_or_create_timeslots(self, start_times):
+        """get or create timeslots for all given (UTC) start times using a
+        fixed number of statements, in the order given"""
+        if not start_times:
+            return []
+
+        by_start = {
+            as_utc(ts.start_time): ts
+            for ts in Timeslot.query.filter(
+                Timeslot.start_time.in_(start_times)).all()
+        }
+        missing = [t for t in start_times if t not in by_start]
+
+        if missing:
+            dialect = db.session.get_bind().dialect.name
+            if dialect not in UPSERT_INSERTS:
+                return [self.get_or_create_timeslot(t) for t in start_times]
+
+            # a concurrent booking may insert the same start time first, in
+            # which case DO NOTHING skips it and it's selected again below
+            created = db.session.scalars(
+                UPSERT_INSERTS[dialect](Timeslot).values(
+                    [{'start_time': t} for t in missing]
+                ).on_conflict_do_nothing(
+                    index_elements=['start_time']
+                ).returning(Timeslot)
+            ).all()
+
+            if len(created) != len(missing):
+                created = Timeslot.query.filter(
+                    Timeslot.start_time.in_(missing)).all()
+
+            by_start.update((as_utc(ts.start_time), ts) for ts in created)
+
+        return [by_start[t] for t in start_times]
+
+    def reserve_timeslots(self, timeslots):
+        """atomically take one place in each timeslot, failing when any is
+        full
+
+        Rows are locked in start time order (SELECT ... FOR UPDATE on
+        Postgres) so concurrent multi-hour bookings can't deadlock, then a
+        single conditional UPDATE increments every counter. Only the booked
+        rows are locked until the transaction ends, so bookings for other
+        timeslots proceed in parallel.
+        """
+        ids = [ts.id for ts in timeslots]
+        locked = db.session.execute(
+            select(
+                Timeslot.start_time, Timeslot.booked_count, Timeslot.capacity
+            ).where(
+                Timeslot.id.in_(ids)
+            ).order_by(
+                Timeslot.start_time
+            ).with_for_update()
+        ).all()
+
+        for start_time, booked_count, capacity in locked:
+            if booked_count >= capacity:
+                raise ValueError(
+                    f"Timeslot at {start_time.strftime('%H:%M')} "
+                    "is fully booked")
+
+        result = db.session.execute(
+            update(Timeslot).where(
+                Timeslot.id.in_(ids),
+                Timeslot.booked_count < Timeslot.capacity
+            ).values(
+                booked_count=Timeslot.booked_count + 1
+            ).execution_options(synchronize_session=False)
+        )
+        for timeslot in timeslots:
+            db.session.expire(timeslot, ['booked_count'])
+
+        # without row locks (SQLite) a concurrent booking may fill a slot
+        # between the check and the update
+        if result.rowcount != len(ids):
+            raise ValueError("Selected timeslot is fully booked")
+
+    def get_booked_count_drift(self):
+        """recompute active booking counts and return timeslots whose
+        stored booked_count differs as (timeslot, stored, actual)"""
+        actual_count = func.count(Booking.id)
+        rows = db.session.query(
+            Timeslot, actual_count
+        ).outerjoin(
+            booking_timeslot, booking_timeslot.c.timeslot_id == Timeslot.id
+        ).outerjoin(
+            Booking, and_(
+                Booking.id == booking_timeslot.c.booking_id,
+                Booking.status == BookingStatus.BOOKED
+            )
+        ).group_by(
+            Timeslot.id
+        ).having(
+            actual_count != Timeslot.booked_count
+        ).all()
+
+        return [(timeslot, timeslot.booked_count, actual)
+                for timeslot, actual in rows]
+
+    def get_opening_slots(self, start_time, end_time):
+        """get start times of every opening hours slot in range (UTC)"""
+        start_time = start_time.astimezone(timezone.utc)
+        end_time = end_time.astimezone(timezone.utc)
+        day = datetime.combine(
+            start_time.date(), datetime.min.time(), tzinfo=timezone.utc)
+
+        slots = []
+        while day <= end_time:
+            for offset in OPENING_SLOTS.get(day.weekday(), ()):
+                slot = day + offset
+                if start_time <= slot <= end_time:
+                    slots.append(slot)
+            day += timedelta(days=1)
+        return slots
+
     def get_start_times(self, timeslots):
         """get the list of timeslots in datetime format"""
         try:
@@ -61,30 +220,25 @@ class TimeslotService:
 
     def _is_within_opening_hours(self, time):
         """check if time is within opening hours"""
-        weekday = time.weekday()
-        hour = time.hour
-
-        if weekday >= 5:  # Weekend
+        hours = OPENING_HOURS.get(time.weekday())
+        if hours is None:  # Weekend
             return False
 
-        if weekday == 4:  # Friday
-            return 8 <= hour < 13
-
-        # Monday to Thursday
-        return 8 <= hour < 17
+        open_, close = hours
+        return open_ <= time.hour < close
 
     def _has_overlapping_timeslots(self, user, new_times):
-        """check if user has overlapping timeslots"""
-        new_timestamps = {t.timestamp() for t in new_times}
-
-        for booking in user.bookings:
-            if booking.status in [
-                BookingStatus.CANCELLED, BookingStatus.COMPLETED
-            ]:
-                continue
-
-            existing_timestamps = {ts.start_time.timestamp()
-                                   for ts in booking.timeslots}
-            if new_timestamps.intersection(existing_timestamps):
-                return True
-        return False
+        """check if user has overlapping timeslots (single EXISTS query)"""
+        if user.id is None:
+            # user not saved yet so can't have any bookings
+            return False
+
+        return db.session.query(
+            exists().where(
+                Booking.user_id == user.id,
+                Booking.status == BookingStatus.BOOKED,
+                booking_timeslot.c.booking_id == Booking.id,
+                booking_timeslot.c.timeslot_id == Timeslot.id,
+                Timeslot.start_time.in_(new_times)
+            )
+        ).scalar()
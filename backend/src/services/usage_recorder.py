@@ -0,0 +1,135 @@
+from datetime import datetime, timezone
+import queue
+import threading
+
+
+class UsageRecorder:
+    """Writes assistant run usage records to the database in batches.
+
+    record() only puts the record on a bounded queue, so chat requests
+    never wait on the insert. A background thread started with the first
+    request or record writes whatever has queued up, up to batch_size rows
+    per commit, at least every flush_interval seconds. Records are dropped
+    rather than queued without bound if the database falls behind.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.enabled = True
+        self.writer = True
+        self.batch_size = 100
+        self.flush_interval = 5
+        self._queue = queue.Queue(maxsize=10000)
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self.written = 0
+        self.dropped = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.enabled = app.config.get('AI_USAGE_ENABLED', True)
+        self.writer = app.config.get('AI_USAGE_WRITER', True)
+        self.batch_size = app.config.get('AI_USAGE_BATCH_SIZE', 100)
+        self.flush_interval = app.config.get('AI_USAGE_FLUSH_INTERVAL', 5)
+        self._queue = queue.Queue(
+            maxsize=app.config.get('AI_USAGE_MAX_QUEUE', 10000))
+
+        # like the email dispatcher, start with the first request so CLI
+        # commands don't spawn the thread
+        app.before_request(self.start)
+
+    def record(self, **values):
+        """queue one run's usage, tool_calls is a list of (name, seconds)"""
+        if not self.enabled or self.app is None:
+            return
+        values.setdefault('created_at', datetime.now(timezone.utc))
+        try:
+            self._queue.put_nowait(values)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+        # chat on the ASGI path never goes through Flask's before_request
+        self.start()
+
+    def start(self):
+        if not self.enabled or not self.writer or self.app is None:
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, name='ai-usage-writer', daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def flush(self):
+        """write every queued record now, returns how many were written.
+        Must be called inside an app context."""
+        written = 0
+        while True:
+            batch = self._take_batch(block=False)
+            if not batch:
+                return written
+            self._write(batch)
+            written += len(batch)
+
+    def _run(self):
+        from src import db
+
+        while not self._stop.is_set():
+            batch = self._take_batch(block=True)
+            if not batch:
+                continue
+            with self.app.app_context():
+                try:
+                    self._write(batch)
+                except Exception:
+                    self.app.logger.exception('Writing AI usage failed')
+                    db.session.rollback()
+                finally:
+                    db.session.remove()
+
+    def _take_batch(self, block):
+        batch = []
+        try:
+            if block:
+                batch.append(self._queue.get(timeout=self.flush_interval))
+            while len(batch) < self.batch_size:
+                batch.append(self._queue.get_nowait())
+        except queue.Empty:
+            pass
+        return batch
+
+    def _write(self, batch):
+        from src.models.assistant_run import AssistantRun, AssistantToolCall
+        from src import db
+
+        runs = []
+        for values in batch:
+            values = dict(values)
+            tool_calls = values.pop('tool_calls', [])
+            runs.append(AssistantRun(**values, tool_calls=[
+                AssistantToolCall(name=name, duration=duration)
+                for name, duration in tool_calls
+            ]))
+        db.session.add_all(runs)
+        db.session.commit()
+        with self._lock:
+            self.written += len(runs)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'queued': self._queue.qsize(),
+                'written': self.written,
+                'dropped': self.dropped
+            }
@@ -0,0 +1,107 @@
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import func, select
+from src import db
+from src.models.assistant_run import AssistantRun, AssistantToolCall
+
+
+class UsageService:
+    """Rollups of the recorded assistant run usage."""
+
+    def get_usage_summary(self, days=7, prompt_cost=0.0, completion_cost=0.0,
+                          top_users=10):
+        """usage since `days` days ago by day, tool and user, costs are per
+        1000 tokens"""
+        since = datetime.now(timezone.utc) - timedelta(days=days)
+
+        def cost(prompt_tokens, completion_tokens):
+            return round(((prompt_tokens or 0) * prompt_cost
+                          + (completion_tokens or 0) * completion_cost)
+                         / 1000, 6)
+
+        totals = self._token_columns()
+        day = func.date(AssistantRun.created_at)
+        daily = [
+            {
+                'date': str(row.day),
+                **self._token_row(row),
+                'cost': cost(row.prompt_tokens, row.completion_tokens),
+                'avg_wall_time': row.avg_wall_time,
+                'max_wall_time': row.max_wall_time,
+                'avg_polls': row.avg_polls,
+                'timeouts': row.timeouts
+            }
+            for row in db.session.execute(
+                select(day.label('day'), *totals,
+                       func.avg(AssistantRun.wall_time).label('avg_wall_time'),
+                       func.max(AssistantRun.wall_time).label('max_wall_time'),
+                       func.avg(AssistantRun.polls).label('avg_polls'),
+                       func.sum(func.cast(
+                           AssistantRun.status == 'timeout', db.Integer)
+                       ).label('timeouts'))
+                .where(AssistantRun.created_at >= since)
+                .group_by(day)
+                .order_by(day)
+            )
+        ]
+
+        tools = [
+            {
+                'name': row.name,
+                'calls': row.calls,
+                'avg_duration': row.avg_duration,
+                'max_duration': row.max_duration,
+                'total_duration': row.total_duration
+            }
+            for row in db.session.execute(
+                select(AssistantToolCall.name,
+                       func.count().label('calls'),
+                       func.avg(AssistantToolCall.duration).label(
+                           'avg_duration'),
+                       func.max(AssistantToolCall.duration).label(
+                           'max_duration'),
+                       func.sum(AssistantToolCall.duration).label(
+                           'total_duration'))
+                .join(AssistantRun)
+                .where(AssistantRun.created_at >= since)
+                .group_by(AssistantToolCall.name)
+                .order_by(func.sum(AssistantToolCall.duration).desc())
+            )
+        ]
+
+        total_tokens = func.coalesce(func.sum(AssistantRun.total_tokens), 0)
+        users = [
+            {
+                'user_id': row.user_id,
+                **self._token_row(row),
+                'cost': cost(row.prompt_tokens, row.completion_tokens)
+            }
+            for row in db.session.execute(
+                select(AssistantRun.user_id, *totals)
+                .where(AssistantRun.created_at >= since,
+                       AssistantRun.user_id.is_not(None))
+                .group_by(AssistantRun.user_id)
+                .order_by(total_tokens.desc())
+                .limit(top_users)
+            )
+        ]
+
+        return {'days': days, 'daily': daily, 'tools': tools, 'users': users}
+
+    def _token_columns(self):
+        return [
+            func.count().label('runs'),
+            func.coalesce(func.sum(AssistantRun.prompt_tokens), 0).label(
+                'prompt_tokens'),
+            func.coalesce(func.sum(AssistantRun.completion_tokens), 0).label(
+                'completion_tokens'),
+            func.coalesce(func.sum(AssistantRun.total_tokens), 0).label(
+                'total_tokens')
+        ]
+
+    def _token_row(self, row):
+        return {
+            'runs': row.runs,
+            'prompt_tokens': row.prompt_tokens,
+            'completion_tokens': row.completion_tokens,
+            'total_tokens': row.total_tokens
+        }
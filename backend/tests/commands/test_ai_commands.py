@@ -0,0 +1,35 @@
+from datetime import datetime, timedelta, timezone
+from src.commands.ai_commands import ai_cli
+from src.models.conversation_thread import ConversationThread
+from src import db
+
+
+def test_purge_threads(app):
+    now = datetime.now(timezone.utc)
+    db.session.add_all([
+        ConversationThread(user_id="idle", thread_id="thread-1",
+                           last_used_at=now - timedelta(days=2)),
+        ConversationThread(user_id="active", thread_id="thread-2",
+                           last_used_at=now)
+    ])
+    db.session.commit()
+
+    runner = app.test_cli_runner()
+    result = runner.invoke(ai_cli, ['purge-threads'])
+
+    assert result.exit_code == 0
+    assert 'Removed 1 expired conversation threads.' in result.output
+    assert [thread.user_id for thread in ConversationThread.query.all()] == [
+        "active"]
+
+
+def test_purge_threads_with_ttl(app):
+    db.session.add(ConversationThread(
+        user_id="user", thread_id="thread-1",
+        last_used_at=datetime.now(timezone.utc) - timedelta(minutes=10)))
+    db.session.commit()
+
+    runner = app.test_cli_runner()
+    result = runner.invoke(ai_cli, ['purge-threads', '--ttl', '60'])
+
+    assert 'Removed 1 expired conversation threads.' in result.output
@@ -0,0 +1,62 @@
+import pytest
+from datetime import datetime, timezone
+from src.commands.timeslot_commands import timeslot_cli
+from src.models.booking import Booking
+from src.models.timeslot import Timeslot
+from src.models.user import User
+from src import db
+
+
+@pytest.fixture
+def drifted_timeslot(app):
+    user = User(email="test@example.com", full_name="Test User")
+    timeslot = Timeslot(
+        start_time=datetime(2030, 1, 7, 10, 0, tzinfo=timezone.utc))
+    booking = Booking(user=user)
+    booking.timeslots.append(timeslot)
+    db.session.add_all([user, timeslot, booking])
+    db.session.commit()
+    return timeslot
+
+
+def test_check_counts_consistent(app):
+    runner = app.test_cli_runner()
+    result = runner.invoke(timeslot_cli, ['check-counts'])
+
+    assert result.exit_code == 0
+    assert 'consistent' in result.output
+
+
+def test_check_counts_reports_drift(app, drifted_timeslot):
+    runner = app.test_cli_runner()
+    result = runner.invoke(timeslot_cli, ['check-counts'])
+
+    assert result.exit_code != 0
+    assert 'stored=0 actual=1' in result.output
+    assert drifted_timeslot.booked_count == 0
+
+
+def test_check_counts_fix(app, drifted_timeslot):
+    runner = app.test_cli_runner()
+    result = runner.invoke(timeslot_cli, ['check-counts', '--fix'])
+
+    assert result.exit_code == 0
+    assert 'Fixed 1' in result.output
+    assert drifted_timeslot.booked_count == 1
+
+
+def test_set_capacity(app):
+    runner = app.test_cli_runner()
+    result = runner.invoke(
+        timeslot_cli, ['set-capacity', '2030-01-07T10:00:00+00:00', '5'])
+
+    assert result.exit_code == 0
+    assert Timeslot.query.one().capacity == 5
+
+
+def test_set_capacity_invalid_start_time(app):
+    runner = app.test_cli_runner()
+    result = runner.invoke(timeslot_cli, ['set-capacity', 'invalid', '5'])
+
+    assert result.exit_code != 0
+    assert Timeslot.query.count() == 0
@@ -1,3 +1,5 @@
+from contextlib import contextmanager
+from sqlalchemy import event
 import pytest
 from src import db
 from app import create_app
@@ -9,6 +11,9 @@ class TestConfig(Config):
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
     DEBUG = True
     MAIL_SUPPRESS_SEND = True
+    EMAIL_OUTBOX_DISPATCH = False
+    AI_USAGE_WRITER = False
+    SECRET_PROVIDER = 'env'
 
 
 @pytest.fixture(scope="function")
@@ -25,3 +30,22 @@ def app():
 @pytest.fixture
 def client(app):
     return app.test_client()
+
+
+@pytest.fixture
+def count_statements(app):
+    """context manager collecting the SQL statements executed inside it"""
+    @contextmanager
+    def collect():
+        statements = []
+
+        def on_execute(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', on_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', on_execute)
+
+    return collect
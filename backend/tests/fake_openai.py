@@ -0,0 +1,177 @@
+"""A local stand-in for the Azure OpenAI Assistants API.
+
+Serves the thread, message and run endpoints AIService uses over real HTTP
+so the openai client's request and SSE parsing code is exercised. Each
+streamed run (creating a run or submitting tool outputs) replays the next
+scripted list of events from ``FakeOpenAI.streams``.
+"""
+import json
+import threading
+import time
+from flask import Flask, Response, jsonify, request
+from werkzeug.serving import make_server
+
+API_VERSION = "2024-05-01-preview"
+
+
+def run_object(status, run_id="run_1", thread_id="thread_1",
+               required_action=None, last_error=None):
+    return {
+        "id": run_id,
+        "object": "thread.run",
+        "created_at": 0,
+        "thread_id": thread_id,
+        "assistant_id": "asst_1",
+        "status": status,
+        "required_action": required_action,
+        "last_error": last_error,
+        "instructions": "",
+        "model": "test-deployment",
+        "tools": [],
+        "parallel_tool_calls": True
+    }
+
+
+def run_event(status, **kwargs):
+    """thread.run.<status> event"""
+    return f"thread.run.{status}", run_object(status, **kwargs)
+
+
+def requires_action_event(*tool_calls, run_id="run_1"):
+    """thread.run.requires_action event for (call_id, name, args) tuples"""
+    return run_event("requires_action", run_id=run_id, required_action={
+        "type": "submit_tool_outputs",
+        "submit_tool_outputs": {
+            "tool_calls": [
+                {
+                    "id": call_id,
+                    "type": "function",
+                    "function": {
+                        "name": name,
+                        "arguments": json.dumps(arguments)
+                    }
+                }
+                for call_id, name, arguments in tool_calls
+            ]
+        }
+    })
+
+
+def text_delta_event(text, message_id="msg_1"):
+    """thread.message.delta event carrying a text fragment"""
+    return "thread.message.delta", {
+        "id": message_id,
+        "object": "thread.message.delta",
+        "delta": {
+            "content": [
+                {"index": 0, "type": "text", "text": {"value": text}}
+            ]
+        }
+    }
+
+
+def stall(seconds):
+    """pause the stream for `seconds` without sending anything"""
+    return None, seconds
+
+
+class FakeOpenAI:
+    def __init__(self):
+        self.streams = []
+        self.tool_outputs = []
+        self.cancelled = []
+        self.messages = []
+        self.threads_created = 0
+        self.app = self._create_app()
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    def start(self):
+        self._server = make_server('127.0.0.1', 0, self.app, threaded=True)
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, kwargs={'poll_interval': 0.05},
+            daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._thread.join()
+
+    def client(self):
+        """AzureOpenAI client pointed at this server"""
+        from openai import AzureOpenAI
+
+        return AzureOpenAI(
+            azure_endpoint=self.url,
+            api_key="test-key",
+            api_version=API_VERSION,
+            max_retries=0
+        )
+
+    def _stream_next(self):
+        events = self.streams.pop(0)
+
+        def generate():
+            for event, data in events:
+                if event is None:
+                    time.sleep(data)
+                    continue
+                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+            yield "event: done\ndata: [DONE]\n\n"
+
+        return Response(generate(), mimetype='text/event-stream')
+
+    def _create_app(self):
+        app = Flask(__name__)
+
+        @app.post('/openai/threads')
+        def create_thread():
+            self.threads_created += 1
+            return jsonify({
+                "id": f"thread_{self.threads_created}",
+                "object": "thread",
+                "created_at": 0,
+                "metadata": {}
+            })
+
+        @app.post('/openai/threads/<thread_id>/messages')
+        def create_message(thread_id):
+            body = request.get_json()
+            self.messages.append((thread_id, body['content']))
+            return jsonify({
+                "id": f"msg_user_{len(self.messages)}",
+                "object": "thread.message",
+                "created_at": 0,
+                "thread_id": thread_id,
+                "role": body['role'],
+                "status": "completed",
+                "content": [{
+                    "type": "text",
+                    "text": {"value": body['content'], "annotations": []}
+                }],
+                "attachments": [],
+                "metadata": {}
+            })
+
+        @app.post('/openai/threads/<thread_id>/runs')
+        def create_run(thread_id):
+            return self._stream_next()
+
+        @app.post(
+            '/openai/threads/<thread_id>/runs/<run_id>/submit_tool_outputs')
+        def submit_tool_outputs(thread_id, run_id):
+            self.tool_outputs.append(request.get_json()['tool_outputs'])
+            return self._stream_next()
+
+        @app.post('/openai/threads/<thread_id>/runs/<run_id>/cancel')
+        def cancel_run(thread_id, run_id):
+            self.cancelled.append((thread_id, run_id))
+            return jsonify(run_object(
+                "cancelled", run_id=run_id, thread_id=thread_id))
+
+        return app
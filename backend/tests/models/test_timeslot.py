@@ -3,6 +3,7 @@ from datetime import datetime, timezone
 from src.models.timeslot import Timeslot
 from src.models.booking import Booking, BookingStatus
 from src.models.user import User
+from src.services.timeslot_service import TimeslotService
 from src import db
 
 
@@ -44,12 +45,15 @@ def test_timeslot_from_dict(sample_datetime):
     assert timeslot.start_time == sample_datetime
 
 
-def test_booking_count(app, timeslot, booking):
+def test_booked_count(app, timeslot, booking):
     db.session.add(timeslot)
     db.session.add(booking)
+    db.session.flush()
+    TimeslotService().reserve_timeslots([timeslot])
     db.session.commit()
 
-    assert timeslot.booking_count == 1
+    assert timeslot.booked_count == 1
+    assert timeslot.bookings.count() == 1
 
 
 def test_multiple_bookings(app, timeslot, user):
@@ -63,9 +67,17 @@ def test_multiple_bookings(app, timeslot, user):
 
     db.session.add(booking1)
     db.session.add(booking2)
+    db.session.flush()
+    TimeslotService().reserve_timeslots([timeslot])
+    TimeslotService().reserve_timeslots([timeslot])
     db.session.commit()
 
-    assert timeslot.booking_count == 2
+    assert timeslot.booked_count == 2
+
+    # cancelled bookings no longer take a place
+    booking1.cancel()
+    db.session.commit()
+    assert timeslot.booked_count == 1
 
 
 def test_timeslot_repr(timeslot):
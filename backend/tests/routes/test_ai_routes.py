@@ -1,4 +1,10 @@
+import json
+import pytest
+from types import SimpleNamespace
 from unittest.mock import patch
+from src.services.thread_registry import InMemoryThreadRegistry
+from tests.fake_openai import (
+    FakeOpenAI, requires_action_event, run_event, stall, text_delta_event)
 
 
 def test_chat_success(client):
@@ -48,3 +54,267 @@ def test_chat_invalid_request(client):
     data = response.get_json()
     assert data['success'] is False
     assert 'error' in data
+
+
+@pytest.fixture
+def fake_openai():
+    server = FakeOpenAI().start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def streaming_client(client, fake_openai, monkeypatch):
+    from src import ai_service
+
+    monkeypatch.setattr(ai_service, 'client', fake_openai.client())
+    monkeypatch.setattr(ai_service, 'assistant', SimpleNamespace(id='asst_1'))
+    monkeypatch.setattr(ai_service, 'thread_registry',
+                        InMemoryThreadRegistry())
+    return client
+
+
+def _parse_sse(body):
+    events = []
+    for block in body.strip().split('\n\n'):
+        lines = dict(line.split(': ', 1) for line in block.split('\n'))
+        events.append((lines['event'], json.loads(lines['data'])))
+    return events
+
+
+def test_chat_stream_relays_text_deltas(streaming_client, fake_openai):
+    fake_openai.streams = [[
+        run_event('created'),
+        text_delta_event('Hello'),
+        text_delta_event(', how can I help?'),
+        run_event('completed')
+    ]]
+
+    response = streaming_client.post('/api/ai/chat/stream', json={
+        'message': 'Hi there',
+        'user_id': 'user-1'
+    })
+
+    assert response.status_code == 200
+    assert response.mimetype == 'text/event-stream'
+    assert _parse_sse(response.get_data(as_text=True)) == [
+        ('delta', {'text': 'Hello'}),
+        ('delta', {'text': ', how can I help?'}),
+        ('done', {'response': 'Hello, how can I help?'})
+    ]
+    assert fake_openai.messages == [('thread_1', 'Hi there')]
+
+
+def test_chat_stream_handles_tool_calls(streaming_client, fake_openai):
+    fake_openai.streams = [
+        [
+            run_event('created'),
+            requires_action_event(('call_1', 'get_availability', {
+                'start_date': '2025-06-02T00:00:00+00:00',
+                'end_date': '2025-06-03T00:00:00+00:00'
+            }))
+        ],
+        [
+            text_delta_event('All slots are free.'),
+            run_event('completed')
+        ]
+    ]
+
+    response = streaming_client.post('/api/ai/chat/stream', json={
+        'message': 'Is Monday free?'
+    })
+
+    assert _parse_sse(response.get_data(as_text=True)) == [
+        ('tool_call', {'names': ['get_availability']}),
+        ('delta', {'text': 'All slots are free.'}),
+        ('done', {'response': 'All slots are free.'})
+    ]
+    [outputs] = fake_openai.tool_outputs
+    assert outputs[0]['tool_call_id'] == 'call_1'
+    assert json.loads(outputs[0]['output']) == {
+        'status': 'success', 'data': {}}
+
+
+def test_chat_stream_reuses_user_thread(streaming_client, fake_openai):
+    fake_openai.streams = [
+        [text_delta_event('One'), run_event('completed')],
+        [text_delta_event('Two'), run_event('completed')]
+    ]
+
+    for message in ['first', 'second']:
+        streaming_client.post('/api/ai/chat/stream', json={
+            'message': message,
+            'user_id': 'user-1'
+        }).get_data()
+
+    assert fake_openai.threads_created == 1
+    assert fake_openai.messages == [
+        ('thread_1', 'first'), ('thread_1', 'second')]
+
+
+def test_chat_stream_run_failed(streaming_client, fake_openai):
+    fake_openai.streams = [[
+        text_delta_event('Partial'),
+        run_event('failed', last_error={
+            'code': 'server_error', 'message': 'Something broke'})
+    ]]
+
+    response = streaming_client.post('/api/ai/chat/stream', json={
+        'message': 'Hi there'
+    })
+
+    events = _parse_sse(response.get_data(as_text=True))
+    assert events[0] == ('delta', {'text': 'Partial'})
+    event, data = events[-1]
+    assert event == 'error'
+    assert data['success'] is False
+    assert 'Assistant run failed with status: failed' in data['error']
+    assert 'Something broke' in data['error']
+
+
+def test_chat_stream_stalled_run_times_out(streaming_client, fake_openai,
+                                           monkeypatch):
+    import time
+    from src import ai_service
+
+    monkeypatch.setattr(ai_service, 'run_timeout', 0.5)
+    fake_openai.streams = [[
+        run_event('created'),
+        text_delta_event('Partial'),
+        stall(5),
+        run_event('completed')
+    ]]
+
+    started = time.monotonic()
+    response = streaming_client.post('/api/ai/chat/stream', json={
+        'message': 'Hi there',
+        'user_id': 'user-1'
+    })
+    events = _parse_sse(response.get_data(as_text=True))
+
+    assert time.monotonic() - started < 3
+    assert events == [
+        ('delta', {'text': 'Partial'}),
+        ('error', {'error': 'Timeout waiting for assistant response.',
+                   'success': False})
+    ]
+    assert fake_openai.cancelled == [('thread_1', 'run_1')]
+
+
+def test_chat_stream_missing_message(client):
+    response = client.post('/api/ai/chat/stream', json={})
+
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'No message provided'
+
+
+def test_chat_stream_invalid_request(client):
+    response = client.post('/api/ai/chat/stream', data='invalid json')
+
+    assert response.status_code == 500
+    assert response.get_json()['success'] is False
+
+
+def test_thread_registry_stats(client, monkeypatch):
+    from src import ai_service
+
+    registry = InMemoryThreadRegistry(max_entries=1)
+    registry.set('user-1', 'thread-1')
+    registry.set('user-2', 'thread-2')
+    monkeypatch.setattr(ai_service, 'thread_registry', registry)
+
+    response = client.get('/api/ai/threads')
+
+    assert response.status_code == 200
+    data = response.get_json()['data']
+    assert data['size'] == 1
+    assert data['evictions'] == 1
+
+
+def test_faq_stats(client):
+    from src import ai_service
+
+    client.post('/api/ai/chat', json={'message': 'What are your opening hours?'})
+
+    response = client.get('/api/ai/faq')
+
+    assert response.status_code == 200
+    data = response.get_json()['data']
+    assert data['enabled'] is True
+    assert data['lookups'] == 1
+    assert data['hits'] == 1
+    assert ai_service.faq_index.min_score == 0.5
+
+
+def test_faq_stats_disabled(client, monkeypatch):
+    from src import ai_service
+
+    monkeypatch.setattr(ai_service, 'faq_index', None)
+
+    response = client.get('/api/ai/faq')
+
+    assert response.get_json()['data'] == {'enabled': False}
+
+
+def test_response_cache_stats(client):
+    response = client.get('/api/ai/cache')
+
+    assert response.status_code == 200
+    data = response.get_json()['data']
+    assert data['enabled'] is True
+    assert data['size'] == 0
+    assert data['ttl'] == 3600
+
+
+def test_chat_conversation_busy(client):
+    from src.services.conversation_queue import ConversationBusy
+
+    with patch('src.routes.ai_routes.ai_service.get_ai_response',
+               side_effect=ConversationBusy("Too many messages")):
+        response = client.post('/api/ai/chat', json={
+            'message': 'Hello?',
+            'user_id': 'user-1'
+        })
+
+    assert response.status_code == 429
+    assert response.get_json() == {
+        'error': 'Too many messages', 'success': False}
+
+
+def test_usage_metrics(client):
+    from src import ai_service
+
+    ai_service.usage_recorder.record(
+        run_id='run-1', thread_id='thread-1', user_id='user-1',
+        status='completed', prompt_tokens=100, completion_tokens=20,
+        total_tokens=120, wall_time=2.0, polls=3,
+        tool_calls=[('get_availability', 0.5)])
+    ai_service.usage_recorder.flush()
+
+    response = client.get('/api/ai/metrics?days=1')
+
+    assert response.status_code == 200
+    data = response.get_json()['data']
+    assert data['days'] == 1
+    assert data['daily'][0]['runs'] == 1
+    assert data['daily'][0]['total_tokens'] == 120
+    assert data['tools'][0]['name'] == 'get_availability'
+    assert data['users'][0]['user_id'] == 'user-1'
+    assert data['recorder']['written'] == 1
+    assert 'runs' in data
+
+
+def test_usage_metrics_invalid_days(client):
+    response = client.get('/api/ai/metrics?days=0')
+
+    assert response.status_code == 400
+    assert response.get_json()['code'] == 'INVALID_DAYS'
+
+
+def test_circuit_breaker_stats(client):
+    response = client.get('/api/ai/circuit')
+
+    assert response.status_code == 200
+    data = response.get_json()['data']
+    assert data['state'] == 'closed'
+    assert data['opened'] == 0
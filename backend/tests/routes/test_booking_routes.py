@@ -1,4 +1,4 @@
-from unittest.mock import MagicMock, patch
+from unittest.mock import patch
 import pytest
 from datetime import datetime, timezone, timedelta
 
@@ -28,21 +28,20 @@ def test_create_booking_success(client, valid_booking_data):
         {'start_time': (future_time + timedelta(hours=1)).isoformat()}
     ]
 
-    with patch('src.routes.booking_routes.email_service.send_confirmation', return_value=True):
-        response = client.post(
-            '/api/bookings/create-booking',
-            json=valid_booking_data,
-            headers={'Content-Type': 'application/json'}
-        )
+    response = client.post(
+        '/api/bookings/create-booking',
+        json=valid_booking_data,
+        headers={'Content-Type': 'application/json'}
+    )
 
-        assert response.status_code == 201
-        data = response.get_json()
-        assert data['status'] == 'success'
-        assert 'data' in data
-        booking_data = data['data']
-        assert 'id' in booking_data
-        assert 'status' in booking_data
-        assert 'date' in booking_data
+    assert response.status_code == 201
+    data = response.get_json()
+    assert data['status'] == 'success'
+    assert 'data' in data
+    booking_data = data['data']
+    assert 'id' in booking_data
+    assert 'status' in booking_data
+    assert 'date' in booking_data
 
 
 def test_create_booking_server_error(client, valid_booking_data):
@@ -85,27 +84,31 @@ def test_create_booking_invalid_data(client):
     assert data['code'] == 'INVALID_DATA'
 
 
-def test_create_booking_email_failure(client, valid_booking_data):
-    with patch('src.routes.booking_routes.booking_service.create_booking') as mock_create:
-        mock_booking = MagicMock()
-        mock_booking.user.email = 'test@example.com'
-        mock_booking.date = '2025-03-04'
-        mock_booking.time_range = '10:00 - 11:00'
-        mock_create.return_value = mock_booking
-
-        with patch('src.routes.booking_routes.email_service.send_confirmation',
-                   side_effect=Exception('Failed to send confirmation email')):
-            response = client.post(
-                '/api/bookings/create-booking',
-                json=valid_booking_data,
-                headers={'Content-Type': 'application/json'}
-            )
-
-            assert response.status_code == 500
-            data = response.get_json()
-            assert data['status'] == 'error'
-            assert data['code'] == 'EMAIL_ERROR'
-            assert 'confirmation email' in str(data['message'])
+def test_create_booking_does_not_wait_for_email(client, valid_booking_data):
+    from src.models.email_outbox import OutboxEmail, OutboxStatus
+
+    future_time = datetime.now(timezone.utc) + timedelta(days=1)
+    future_time = future_time.replace(
+        hour=10, minute=0, second=0, microsecond=0)
+    valid_booking_data['timeslots'] = [
+        {'start_time': future_time.isoformat()}
+    ]
+
+    with patch('src.routes.booking_routes.email_dispatcher.notify'
+               ) as mock_notify:
+        response = client.post(
+            '/api/bookings/create-booking',
+            json=valid_booking_data,
+            headers={'Content-Type': 'application/json'}
+        )
+
+    assert response.status_code == 201
+    # the email is left to the dispatcher, which is woken after the commit
+    mock_notify.assert_called_once_with()
+
+    email = OutboxEmail.query.one()
+    assert email.status == OutboxStatus.PENDING
+    assert email.payload['email'] == 'test@example.com'
 
 
 def test_create_booking_missing_body(client):
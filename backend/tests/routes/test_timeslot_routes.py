@@ -45,4 +45,112 @@ def test_get_availability_success(client, app):
     assert data['status'] == 'success'
     key = timeslot.start_time.isoformat()
     assert key in data['data']
-    assert data['data'][key] == timeslot.booking_count
+    assert data['data'][key] == timeslot.booked_count
+
+
+def test_get_availability_single_query(client, app, count_statements):
+    start = datetime(2030, 1, 7, 8, 0)
+    timeslots = [Timeslot(start_time=start + timedelta(hours=i))
+                 for i in range(24 * 30)]
+    timeslots[0].booked_count = 2
+    timeslots[1].booked_count = 1
+    db.session.add_all(timeslots)
+    db.session.commit()
+
+    with count_statements() as statements:
+        response = client.get(
+            '/api/timeslots/availability',
+            query_string={
+                'start_date': start.isoformat(),
+                'end_date': (start + timedelta(days=30)).isoformat()
+            }
+        )
+
+    data = response.get_json()['data']
+    assert response.status_code == 200
+    assert len(statements) == 1
+    assert len(data) == len(timeslots)
+    assert data[timeslots[0].start_time.isoformat()] == 2
+    assert data[timeslots[1].start_time.isoformat()] == 1
+    assert data[timeslots[2].start_time.isoformat()] == 0
+
+
+def test_get_availability_served_from_cache(client, app, count_statements):
+    from src.services.booking_service import BookingService
+
+    start = datetime(2030, 1, 7, 10, 0, tzinfo=timezone.utc)
+    query = {
+        'start_date': start.isoformat(),
+        'end_date': (start + timedelta(days=2)).isoformat()
+    }
+    booking_data = {
+        'user': {'email': 'test@example.com', 'full_name': 'Test User'},
+        'timeslots': [{'start_time': start.isoformat()}]
+    }
+    booking = BookingService().create_booking(booking_data)
+    key = booking.timeslots[0].start_time.isoformat()
+
+    assert client.get('/api/timeslots/availability',
+                      query_string=query).get_json()['data'] == {key: 1}
+
+    with count_statements() as statements:
+        response = client.get('/api/timeslots/availability',
+                              query_string=query)
+
+    assert statements == []
+    assert response.get_json()['data'] == {key: 1}
+
+    # cancelling invalidates the booked day
+    booking.cancel()
+    db.session.commit()
+    response = client.get('/api/timeslots/availability', query_string=query)
+    assert response.get_json()['data'] == {key: 0}
+
+    stats = client.get('/api/timeslots/availability/cache').get_json()
+    assert stats['data']['hits'] == 5
+    assert stats['data']['misses'] == 4
+
+
+def test_get_availability_grid_missing_dates(client):
+    response = client.get('/api/timeslots/availability/grid')
+    data = response.get_json()
+    assert response.status_code == 400
+    assert data['code'] == 'INVALID_REQUEST'
+
+
+def test_get_availability_grid(client, app):
+    from src.models.timeslot import MAX_BOOKINGS_PER_TIMESLOT
+
+    full = Timeslot(start_time=datetime(2030, 1, 11, 9, 0),
+                    booked_count=MAX_BOOKINGS_PER_TIMESLOT)
+    partial = Timeslot(start_time=datetime(2030, 1, 11, 10, 0),
+                       booked_count=1)
+    closed = Timeslot(start_time=datetime(2030, 1, 11, 18, 0),
+                      booked_count=1)
+    db.session.add_all([full, partial, closed])
+    db.session.commit()
+
+    # Friday 2030-01-11 and the weekend after it
+    response = client.get(
+        '/api/timeslots/availability/grid',
+        query_string={
+            'start_date': '2030-01-11T00:00:00+00:00',
+            'end_date': '2030-01-13T23:00:00+00:00'
+        }
+    )
+    data = response.get_json()['data']
+
+    assert response.status_code == 200
+    assert [slot['start_time'][11:16] for slot in data] == [
+        '08:00', '09:00', '10:00', '11:00', '12:00'
+    ]
+    assert data[0] == {
+        'start_time': '2030-01-11T08:00:00+00:00',
+        'booking_count': 0,
+        'capacity': MAX_BOOKINGS_PER_TIMESLOT,
+        'free': True
+    }
+    assert data[1]['booking_count'] == MAX_BOOKINGS_PER_TIMESLOT
+    assert data[1]['free'] is False
+    assert data[2]['booking_count'] == 1
+    assert data[2]['free'] is True
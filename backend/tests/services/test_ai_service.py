@@ -1,6 +1,6 @@
 import pytest
 import json
-from unittest.mock import MagicMock, patch, PropertyMock
+from unittest.mock import MagicMock, call, patch, PropertyMock
 
 from src.services.ai_service import AIService
 
@@ -30,7 +30,8 @@ def mock_app():
         'OPENAI_API_SECRET_NAME': 'openai-key',
         'DEPLOYMENT_NAME': 'test-deployment',
         'OPENAI_ENDPOINT_URL': 'https://test-endpoint.openai.azure.com',
-        'AZURE_ASSISTANT_ID': None
+        'AZURE_ASSISTANT_ID': None,
+        'AI_USAGE_WRITER': False
     }
     return app
 
@@ -38,8 +39,8 @@ def mock_app():
 @pytest.fixture
 def mock_secret_client():
     """Mock Azure Key Vault secret client"""
-    with patch('src.services.ai_service.DefaultAzureCredential'):
-        with patch('src.services.ai_service.SecretClient') as mock_client:
+    with patch('src.services.secret_provider.DefaultAzureCredential'):
+        with patch('src.services.secret_provider.SecretClient') as mock_client:
             mock_secret = MagicMock()
             mock_secret.value = "test-api-key"
             mock_client.return_value.get_secret.return_value = mock_secret
@@ -54,6 +55,7 @@ def test_init_app(mock_app, mock_secret_client, mock_openai):
 
     service = AIService()
     service.init_app(mock_app)
+    service.ensure_initialized()
 
     assert service.client is not None
     assert service.deployment == "test-deployment"
@@ -71,6 +73,7 @@ def test_init_app_existing_assistant(mock_app, mock_secret_client, mock_openai):
 
     service = AIService()
     service.init_app(mock_app)
+    service.ensure_initialized()
 
     mock_openai.beta.assistants.retrieve.assert_called_once_with(
         assistant_id="existing-assistant-id"
@@ -86,6 +89,13 @@ def test_get_ai_response_not_initialized():
         service.get_ai_response("Hello")
 
 
+def test_stream_ai_response_not_initialized():
+    """Test error when streaming before the service is initialized"""
+    service = AIService()
+    with pytest.raises(RuntimeError, match="AIService is not initialized"):
+        next(service.stream_ai_response("Hello"))
+
+
 def test_get_ai_response_success(mock_openai):
     """Test successful response generation"""
     service = AIService()
@@ -120,8 +130,7 @@ def test_get_ai_response_with_existing_thread(mock_openai):
     service.client = mock_openai
     service.assistant = MagicMock(id="test-assistant")
 
-    existing_thread = MagicMock(id="existing-thread")
-    service.active_threads = {"user123": existing_thread}
+    service.thread_registry.set("user123", "existing-thread")
 
     run_mock = MagicMock()
     type(run_mock).status = PropertyMock(return_value="completed")
@@ -164,10 +173,12 @@ def test_get_ai_response_run_failed(mock_openai):
         service.get_ai_response("Hello")
 
 
-@patch('time.time')
+@patch('src.services.run_polling.time.monotonic')
 @patch('time.sleep')
-def test_get_ai_response_timeout(mock_sleep, mock_time, mock_openai):
-    """Test timeout handling"""
+def test_get_ai_response_timeout(mock_sleep, mock_monotonic, mock_openai):
+    """Test timeout handling cancels the abandoned run"""
+    import itertools
+
     service = AIService()
     service.client = mock_openai
     service.assistant = MagicMock(id="test-assistant")
@@ -177,15 +188,24 @@ def test_get_ai_response_timeout(mock_sleep, mock_time, mock_openai):
 
     # Mock time to trigger timeout
     # Start time and check time (over 30 sec timeout)
-    mock_time.side_effect = [0, 31]
+    mock_monotonic.side_effect = itertools.chain([0], itertools.repeat(31))
 
-    run_mock = MagicMock()
+    run_mock = MagicMock(id="run-id")
     type(run_mock).status = PropertyMock(return_value="queued")
     mock_openai.beta.threads.runs.create.return_value = run_mock
+    mock_openai.beta.threads.runs.cancel.return_value = MagicMock(
+        id="run-id", status="cancelled")
 
     with pytest.raises(RuntimeError, match="Timeout waiting for assistant response"):
         service.get_ai_response("Hello")
 
+    mock_openai.beta.threads.runs.cancel.assert_called_once_with(
+        thread_id="test-thread", run_id="run-id")
+    stats = service.run_metrics.stats()
+    assert stats['timeouts'] == 1
+    assert stats['cancellations'] == 1
+    assert stats['cancellations_pending'] == 0
+
 
 @patch('src.routes.booking_routes.create_booking_internal')
 def test_get_ai_response_with_booking_function(mock_create_booking, mock_openai):
@@ -285,6 +305,62 @@ def test_get_ai_response_with_availability_function(mock_get_availability, mock_
     assert response == "Available times: 10AM (1 booking), 11AM (0 bookings)"
 
 
+@patch('src.routes.timeslot_routes.get_availability_grid_internal')
+def test_get_ai_response_with_availability_grid_mode(mock_get_grid,
+                                                     mock_openai):
+    """Test availability function calling in grid mode"""
+    service = AIService()
+    service.client = mock_openai
+    service.assistant = MagicMock(id="test-assistant")
+
+    thread_mock = MagicMock(id="test-thread")
+    mock_openai.beta.threads.create.return_value = thread_mock
+
+    tool_call = MagicMock()
+    tool_call.id = "tool-call-id"
+    tool_call.function.name = "get_availability"
+    tool_call.function.arguments = json.dumps({
+        "start_date": "2025-06-02T08:00:00+00:00",
+        "end_date": "2025-06-02T09:00:00+00:00",
+        "mode": "grid"
+    })
+
+    run_action = MagicMock()
+    type(run_action).status = PropertyMock(return_value="requires_action")
+    run_action.required_action.submit_tool_outputs.tool_calls = [tool_call]
+
+    run_completed = MagicMock()
+    type(run_completed).status = PropertyMock(return_value="completed")
+
+    mock_openai.beta.threads.runs.create.return_value = run_action
+    mock_openai.beta.threads.runs.submit_tool_outputs.return_value = run_completed
+
+    grid = [{
+        "start_time": "2025-06-02T08:00:00+00:00",
+        "booking_count": 0,
+        "capacity": 3,
+        "free": True
+    }]
+    mock_get_grid.return_value = grid
+
+    content_mock = MagicMock()
+    content_mock.text.value = "8AM is free"
+    message_mock = MagicMock()
+    message_mock.content = [content_mock]
+    messages_mock = MagicMock()
+    messages_mock.data = [message_mock]
+    mock_openai.beta.threads.messages.list.return_value = messages_mock
+
+    response = service.get_ai_response("Check availability")
+
+    mock_get_grid.assert_called_once_with(
+        "2025-06-02T08:00:00+00:00", "2025-06-02T09:00:00+00:00")
+    tool_outputs = mock_openai.beta.threads.runs.submit_tool_outputs.call_args[
+        1]["tool_outputs"]
+    assert json.loads(tool_outputs[0]["output"])["data"] == grid
+    assert response == "8AM is free"
+
+
 @patch('src.data.videos.get_videos_by_category')
 def test_get_ai_response_with_videos_function(mock_get_videos, mock_openai):
     """Test function calling for video retrieval"""
@@ -329,6 +405,303 @@ def test_get_ai_response_with_videos_function(mock_get_videos, mock_openai):
     assert response == "Here are some coffee videos: [VIDEO:menu:Latte] [VIDEO:menu:Espresso]"
 
 
+def test_init_app_unchanged_assistant_skips_update(
+        mock_app, mock_secret_client, mock_openai):
+    """Test an assistant whose fingerprint matches is not updated"""
+    mock_app.config['AZURE_ASSISTANT_ID'] = "existing-assistant-id"
+    service = AIService()
+    service.init_app(mock_app)
+    service.deployment = mock_app.config['DEPLOYMENT_NAME']
+    fingerprint = service._config_fingerprint(service._get_assistant_config())
+
+    mock_assistant = MagicMock()
+    mock_assistant.metadata = {'config_fingerprint': fingerprint}
+    mock_openai.beta.assistants.retrieve.return_value = mock_assistant
+
+    service.ensure_initialized()
+
+    mock_openai.beta.assistants.update.assert_not_called()
+    assert service.assistant == mock_assistant
+
+
+def test_init_app_changed_assistant_updates_fingerprint(
+        mock_app, mock_secret_client, mock_openai):
+    """Test a stale fingerprint updates the assistant and keeps other metadata"""
+    mock_app.config['AZURE_ASSISTANT_ID'] = "existing-assistant-id"
+    mock_assistant = MagicMock()
+    mock_assistant.id = "existing-assistant-id"
+    mock_assistant.metadata = {'config_fingerprint': 'stale', 'owner': 'cafe'}
+    mock_openai.beta.assistants.retrieve.return_value = mock_assistant
+
+    service = AIService()
+    service.init_app(mock_app)
+    service.ensure_initialized()
+
+    kwargs = mock_openai.beta.assistants.update.call_args.kwargs
+    assert kwargs['metadata'] == {
+        'config_fingerprint': service._config_fingerprint(
+            service._get_assistant_config()),
+        'owner': 'cafe'
+    }
+    assert kwargs['instructions'] == service._get_instructions()
+
+
+def test_config_fingerprint_is_stable_across_days():
+    """Test the date is passed per run and not part of the assistant"""
+    service = AIService()
+    service.deployment = "test-deployment"
+
+    with patch('src.services.ai_service.time.strftime',
+               return_value="Monday, January 06, 2025"):
+        monday = service._config_fingerprint(service._get_assistant_config())
+        run_instructions = service._get_run_instructions()
+    with patch('src.services.ai_service.time.strftime',
+               return_value="Tuesday, January 07, 2025"):
+        tuesday = service._config_fingerprint(service._get_assistant_config())
+
+    assert monday == tuesday
+    assert "Monday, January 06, 2025" in run_instructions
+    assert "Today's date" not in service._get_instructions()
+
+    service.deployment = "other-deployment"
+    assert service._config_fingerprint(
+        service._get_assistant_config()) != monday
+
+
+def test_init_app_is_lazy(mock_app, mock_secret_client, mock_openai):
+    """Test init_app leaves Key Vault and the assistants API untouched"""
+    service = AIService()
+    service.init_app(mock_app)
+
+    mock_secret_client.assert_not_called()
+    mock_openai.beta.assistants.create.assert_not_called()
+    assert not service.is_initialized
+
+
+def test_get_ai_response_initializes_on_first_use(
+        mock_app, mock_secret_client, mock_openai):
+    """Test the first chat sets up the assistant before creating a run"""
+    mock_openai.beta.assistants.create.return_value = MagicMock(id="asst-1")
+    mock_openai.beta.threads.create.return_value = MagicMock(id="thread-1")
+    mock_openai.beta.threads.runs.create.return_value = MagicMock(
+        id="run-1", status="completed")
+    mock_openai.beta.threads.messages.list.return_value = MagicMock(
+        data=[MagicMock(content=[MagicMock(text=MagicMock(value="Hi"))])])
+
+    service = AIService()
+    service.init_app(mock_app)
+
+    assert service.get_ai_response("Hello") == "Hi"
+    mock_openai.beta.assistants.create.assert_called_once()
+    run_kwargs = mock_openai.beta.threads.runs.create.call_args.kwargs
+    assert run_kwargs['assistant_id'] == "asst-1"
+    assert run_kwargs['additional_instructions'].startswith("Today's date is")
+
+
+def test_ensure_initialized_runs_once(mock_app, mock_secret_client, mock_openai):
+    """Test concurrent first requests share a single initialization"""
+    import threading
+
+    barrier = threading.Barrier(8)
+    mock_openai.beta.assistants.create.return_value = MagicMock(id="asst-1")
+
+    service = AIService()
+    service.init_app(mock_app)
+
+    def first_request():
+        barrier.wait()
+        service.ensure_initialized()
+
+    threads = [threading.Thread(target=first_request) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    mock_secret_client.assert_called_once()
+    mock_openai.beta.assistants.create.assert_called_once()
+
+
+def test_ensure_initialized_retries_after_failure(
+        mock_app, mock_secret_client, mock_openai):
+    """Test a failed initialization is attempted again on the next call"""
+    mock_openai.beta.assistants.create.side_effect = [
+        Exception("Service unavailable"), MagicMock(id="asst-1")]
+
+    service = AIService()
+    service.init_app(mock_app)
+
+    with pytest.raises(Exception, match="Service unavailable"):
+        service.ensure_initialized()
+    assert not service.is_initialized
+
+    service.ensure_initialized()
+    assert service.assistant.id == "asst-1"
+
+
+def test_ensure_initialized_without_app():
+    """Test an AIService that was never given an app cannot initialize"""
+    with pytest.raises(RuntimeError, match="AIService is not initialized"):
+        AIService().ensure_initialized()
+
+
+def test_get_ai_response_answers_faq_locally(mock_app, mock_secret_client):
+    """Test a close FAQ match is answered without the assistant"""
+    service = AIService()
+    service.init_app(mock_app)
+
+    response = service.get_ai_response("What are your opening hours?")
+
+    assert response.startswith("Currently, Monday to Thursday")
+    mock_secret_client.assert_not_called()
+    assert service.faq_index.stats()['hits'] == 1
+
+
+def test_get_ai_response_faq_miss_uses_assistant(mock_openai):
+    """Test messages below the FAQ threshold go to the assistant"""
+    from src.services.faq_index import FaqIndex
+    from src.services.ai_service import FAQ_RESPONSES
+
+    service = AIService()
+    service.client = mock_openai
+    service.assistant = MagicMock(id="asst-1")
+    service.faq_index = FaqIndex(FAQ_RESPONSES)
+    mock_openai.beta.threads.runs.create.return_value = MagicMock(
+        id="run-1", status="completed")
+    mock_openai.beta.threads.messages.list.return_value = MagicMock(
+        data=[MagicMock(content=[MagicMock(text=MagicMock(value="Booked"))])])
+
+    assert service.get_ai_response("Book me in for 2pm tomorrow") == "Booked"
+    stats = service.faq_index.stats()
+    assert stats['lookups'] == 1
+    assert stats['hits'] == 0
+
+
+def test_stream_ai_response_answers_faq_locally(mock_app):
+    """Test streamed FAQ answers arrive as one delta"""
+    service = AIService()
+    service.init_app(mock_app)
+
+    events = list(service.stream_ai_response("where are you located?"))
+
+    assert [event for event, _ in events] == ['delta', 'done']
+    assert events[1][1]['response'].startswith("Currently, Dialogue Café")
+
+
+def _faq_service(mock_openai):
+    from src.services.faq_index import FaqIndex
+    from src.services.ai_service import FAQ_RESPONSES
+
+    service = AIService()
+    service.client = mock_openai
+    service.assistant = MagicMock(id="test-assistant")
+    service.faq_index = FaqIndex(FAQ_RESPONSES)
+    mock_openai.beta.threads.create.return_value = MagicMock(id="faq-thread")
+    return service
+
+
+def test_get_ai_response_faq_answer_never_calls_assistant(mock_openai):
+    """Test an FAQ answer for a user returns without touching the client"""
+    service = _faq_service(mock_openai)
+    service.assistant = None
+
+    response = service.get_ai_response(
+        "What are your opening hours?", "user-1")
+
+    assert response.startswith("Currently, Monday to Thursday")
+    assert mock_openai.mock_calls == []
+
+
+def test_get_ai_response_faq_answer_starts_next_thread(mock_openai):
+    """Test an FAQ exchange is on the thread the user's next run starts"""
+    service = _faq_service(mock_openai)
+    mock_openai.beta.threads.runs.create.return_value = MagicMock(
+        id="run-1", status="completed")
+    answer = service.get_ai_response("What are your opening hours?", "user-1")
+
+    service.get_ai_response("Can I book for Friday?", "user-1")
+
+    mock_openai.beta.threads.create.assert_called_once_with(messages=[
+        {'role': 'user', 'content': "What are your opening hours?"},
+        {'role': 'assistant', 'content': answer}
+    ])
+    mock_openai.beta.threads.messages.create.assert_called_once_with(
+        thread_id="faq-thread", role="user", content="Can I book for Friday?")
+    assert service.thread_registry.lookup("user-1").pending_messages == ()
+
+
+def test_get_ai_response_faq_answer_mid_conversation(mock_openai):
+    """Test an FAQ exchange is posted to an ongoing thread before the
+    user's next message"""
+    service = _faq_service(mock_openai)
+    service.thread_registry.set("user-1", "existing-thread")
+    mock_openai.beta.threads.runs.create.return_value = MagicMock(
+        id="run-1", status="completed")
+    answer = service.get_ai_response("What are your opening hours?", "user-1")
+
+    service.get_ai_response("Can I book for Friday?", "user-1")
+
+    assert mock_openai.beta.threads.messages.create.call_args_list == [
+        call(thread_id="existing-thread", role="user",
+             content="What are your opening hours?"),
+        call(thread_id="existing-thread", role="assistant", content=answer),
+        call(thread_id="existing-thread", role="user",
+             content="Can I book for Friday?")
+    ]
+    mock_openai.beta.threads.create.assert_not_called()
+
+
+def test_get_ai_response_faq_answer_when_registry_fails(mock_openai):
+    """Test the FAQ answer is still given when it can't be kept"""
+    service = _faq_service(mock_openai)
+
+    with patch.object(service.thread_registry, 'add_pending_messages',
+                      side_effect=Exception("database down")):
+        response = service.get_ai_response(
+            "What are your opening hours?", "user-1")
+
+    assert response.startswith("Currently, Monday to Thursday")
+
+
+def test_get_ai_response_async_faq_answer_kept_for_next_run():
+    """Test the async path answers FAQs without the client too"""
+    import asyncio
+    from src.services.faq_index import FaqIndex
+    from src.services.ai_service import FAQ_RESPONSES
+
+    service = _async_service([MagicMock(id="run-id", status="completed")])
+    service.faq_index = FaqIndex(FAQ_RESPONSES)
+
+    async def faq_then_follow_up():
+        answer = await service.get_ai_response_async(
+            "What are your opening hours?", "user-1")
+        service.async_client.beta.threads.create.assert_not_awaited()
+        await service.get_ai_response_async("Can I book?", "user-1")
+        return answer
+
+    answer = asyncio.run(faq_then_follow_up())
+
+    service.async_client.beta.threads.create.assert_awaited_once_with(
+        messages=[
+            {'role': 'user', 'content': "What are your opening hours?"},
+            {'role': 'assistant', 'content': answer}
+        ])
+    assert service.thread_registry.get("user-1") == "thread-id"
+
+
+def test_init_app_faq_disabled(mock_app):
+    """Test the FAQ fast path can be switched off"""
+    mock_app.config['AI_FAQ_ENABLED'] = False
+    service = AIService()
+    service.init_app(mock_app)
+
+    assert service.faq_index is None
+    with patch.object(service, 'ensure_initialized',
+                      side_effect=RuntimeError("assistant")):
+        with pytest.raises(RuntimeError, match="assistant"):
+            service.get_ai_response("What are your opening hours?")
+
+
 def test_init_with_app():
     """Test initialization directly with app argument (line 18)"""
     with patch('src.services.ai_service.AIService.init_app') as mock_init_app:
@@ -348,6 +721,7 @@ def test_init_app_retrieve_failure(mock_app, mock_secret_client, mock_openai):
 
     service = AIService()
     service.init_app(mock_app)
+    service.ensure_initialized()
 
     mock_openai.beta.assistants.retrieve.assert_called_once()
     mock_openai.beta.assistants.create.assert_called_once()
@@ -699,8 +1073,34 @@ def test_run_state_transition(mock_sleep, mock_openai):
         thread_id="test-thread",
         run_id="run-id"
     )
-    mock_sleep.assert_called_once_with(1)
+    mock_sleep.assert_called_once()
+    assert 0 < mock_sleep.call_args[0][0] <= 0.2
     assert response == "Processing complete"
+    assert service.run_metrics.stats()['polls'] == 1
+
+
+@patch('time.sleep')
+def test_run_polling_backs_off_until_status_changes(mock_sleep, mock_openai):
+    """Test polling delays grow while queued and reset on status change"""
+    service = AIService()
+    service.client = mock_openai
+    service.assistant = MagicMock(id="test-assistant")
+    service.poll_settings = {
+        'initial_delay': 0.1, 'max_delay': 0.3, 'jitter': 0}
+
+    mock_openai.beta.threads.create.return_value = MagicMock(id="thread-id")
+    runs = [MagicMock(id="run-id", status=status) for status in [
+        "queued", "queued", "queued", "queued", "in_progress", "completed"]]
+    mock_openai.beta.threads.runs.create.return_value = runs[0]
+    mock_openai.beta.threads.runs.retrieve.side_effect = runs[1:]
+
+    service.get_ai_response("Hello")
+
+    delays = [call[0][0] for call in mock_sleep.call_args_list]
+    assert delays == pytest.approx([0.1, 0.2, 0.3, 0.3, 0.1])
+    stats = service.run_metrics.stats()
+    assert stats['runs'] == 1
+    assert stats['polls'] == 5
 
 
 def test_booking_generic_exception(mock_openai):
@@ -895,7 +1295,7 @@ def test_run_failed_without_last_error(mock_openai):
         service.get_ai_response("Hello")
 
 
-def test_get_ai_response_stores_thread_in_active_threads(mock_openai):
+def test_get_ai_response_stores_thread_in_registry(mock_openai):
     from src.services.ai_service import AIService
     from unittest.mock import MagicMock, PropertyMock
 
@@ -904,7 +1304,7 @@ def test_get_ai_response_stores_thread_in_active_threads(mock_openai):
     service.assistant = MagicMock(id="test-assistant")
 
     user_id = "test_user"
-    assert user_id not in service.active_threads
+    assert service.thread_registry.get(user_id) is None
 
     # Mock thread creation
     thread_mock = MagicMock(id="thread-id")
@@ -916,5 +1316,822 @@ def test_get_ai_response_stores_thread_in_active_threads(mock_openai):
 
     service.get_ai_response("Hello, D-Bot!", user_id=user_id)
 
-    assert user_id in service.active_threads
-    assert service.active_threads[user_id] is thread_mock
+    assert service.thread_registry.get(user_id) == "thread-id"
+
+
+def _tool_call(call_id, name, arguments):
+    tool_call = MagicMock()
+    tool_call.id = call_id
+    tool_call.function.name = name
+    tool_call.function.arguments = json.dumps(arguments)
+    return tool_call
+
+
+def _run_tool_round(mock_openai, tool_calls):
+    """run get_ai_response through one requires_action round and return
+    the submitted tool outputs"""
+    service = AIService()
+    service.client = mock_openai
+    service.assistant = MagicMock(id="test-assistant")
+    mock_openai.beta.threads.create.return_value = MagicMock(id="thread-id")
+
+    run_action = MagicMock(id="run-id", status="requires_action")
+    run_action.required_action.submit_tool_outputs.tool_calls = tool_calls
+    mock_openai.beta.threads.runs.create.return_value = run_action
+    mock_openai.beta.threads.runs.submit_tool_outputs.return_value = MagicMock(
+        status="completed")
+
+    service.get_ai_response("Hello")
+    return mock_openai.beta.threads.runs.submit_tool_outputs.call_args[
+        1]["tool_outputs"]
+
+
+AVAILABILITY_ARGS = {
+    "start_date": "2025-06-02T00:00:00+00:00",
+    "end_date": "2025-06-03T00:00:00+00:00"
+}
+
+
+@patch('src.routes.timeslot_routes.get_availability_internal')
+def test_read_only_tool_calls_run_concurrently(mock_get_availability,
+                                               mock_openai):
+    """Test independent tool calls in one round run at the same time"""
+    import threading
+
+    # only passes if both calls are waiting at the same time
+    barrier = threading.Barrier(2, timeout=5)
+
+    def get_availability(start_date, end_date):
+        barrier.wait()
+        return {start_date: 1}
+
+    mock_get_availability.side_effect = get_availability
+
+    tool_outputs = _run_tool_round(mock_openai, [
+        _tool_call("call-1", "get_availability", AVAILABILITY_ARGS),
+        _tool_call("call-2", "get_availability", {
+            "start_date": "2025-06-03T00:00:00+00:00",
+            "end_date": "2025-06-04T00:00:00+00:00"
+        })
+    ])
+
+    assert [output["tool_call_id"] for output in tool_outputs] == [
+        "call-1", "call-2"]
+    assert [json.loads(output["output"])["data"] for output in tool_outputs] == [
+        {"2025-06-02T00:00:00+00:00": 1}, {"2025-06-03T00:00:00+00:00": 1}]
+
+
+@patch('src.routes.booking_routes.create_booking_internal')
+def test_booking_tool_calls_stay_serialised(mock_create_booking, mock_openai):
+    """Test state changing tool calls run in order on the calling thread"""
+    import threading
+
+    calls = []
+
+    def create_booking(args):
+        calls.append((args["user"]["email"], threading.current_thread()))
+        return MagicMock(to_dict=MagicMock(return_value={}))
+
+    mock_create_booking.side_effect = create_booking
+    booking_args = [
+        {"user": {"email": f"user{i}@example.com", "full_name": "User"},
+         "timeslots": []}
+        for i in range(3)
+    ]
+
+    tool_outputs = _run_tool_round(mock_openai, [
+        _tool_call(f"call-{i}", "create_booking", args)
+        for i, args in enumerate(booking_args)
+    ] + [_tool_call("call-videos", "get_videos", {"category": "menu"})])
+
+    assert [email for email, _ in calls] == [
+        "user0@example.com", "user1@example.com", "user2@example.com"]
+    assert all(thread is threading.current_thread() for _, thread in calls)
+    assert [output["tool_call_id"] for output in tool_outputs] == [
+        "call-0", "call-1", "call-2", "call-videos"]
+
+
+@patch('src.routes.timeslot_routes.get_availability_internal')
+def test_concurrent_tool_calls_get_own_app_context(mock_get_availability,
+                                                   app, mock_openai):
+    """Test pooled tool calls run in their own app context and session"""
+    from flask import current_app
+    from src import db
+
+    sessions = []
+
+    def get_availability(start_date, end_date):
+        sessions.append((current_app._get_current_object(), db.session()))
+        return {}
+
+    mock_get_availability.side_effect = get_availability
+
+    _run_tool_round(mock_openai, [
+        _tool_call("call-1", "get_availability", AVAILABILITY_ARGS),
+        _tool_call("call-2", "get_videos", {"category": "menu"})
+    ])
+
+    [(worker_app, worker_session)] = sessions
+    assert worker_app is app
+    assert worker_session is not db.session()
+
+
+def _async_service(runs, reply="Hello from async"):
+    """service with an async client whose run goes through the given
+    statuses"""
+    from unittest.mock import AsyncMock
+
+    service = AIService()
+    service.assistant = MagicMock(id="test-assistant")
+    service.poll_settings = {'initial_delay': 0, 'max_delay': 0}
+
+    client = MagicMock()
+    client.beta.threads.create = AsyncMock(
+        return_value=MagicMock(id="thread-id"))
+    client.beta.threads.messages.create = AsyncMock()
+    client.beta.threads.runs.create = AsyncMock(return_value=runs[0])
+    client.beta.threads.runs.retrieve = AsyncMock(side_effect=runs[1:])
+    client.beta.threads.runs.submit_tool_outputs = AsyncMock(
+        return_value=MagicMock(id="run-id", status="completed"))
+    content_mock = MagicMock()
+    content_mock.text.value = reply
+    client.beta.threads.messages.list = AsyncMock(
+        return_value=MagicMock(data=[MagicMock(content=[content_mock])]))
+    service.async_client = client
+    return service
+
+
+def test_get_ai_response_async_not_initialized():
+    """Test error when async client is not initialized"""
+    import asyncio
+
+    service = AIService()
+    with pytest.raises(RuntimeError, match="AIService is not initialized"):
+        asyncio.run(service.get_ai_response_async("Hello"))
+
+
+def test_get_ai_response_async_polls_until_completed():
+    """Test async response polls the run without a thread per wait"""
+    import asyncio
+
+    service = _async_service([
+        MagicMock(id="run-id", status="queued"),
+        MagicMock(id="run-id", status="in_progress"),
+        MagicMock(id="run-id", status="completed")
+    ])
+
+    response = asyncio.run(
+        service.get_ai_response_async("Hello", user_id="user-1"))
+
+    assert response == "Hello from async"
+    assert service.async_client.beta.threads.runs.retrieve.await_count == 2
+    assert service.thread_registry.get("user-1") == "thread-id"
+    assert service.run_metrics.stats()['polls'] == 2
+
+
+def test_get_ai_response_async_run_failed():
+    """Test async handling of failed runs"""
+    import asyncio
+
+    service = _async_service([
+        MagicMock(id="run-id", status="failed", last_error="Broken")])
+
+    with pytest.raises(RuntimeError, match="Assistant run failed"):
+        asyncio.run(service.get_ai_response_async("Hello"))
+
+
+@patch('src.routes.timeslot_routes.get_availability_internal')
+def test_get_ai_response_async_runs_tools_off_the_loop(mock_get_availability,
+                                                       app):
+    """Test tool calls run on an executor thread inside an app context"""
+    import asyncio
+    import threading
+    from flask import current_app
+
+    calls = []
+
+    def get_availability(start_date, end_date):
+        calls.append((threading.current_thread(),
+                      current_app._get_current_object()))
+        return {}
+
+    mock_get_availability.side_effect = get_availability
+    run_action = MagicMock(id="run-id", status="requires_action")
+    run_action.required_action.submit_tool_outputs.tool_calls = [
+        _tool_call("call-1", "get_availability", AVAILABILITY_ARGS)]
+    service = _async_service([run_action])
+
+    asyncio.run(service.get_ai_response_async("Is Monday free?"))
+
+    [(thread, tool_app)] = calls
+    assert thread is not threading.current_thread()
+    assert tool_app is app
+    runs = service.async_client.beta.threads.runs
+    tool_outputs = runs.submit_tool_outputs.call_args[1]["tool_outputs"]
+    assert tool_outputs[0]["tool_call_id"] == "call-1"
+
+
+def _cached_service(mock_openai, reply="We are on the Docklands campus"):
+    from src.services.response_cache import ResponseCache
+
+    service = AIService()
+    service.client = mock_openai
+    service.assistant = MagicMock(id="test-assistant")
+    service.response_cache = ResponseCache()
+    mock_openai.beta.threads.create.return_value = MagicMock(id="thread-id")
+    mock_openai.beta.threads.runs.create.return_value = MagicMock(
+        id="run-id", status="completed")
+    mock_openai.beta.threads.messages.list.return_value = MagicMock(
+        data=[MagicMock(content=[MagicMock(text=MagicMock(value=reply))])])
+    return service
+
+
+def test_get_ai_response_caches_first_message_reply(mock_openai):
+    """Test a repeated first message is answered from the response cache"""
+    service = _cached_service(mock_openai)
+
+    first = service.get_ai_response("How do I get to the cafe?", "user-1")
+    second = service.get_ai_response("how do I get to the café", "user-2")
+
+    assert first == second == "We are on the Docklands campus"
+    mock_openai.beta.threads.runs.create.assert_called_once()
+    assert service.response_cache.stats()['hits'] == 1
+    # the cached exchange is kept for the second user's first run
+    assert service.thread_registry.lookup("user-2") == (None, None, (
+        {'role': 'user', 'content': "how do I get to the café"},
+        {'role': 'assistant', 'content': second}
+    ))
+
+
+def test_get_ai_response_cache_hit_never_calls_assistant(mock_openai):
+    """Test a cached reply for a user returns without touching the client"""
+    service = _cached_service(mock_openai)
+    service.get_ai_response("How do I get to the cafe?", "user-1")
+    mock_openai.reset_mock()
+
+    response = service.get_ai_response("How do I get to the cafe?", "user-2")
+
+    assert response == "We are on the Docklands campus"
+    assert mock_openai.mock_calls == []
+
+
+def test_get_ai_response_cache_hit_continues_conversation(mock_openai):
+    """Test a follow-up to a cached reply runs on the thread holding it"""
+    service = _cached_service(mock_openai)
+    service.get_ai_response("How do I get to the cafe?", "user-1")
+    mock_openai.beta.threads.create.return_value = MagicMock(
+        id="user-2-thread")
+    service.get_ai_response("How do I get to the cafe?", "user-2")
+
+    service.get_ai_response("Is there step-free access?", "user-2")
+
+    mock_openai.beta.threads.create.assert_called_with(messages=[
+        {'role': 'user', 'content': "How do I get to the cafe?"},
+        {'role': 'assistant', 'content': "We are on the Docklands campus"}
+    ])
+    mock_openai.beta.threads.messages.create.assert_called_with(
+        thread_id="user-2-thread", role="user",
+        content="Is there step-free access?")
+    assert mock_openai.beta.threads.runs.create.call_args[1][
+        'thread_id'] == "user-2-thread"
+
+
+def test_get_ai_response_skips_cache_mid_conversation(mock_openai):
+    """Test follow-up messages in a thread always run the assistant"""
+    service = _cached_service(mock_openai)
+    service.get_ai_response("How do I get to the cafe?", "user-1")
+
+    service.get_ai_response("How do I get to the cafe?", "user-1")
+
+    assert mock_openai.beta.threads.runs.create.call_count == 2
+    assert service.response_cache.stats()['hits'] == 0
+
+
+def test_stream_ai_response_cache_hit_kept_for_next_run(mock_openai):
+    """Test a streamed cached reply is kept for the user's next run"""
+    service = _cached_service(mock_openai)
+    service.get_ai_response("How do I get to the cafe?", "user-1")
+    mock_openai.reset_mock()
+
+    events = list(service.stream_ai_response(
+        "How do I get to the cafe?", "user-2"))
+
+    assert events[-1] == (
+        'done', {'response': "We are on the Docklands campus"})
+    assert mock_openai.mock_calls == []
+    pending = service.thread_registry.lookup("user-2").pending_messages
+    assert pending[1] == {
+        'role': 'assistant', 'content': "We are on the Docklands campus"}
+
+
+def test_get_ai_response_does_not_cache_tool_runs(mock_openai):
+    """Test replies that needed tool calls are not cached"""
+    service = _cached_service(mock_openai, reply="Here is the latte video")
+    run_action = MagicMock(id="run-id", status="requires_action")
+    run_action.required_action.submit_tool_outputs.tool_calls = [
+        _tool_call("call-1", "get_videos", {"category": "menu"})]
+    mock_openai.beta.threads.runs.create.return_value = run_action
+    mock_openai.beta.threads.runs.submit_tool_outputs.return_value = MagicMock(
+        status="completed")
+
+    with patch('src.data.videos.get_videos_by_category', return_value=[]):
+        service.get_ai_response("Show me a latte")
+        service.get_ai_response("Show me a latte")
+
+    assert mock_openai.beta.threads.runs.create.call_count == 2
+    assert service.response_cache.stats()['skipped'] == 2
+
+
+def test_response_cache_key_changes_with_assistant_config(mock_openai):
+    """Test replies from a previous assistant configuration are not reused"""
+    service = _cached_service(mock_openai)
+    service.config_fingerprint = "old"
+    service.get_ai_response("How do I get to the cafe?")
+
+    service.config_fingerprint = "new"
+    service.get_ai_response("How do I get to the cafe?")
+
+    assert mock_openai.beta.threads.runs.create.call_count == 2
+
+
+def test_get_ai_response_async_uses_response_cache():
+    """Test the async path shares the response cache"""
+    import asyncio
+    from src.services.response_cache import ResponseCache
+
+    service = _async_service([MagicMock(id="run-id", status="completed")])
+    service.response_cache = ResponseCache()
+
+    async def ask_twice():
+        return [await service.get_ai_response_async("Hello", user_id=user)
+                for user in ("user-1", "user-2")]
+
+    assert asyncio.run(ask_twice()) == ["Hello from async"] * 2
+    assert service.async_client.beta.threads.runs.create.await_count == 1
+    service.async_client.beta.threads.create.assert_awaited_once_with()
+    assert service.thread_registry.lookup("user-2").pending_messages == (
+        {'role': 'user', 'content': "Hello"},
+        {'role': 'assistant', 'content': "Hello from async"}
+    )
+
+
+class _GrowingThread:
+    """fake threads API that keeps every message and honours the list
+    filters, recording how many messages each list call returned"""
+
+    def __init__(self):
+        from types import SimpleNamespace
+
+        self.namespace = SimpleNamespace
+        self.messages = []
+        self.returned = []
+        self.runs = SimpleNamespace(create=self.create_run)
+
+    def create_message(self, thread_id, role, content):
+        self.messages.append(self._message(role, content, run_id=None))
+
+    def create_run(self, thread_id, assistant_id, **kwargs):
+        run_id = f"run-{len(self.messages)}"
+        self.messages.append(
+            self._message("assistant", f"reply {len(self.messages)}", run_id))
+        return self.namespace(id=run_id, status="completed")
+
+    def list_messages(self, thread_id, run_id=None, order='desc', limit=20):
+        messages = [message for message in self.messages
+                    if run_id is None or message.run_id == run_id]
+        if order == 'desc':
+            messages = messages[::-1]
+        page = messages[:limit]
+        self.returned.append(len(page))
+        return self.namespace(data=page)
+
+    def _message(self, role, value, run_id):
+        text = self.namespace(value=value, annotations=[])
+        return self.namespace(role=role, run_id=run_id, content=[
+            self.namespace(type="text", text=text)])
+
+    def client(self):
+        return self.namespace(beta=self.namespace(threads=self.namespace(
+            create=lambda: self.namespace(id="thread-id"),
+            messages=self.namespace(
+                create=self.create_message, list=self.list_messages),
+            runs=self.runs
+        )))
+
+
+def test_get_ai_response_fetches_only_latest_reply():
+    """Test the reply fetch stays one message as the conversation grows"""
+    thread = _GrowingThread()
+    service = AIService()
+    service.client = thread.client()
+    service.assistant = MagicMock(id="test-assistant")
+
+    replies = [service.get_ai_response(f"message {turn}", user_id="user-1")
+               for turn in range(30)]
+
+    assert len(thread.messages) == 60
+    assert thread.returned == [1] * 30
+    assert replies[-1] == "reply 59"
+
+
+def test_get_ai_response_requests_reply_for_run(mock_openai):
+    """Test the reply is listed newest first and filtered to the run"""
+    service = AIService()
+    service.client = mock_openai
+    service.assistant = MagicMock(id="test-assistant")
+    mock_openai.beta.threads.create.return_value = MagicMock(id="thread-id")
+    mock_openai.beta.threads.runs.create.return_value = MagicMock(
+        id="run-id", status="completed")
+
+    service.get_ai_response("Hello")
+
+    mock_openai.beta.threads.messages.list.assert_called_once_with(
+        thread_id="thread-id", run_id="run-id", order='desc', limit=1)
+
+
+def test_message_text_joins_text_blocks():
+    """Test multi-part replies keep every text block and drop citations"""
+    from types import SimpleNamespace
+
+    citation = SimpleNamespace(type="file_citation", text="【4:0†faq.txt】")
+    message = SimpleNamespace(content=[
+        SimpleNamespace(type="text", text=SimpleNamespace(
+            value="We open at 8am【4:0†faq.txt】.", annotations=[citation])),
+        SimpleNamespace(type="image_file",
+                        image_file=SimpleNamespace(file_id="file-1")),
+        SimpleNamespace(type="text", text=SimpleNamespace(
+            value="See you soon!", annotations=[])),
+    ])
+
+    assert AIService()._message_text([message]) == (
+        "We open at 8am.\n\nSee you soon!")
+
+
+def test_message_text_without_reply():
+    """Test a run that added no message is reported as an error"""
+    with pytest.raises(RuntimeError, match="did not add a reply"):
+        AIService()._message_text([])
+
+
+def test_get_ai_response_async_requests_reply_for_run():
+    """Test the async path fetches only the run's newest message"""
+    import asyncio
+
+    service = _async_service([MagicMock(id="run-id", status="completed")])
+
+    asyncio.run(service.get_ai_response_async("Hello"))
+
+    service.async_client.beta.threads.messages.list.assert_awaited_once_with(
+        thread_id="thread-id", run_id="run-id", order='desc', limit=1)
+
+
+def _budget_service(mock_openai):
+    service = AIService()
+    service.client = mock_openai
+    service.assistant = MagicMock(id="test-assistant")
+    service.poll_settings = {'initial_delay': 0, 'max_delay': 0}
+    mock_openai.beta.threads.create.return_value = MagicMock(id="thread-id")
+    mock_openai.beta.threads.runs.create.return_value = MagicMock(
+        id="run-1", status="queued")
+    mock_openai.beta.threads.runs.retrieve.return_value = MagicMock(
+        id="run-1", status="in_progress")
+    return service
+
+
+def test_timed_out_run_still_stopping_blocks_thread_reuse(mock_openai):
+    """Test the next message waits for a run that was slow to cancel"""
+    service = _budget_service(mock_openai)
+    service.run_timeout = 0
+    service.cancel_timeout = 0
+    mock_openai.beta.threads.runs.cancel.return_value = MagicMock(
+        id="run-1", status="cancelling")
+
+    with pytest.raises(RuntimeError, match="Timeout"):
+        service.get_ai_response("Hello", user_id="user-1")
+
+    entry = service.thread_registry.lookup("user-1")
+    assert entry.abandoned_run_id == "run-1"
+    assert service.run_metrics.stats()['cancellations_pending'] == 1
+
+    # the cancellation completes before the user's next message
+    service.run_timeout = 30
+    mock_openai.beta.threads.runs.retrieve.return_value = MagicMock(
+        id="run-1", status="cancelled")
+    mock_openai.beta.threads.runs.create.return_value = MagicMock(
+        id="run-2", status="completed")
+    mock_openai.beta.threads.messages.create.reset_mock()
+
+    service.get_ai_response("Are you there?", user_id="user-1")
+
+    mock_openai.beta.threads.runs.retrieve.assert_called_with(
+        thread_id="thread-id", run_id="run-1")
+    mock_openai.beta.threads.messages.create.assert_called_once()
+    entry = service.thread_registry.lookup("user-1")
+    assert entry.abandoned_run_id is None
+
+
+def test_message_rejected_while_previous_run_is_cancelling(mock_openai):
+    """Test a message is not posted to a thread whose run is still active"""
+    service = _budget_service(mock_openai)
+    service.run_timeout = 0
+    service.thread_registry.set("user-1", "thread-id")
+    service.thread_registry.set_abandoned_run("user-1", "run-1")
+    mock_openai.beta.threads.runs.retrieve.return_value = MagicMock(
+        id="run-1", status="cancelling")
+
+    with pytest.raises(RuntimeError, match="previous response"):
+        service.get_ai_response("Hello", user_id="user-1")
+
+    mock_openai.beta.threads.messages.create.assert_not_called()
+
+
+def test_tool_calls_stop_waiting_when_budget_runs_out(mock_openai):
+    """Test slow tool calls count against the request's budget"""
+    import threading
+    from src.services.run_polling import RunBudget, RunTimeout
+
+    release = threading.Event()
+    service = AIService()
+    tool_calls = [
+        _tool_call("call-1", "get_availability", AVAILABILITY_ARGS),
+        _tool_call("call-2", "get_availability", AVAILABILITY_ARGS)]
+
+    with patch.object(service, '_run_tool_call',
+                      side_effect=lambda call: release.wait(5)):
+        with pytest.raises(RunTimeout):
+            service._get_tool_outputs(tool_calls, RunBudget(0.05))
+    release.set()
+
+
+def test_get_ai_response_async_timeout_cancels_run():
+    """Test the async path cancels runs that exceed the budget"""
+    import asyncio
+    from unittest.mock import AsyncMock
+
+    service = _async_service([MagicMock(id="run-id", status="queued")])
+    service.run_timeout = 0
+    runs = service.async_client.beta.threads.runs
+    runs.cancel = AsyncMock(
+        return_value=MagicMock(id="run-id", status="cancelled"))
+
+    with pytest.raises(RuntimeError, match="Timeout"):
+        asyncio.run(service.get_ai_response_async("Hello"))
+
+    runs.cancel.assert_awaited_once_with(thread_id="thread-id",
+                                         run_id="run-id")
+    assert service.run_metrics.stats()['cancellations'] == 1
+
+
+def test_stream_closed_early_cancels_run(mock_openai):
+    """Test a client leaving mid-stream cancels the run"""
+    from types import SimpleNamespace
+
+    service = _budget_service(mock_openai)
+    events = [
+        SimpleNamespace(event='thread.run.created',
+                        data=SimpleNamespace(id="run-1")),
+        SimpleNamespace(event='thread.message.delta', data=SimpleNamespace(
+            delta=SimpleNamespace(content=[SimpleNamespace(
+                type='text', text=SimpleNamespace(value="Hel"))]))),
+    ]
+    stream = MagicMock()
+    stream.__iter__.return_value = iter(events)
+    mock_openai.beta.threads.runs.create.return_value = stream
+    mock_openai.beta.threads.runs.cancel.return_value = MagicMock(
+        id="run-1", status="cancelled")
+
+    response = service.stream_ai_response("Hello")
+    assert next(response) == ('delta', {'text': "Hel"})
+    response.close()
+
+    mock_openai.beta.threads.runs.cancel.assert_called_once_with(
+        thread_id="thread-id", run_id="run-1")
+    assert service.run_metrics.stats()['timeouts'] == 0
+
+
+def test_messages_sent_during_a_run_are_answered_by_one_run(mock_openai):
+    """Test a conversation's messages never overlap an active run and are
+    coalesced into the next run"""
+    import threading
+    import time as real_time
+
+    service = AIService()
+    service.client = mock_openai
+    service.assistant = MagicMock(id="test-assistant")
+    mock_openai.beta.threads.create.return_value = MagicMock(id="thread-id")
+
+    first_run_started = threading.Event()
+    release_first_run = threading.Event()
+    runs = []
+
+    def create_run(**kwargs):
+        runs.append(mock_openai.beta.threads.messages.create.call_count)
+        if len(runs) == 1:
+            first_run_started.set()
+            release_first_run.wait(5)
+        return MagicMock(id=f"run-{len(runs)}", status="completed")
+
+    mock_openai.beta.threads.runs.create.side_effect = create_run
+    mock_openai.beta.threads.messages.list.side_effect = lambda **kwargs: (
+        MagicMock(data=[MagicMock(content=[MagicMock(
+            text=MagicMock(value=f"reply to {kwargs['run_id']}"))])]))
+
+    responses = {}
+
+    def chat(message):
+        responses[message] = service.get_ai_response(message, "user-1")
+
+    first = threading.Thread(target=chat, args=("Hi",))
+    first.start()
+    assert first_run_started.wait(5)
+    followers = [threading.Thread(target=chat, args=(message,))
+                 for message in ("Book me in", "For 2pm")]
+    for follower in followers:
+        follower.start()
+    while service.conversation_queue.stats()['pending'] < 2:
+        real_time.sleep(0.01)
+    release_first_run.set()
+    for thread in [first] + followers:
+        thread.join(5)
+
+    # the second run started only after both queued messages were posted
+    assert runs == [1, 3]
+    assert responses == {
+        "Hi": "reply to run-1",
+        "Book me in": "reply to run-2",
+        "For 2pm": "reply to run-2"
+    }
+
+
+def test_get_ai_response_rejects_when_queue_is_full(mock_openai):
+    """Test a conversation with too many queued messages is refused"""
+    from src.services.conversation_queue import (
+        ConversationBusy, ConversationQueue)
+
+    service = AIService()
+    service.client = mock_openai
+    service.assistant = MagicMock(id="test-assistant")
+    service.conversation_queue = ConversationQueue(max_pending=1)
+    service.conversation_queue.enqueue("user-1", "still running")
+
+    with pytest.raises(ConversationBusy):
+        service.get_ai_response("Hello?", user_id="user-1")
+
+    mock_openai.beta.threads.messages.create.assert_not_called()
+
+
+@patch('src.routes.timeslot_routes.get_availability_internal')
+def test_get_ai_response_records_usage(mock_get_availability, mock_openai):
+    """Test a run's token usage, polls and tool call durations are recorded"""
+    mock_get_availability.return_value = {}
+    service = AIService()
+    service.usage_recorder = MagicMock()
+    service.client = mock_openai
+    service.assistant = MagicMock(id="test-assistant")
+    service.poll_settings = {'initial_delay': 0, 'max_delay': 0}
+    mock_openai.beta.threads.create.return_value = MagicMock(id="thread-id")
+
+    run_action = MagicMock(id="run-id", status="requires_action")
+    run_action.required_action.submit_tool_outputs.tool_calls = [
+        _tool_call("call-1", "get_availability", AVAILABILITY_ARGS)]
+    mock_openai.beta.threads.runs.create.return_value = run_action
+    mock_openai.beta.threads.runs.submit_tool_outputs.return_value = MagicMock(
+        id="run-id", status="in_progress")
+    completed = MagicMock(id="run-id", status="completed")
+    completed.usage.prompt_tokens = 120
+    completed.usage.completion_tokens = 30
+    completed.usage.total_tokens = 150
+    mock_openai.beta.threads.runs.retrieve.return_value = completed
+
+    service.get_ai_response("Any slots tomorrow?", user_id="user-1")
+
+    service.usage_recorder.record.assert_called_once()
+    usage = service.usage_recorder.record.call_args[1]
+    assert usage['run_id'] == "run-id"
+    assert usage['thread_id'] == "thread-id"
+    assert usage['user_id'] == "user-1"
+    assert usage['status'] == "completed"
+    assert (usage['prompt_tokens'], usage['completion_tokens'],
+            usage['total_tokens']) == (120, 30, 150)
+    assert usage['polls'] == 1
+    assert usage['wall_time'] >= 0
+    assert [name for name, _ in usage['tool_calls']] == ["get_availability"]
+
+
+def test_timed_out_run_usage_is_recorded(mock_openai):
+    """Test a run that timed out is recorded without token counts"""
+    service = _budget_service(mock_openai)
+    service.usage_recorder = MagicMock()
+    service.run_timeout = 0
+    service.cancel_timeout = 0
+
+    with pytest.raises(RuntimeError, match="Timeout"):
+        service.get_ai_response("Hello")
+
+    usage = service.usage_recorder.record.call_args[1]
+    assert usage['status'] == "timeout"
+    assert usage['total_tokens'] is None
+    assert usage['user_id'] is None
+
+
+def test_rotated_api_key_replaces_clients(mock_app, mock_secret_client,
+                                          mock_openai):
+    """Test a refreshed API key is used without re-initialising"""
+    service = AIService()
+    service.init_app(mock_app)
+    service.ensure_initialized()
+    service.secret_provider.stop()
+    mock_secret_client.return_value.get_secret.return_value = MagicMock(
+        value="rotated-key")
+
+    with patch('src.services.ai_service.AzureOpenAI') as mock_client:
+        service.secret_provider.refresh('openai-key')
+
+    assert mock_client.call_args[1]['api_key'] == "rotated-key"
+    assert service.client is mock_client.return_value
+    assert service.assistant is not None
+
+
+def _open_circuit(service):
+    from src.services.faq_index import FaqIndex
+    from src.services.ai_service import FAQ_RESPONSES
+
+    service.faq_index = FaqIndex(FAQ_RESPONSES)
+    service.booking_url = "https://example.com/book"
+    service.circuit_breaker.min_calls = 1
+    service.circuit_breaker.record(1, failed=True)
+
+
+def test_get_ai_response_degraded_while_circuit_open(mock_openai):
+    """Test chat answers from the FAQ without calling Azure while open"""
+    service = AIService()
+    service.client = mock_openai
+    service.assistant = MagicMock(id="test-assistant")
+    _open_circuit(service)
+
+    response = service.get_ai_response(
+        "Is there wifi I could use?", user_id="user-1")
+
+    assert "Do you provide Wi-Fi for customers?" in response
+    assert "https://example.com/book" in response
+    mock_openai.beta.threads.create.assert_not_called()
+    mock_openai.beta.threads.runs.create.assert_not_called()
+    assert service.circuit_breaker.stats()['state'] == 'open'
+
+
+def test_stream_ai_response_degraded_while_circuit_open(mock_openai):
+    service = AIService()
+    service.client = mock_openai
+    service.assistant = MagicMock(id="test-assistant")
+    _open_circuit(service)
+
+    events = list(service.stream_ai_response("Can I book a visit?"))
+
+    assert [event for event, _ in events] == ['delta', 'done']
+    assert "https://example.com/book" in events[1][1]['response']
+    mock_openai.beta.threads.runs.create.assert_not_called()
+
+
+def test_get_ai_response_async_degraded_while_circuit_open():
+    import asyncio
+
+    service = _async_service([MagicMock(id="run-id", status="completed")])
+    _open_circuit(service)
+
+    response = asyncio.run(service.get_ai_response_async("Hello"))
+
+    assert "can only help with common questions" in response
+    service.async_client.beta.threads.runs.create.assert_not_called()
+
+
+def test_timeouts_open_the_circuit(mock_openai):
+    """Test runs timing out count as failures and open the circuit"""
+    service = _budget_service(mock_openai)
+    service.run_timeout = 0
+    service.cancel_timeout = 0
+    service.circuit_breaker.min_calls = 2
+
+    for _ in range(2):
+        with pytest.raises(RuntimeError, match="Timeout"):
+            service.get_ai_response("Hello")
+    mock_openai.beta.threads.runs.create.reset_mock()
+
+    response = service.get_ai_response("Hello")
+
+    assert "can't reach its assistant" in response
+    mock_openai.beta.threads.runs.create.assert_not_called()
+
+
+def test_failed_runs_only_count_backend_errors(mock_openai):
+    from src.services.run_polling import RunFailed
+
+    service = AIService()
+
+    server_error = MagicMock(status="failed")
+    server_error.last_error.code = "server_error"
+    invalid_prompt = MagicMock(status="failed")
+    invalid_prompt.last_error.code = "invalid_prompt"
+
+    assert service._is_backend_failure(RunFailed(server_error)) is True
+    assert service._is_backend_failure(RunFailed(invalid_prompt)) is False
+    assert service._is_backend_failure(ValueError()) is False
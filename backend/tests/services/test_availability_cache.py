@@ -0,0 +1,86 @@
+import pytest
+from datetime import date, datetime, timezone
+from unittest.mock import patch
+from src.services.availability_cache import AvailabilityCache, day_of
+from src import db
+
+DAY = date(2030, 1, 7)
+NEXT_DAY = date(2030, 1, 8)
+
+
+@pytest.fixture
+def cache():
+    cache = AvailabilityCache()
+    cache.ttl = 60
+    cache.max_days = 2
+    return cache
+
+
+def test_day_of_naive_and_aware():
+    naive = datetime(2030, 1, 7, 23, 0)
+    aware = datetime.fromisoformat('2030-01-08T01:00:00+02:00')
+
+    assert day_of(naive) == DAY
+    assert day_of(aware) == DAY
+
+
+def test_get_many_hits_and_misses(cache):
+    cache.put_many({DAY: {'slot': 1}}, cache.generation)
+
+    assert cache.get_many([DAY, NEXT_DAY]) == {DAY: {'slot': 1}}
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['misses'] == 1
+
+
+def test_entries_expire_after_ttl(cache):
+    with patch('src.services.availability_cache.time.monotonic',
+               return_value=0):
+        cache.put_many({DAY: {}}, cache.generation)
+
+    with patch('src.services.availability_cache.time.monotonic',
+               return_value=61):
+        assert cache.get_many([DAY]) == {}
+    assert cache.stats()['size'] == 0
+
+
+def test_least_recently_used_day_evicted(cache):
+    cache.put_many({DAY: {}, NEXT_DAY: {}}, cache.generation)
+    cache.get_many([DAY])
+    cache.put_many({date(2030, 1, 9): {}}, cache.generation)
+
+    assert set(cache.get_many([DAY, NEXT_DAY])) == {DAY}
+    assert cache.stats()['evictions'] == 1
+
+
+def test_put_many_skipped_after_invalidation(cache):
+    generation = cache.generation
+    cache.invalidate([DAY])
+    cache.put_many({DAY: {'stale': 1}}, generation)
+
+    assert cache.get_many([DAY]) == {}
+
+
+def test_invalidate_on_commit(app, cache):
+    cache.put_many({DAY: {}, NEXT_DAY: {}}, cache.generation)
+    start_time = datetime(2030, 1, 7, 10, 0, tzinfo=timezone.utc)
+
+    with patch('src.availability_cache', cache):
+        cache.invalidate_on_commit(db.session, [start_time])
+        assert set(cache.get_many([DAY, NEXT_DAY])) == {DAY, NEXT_DAY}
+
+        db.session.commit()
+
+    assert set(cache.get_many([DAY, NEXT_DAY])) == {NEXT_DAY}
+
+
+def test_invalidate_on_commit_discarded_on_rollback(app, cache):
+    cache.put_many({DAY: {}}, cache.generation)
+    start_time = datetime(2030, 1, 7, 10, 0, tzinfo=timezone.utc)
+
+    with patch('src.availability_cache', cache):
+        db.session.execute(db.text('SELECT 1'))
+        cache.invalidate_on_commit(db.session, [start_time])
+        db.session.rollback()
+        db.session.commit()
+
+    assert set(cache.get_many([DAY])) == {DAY}
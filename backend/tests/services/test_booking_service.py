@@ -1,3 +1,4 @@
+import os
 import pytest
 from datetime import datetime, timezone, timedelta
 from src.services.booking_service import BookingService
@@ -95,3 +96,219 @@ def test_create_booking_rollback_on_error(app, booking_service, booking_data):
 
     assert Booking.query.count() == 0
     assert User.query.count() == 0
+
+
+def test_create_booking_updates_booked_count(app, booking_service,
+                                             booking_data):
+    future_time = datetime.now(timezone.utc) + timedelta(days=1)
+    future_time = future_time.replace(
+        hour=10, minute=0, second=0, microsecond=0)
+
+    booking_data['timeslots'] = [
+        {'start_time': future_time.isoformat()},
+        {'start_time': (future_time + timedelta(hours=1)).isoformat()}
+    ]
+
+    booking = booking_service.create_booking(booking_data)
+    assert [ts.booked_count for ts in booking.timeslots] == [1, 1]
+
+    booking.cancel()
+    db.session.commit()
+    assert [ts.booked_count for ts in booking.timeslots] == [0, 0]
+
+    # leaving a non-booked state does not decrement again
+    booking.complete()
+    db.session.commit()
+    assert [ts.booked_count for ts in booking.timeslots] == [0, 0]
+
+
+def test_create_booking_full_timeslot(app, booking_service, booking_data):
+    from src.models.timeslot import Timeslot
+
+    start_time = datetime(2030, 1, 7, 10, 0, tzinfo=timezone.utc)
+    db.session.add(Timeslot(start_time=start_time + timedelta(hours=1),
+                            capacity=0))
+    db.session.commit()
+
+    booking_data['timeslots'] = [
+        {'start_time': start_time.isoformat()},
+        {'start_time': (start_time + timedelta(hours=1)).isoformat()}
+    ]
+
+    with pytest.raises(ValueError, match="fully booked"):
+        booking_service.create_booking(booking_data)
+
+    assert Booking.query.count() == 0
+    # the first timeslot's reservation is rolled back too
+    assert Timeslot.query.filter_by(start_time=start_time).count() == 0
+
+
+def _create_bookings_concurrently(app, start_times, workers):
+    """create one single-slot booking per start time from parallel threads,
+    returning the number that succeeded"""
+    from concurrent.futures import ThreadPoolExecutor
+    from threading import Barrier
+
+    barrier = Barrier(len(start_times))
+
+    def create(index, start_time):
+        with app.app_context():
+            barrier.wait()
+            try:
+                BookingService().create_booking({
+                    'user': {'email': f'user{index}@example.com',
+                             'full_name': 'Test User'},
+                    'timeslots': [{'start_time': start_time.isoformat()}]
+                })
+                return True
+            except ValueError:
+                return False
+            finally:
+                db.session.remove()
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(create, range(len(start_times)), start_times)
+        return sum(results)
+
+
+def _database_app(uri, engine_options=None):
+    """app backed by a real database so threads share the same data"""
+    from app import create_app
+    from tests.conftest import TestConfig
+
+    class DatabaseConfig(TestConfig):
+        SQLALCHEMY_DATABASE_URI = uri
+        SQLALCHEMY_ENGINE_OPTIONS = engine_options or {}
+
+    database_app = create_app(DatabaseConfig)
+    with database_app.app_context():
+        db.create_all()
+        yield database_app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def file_app(tmp_path):
+    """app backed by a file database, SQLite serialises writers so this
+    checks correctness under contention, not that bookings run in parallel"""
+    yield from _database_app(f"sqlite:///{tmp_path / 'stress.db'}",
+                             {'connect_args': {'timeout': 30}})
+
+
+@pytest.fixture
+def postgres_app():
+    """app backed by the Postgres database at TEST_POSTGRES_URL, whose
+    tables are created and dropped around the test"""
+    uri = os.getenv('TEST_POSTGRES_URL')
+    if not uri:
+        pytest.skip("TEST_POSTGRES_URL is not set")
+    yield from _database_app(uri)
+
+
+def test_concurrent_bookings_respect_capacity(file_app):
+    from src.models.timeslot import Timeslot, MAX_BOOKINGS_PER_TIMESLOT
+
+    start_time = datetime(2030, 1, 7, 10, 0, tzinfo=timezone.utc)
+    db.session.add(Timeslot(start_time=start_time))
+    db.session.commit()
+
+    succeeded = _create_bookings_concurrently(
+        file_app, [start_time] * 24, workers=24)
+
+    timeslot = Timeslot.query.one()
+    assert succeeded == MAX_BOOKINGS_PER_TIMESLOT
+    assert timeslot.booked_count == MAX_BOOKINGS_PER_TIMESLOT
+    assert timeslot.bookings.count() == MAX_BOOKINGS_PER_TIMESLOT
+
+
+def test_concurrent_bookings_unrelated_timeslots(file_app):
+    from src.models.timeslot import Timeslot
+
+    start = datetime(2030, 1, 7, 8, 0, tzinfo=timezone.utc)
+    start_times = [start + timedelta(days=day, hours=hour)
+                   for day in range(4) for hour in range(9)]
+    db.session.add_all([Timeslot(start_time=t) for t in start_times])
+    db.session.commit()
+
+    succeeded = _create_bookings_concurrently(
+        file_app, start_times, workers=len(start_times))
+
+    assert succeeded == len(start_times)
+    assert all(ts.booked_count == 1 for ts in Timeslot.query.all())
+
+
+def test_bookings_for_unrelated_timeslots_overlap(postgres_app):
+    from concurrent.futures import ThreadPoolExecutor
+    from threading import Event
+    from src.models.timeslot import Timeslot
+    from src.services.timeslot_service import TimeslotService
+
+    start_time = datetime(2030, 1, 7, 10, 0, tzinfo=timezone.utc)
+    other_time = start_time + timedelta(hours=1)
+    db.session.add_all([Timeslot(start_time=start_time),
+                        Timeslot(start_time=other_time)])
+    db.session.commit()
+    reserved = Event()
+    release = Event()
+
+    def hold_first_timeslot():
+        with postgres_app.app_context():
+            try:
+                timeslot = Timeslot.query.filter_by(
+                    start_time=start_time).one()
+                TimeslotService().reserve_timeslots([timeslot])
+                reserved.set()
+                # keep the row locked until the other booking has committed
+                release.wait(10)
+                db.session.commit()
+            finally:
+                db.session.remove()
+
+    def book_other_timeslot():
+        with postgres_app.app_context():
+            try:
+                BookingService().create_booking({
+                    'user': {'email': 'other@example.com',
+                             'full_name': 'Test User'},
+                    'timeslots': [{'start_time': other_time.isoformat()}]
+                })
+            finally:
+                db.session.remove()
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        holder = executor.submit(hold_first_timeslot)
+        assert reserved.wait(10)
+        booker = executor.submit(book_other_timeslot)
+        try:
+            # would time out if the first transaction's lock blocked it
+            booker.result(timeout=5)
+        finally:
+            release.set()
+        holder.result()
+
+    db.session.expire_all()
+    assert [ts.booked_count for ts in
+            Timeslot.query.order_by(Timeslot.start_time)] == [1, 1]
+
+
+def test_create_booking_statement_count_independent_of_length(
+        app, booking_service, count_statements):
+    def count_booking_statements(email, start_time, hours):
+        with count_statements() as statements:
+            booking_service.create_booking({
+                'user': {'email': email, 'full_name': 'Test User'},
+                'timeslots': [
+                    {'start_time': (start_time + timedelta(hours=i))
+                     .isoformat()}
+                    for i in range(hours)
+                ]
+            })
+        return len(statements)
+
+    start_time = datetime(2030, 1, 7, 8, 0, tzinfo=timezone.utc)
+    single = count_booking_statements('one@example.com', start_time, 1)
+    multi = count_booking_statements('many@example.com',
+                                     start_time + timedelta(days=1), 6)
+
+    assert single == multi
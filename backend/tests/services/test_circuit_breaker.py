@@ -0,0 +1,136 @@
+import pytest
+from src.services.circuit_breaker import (
+    CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpen)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def _breaker(clock, **kwargs):
+    settings = {'window': 4, 'min_calls': 4, 'failure_rate': 0.5,
+                'slow_call_seconds': 10, 'slow_call_rate': 0.5,
+                'open_seconds': 30, 'clock': clock}
+    settings.update(kwargs)
+    return CircuitBreaker(**settings)
+
+
+def _fail(breaker):
+    with pytest.raises(ValueError):
+        with breaker.guard():
+            raise ValueError('backend down')
+
+
+def test_opens_at_failure_rate(clock):
+    breaker = _breaker(clock)
+    for _ in range(2):
+        with breaker.guard():
+            pass
+    _fail(breaker)
+    assert breaker.state == CLOSED
+
+    _fail(breaker)
+
+    assert breaker.state == OPEN
+    assert breaker.allows_calls() is False
+    with pytest.raises(CircuitOpen):
+        breaker.acquire()
+    assert breaker.stats()['opened'] == 1
+    assert breaker.stats()['rejected'] == 1
+
+
+def test_waits_for_min_calls(clock):
+    breaker = _breaker(clock)
+
+    for _ in range(3):
+        _fail(breaker)
+
+    assert breaker.state == CLOSED
+
+
+def test_opens_at_slow_call_rate(clock):
+    breaker = _breaker(clock)
+    for duration in [1, 12, 1, 15]:
+        with breaker.guard():
+            clock.now += duration
+
+    assert breaker.state == OPEN
+
+
+def test_ignores_errors_that_are_not_failures(clock):
+    breaker = _breaker(clock)
+
+    for _ in range(4):
+        # the client went away, not the backend
+        with pytest.raises(GeneratorExit):
+            with breaker.guard():
+                raise GeneratorExit()
+
+    assert breaker.state == CLOSED
+    assert breaker.stats()['failure_rate'] == 0.0
+
+
+def test_half_open_probe_closes_circuit(clock):
+    breaker = _breaker(clock)
+    for _ in range(4):
+        _fail(breaker)
+
+    clock.now += 30
+    assert breaker.allows_calls() is True
+    with breaker.guard():
+        assert breaker.state == HALF_OPEN
+        # only one probe at a time
+        assert breaker.allows_calls() is False
+        with pytest.raises(CircuitOpen):
+            breaker.acquire()
+
+    assert breaker.state == CLOSED
+    assert breaker.stats()['calls'] == 0
+
+
+def test_failed_probe_reopens_circuit(clock):
+    breaker = _breaker(clock)
+    for _ in range(4):
+        _fail(breaker)
+
+    clock.now += 30
+    _fail(breaker)
+
+    assert breaker.state == OPEN
+    assert breaker.stats()['opened'] == 2
+    clock.now += 29
+    assert breaker.allows_calls() is False
+
+
+def test_slow_probe_reopens_circuit(clock):
+    breaker = _breaker(clock)
+    for _ in range(4):
+        _fail(breaker)
+
+    clock.now += 30
+    with breaker.guard():
+        clock.now += 10
+
+    assert breaker.state == OPEN
+
+
+def test_calls_finishing_after_circuit_opened_are_ignored(clock):
+    breaker = _breaker(clock, window=2, min_calls=2)
+    probe = breaker.acquire()
+    for _ in range(2):
+        _fail(breaker)
+    assert breaker.state == OPEN
+
+    breaker.record(1, probe=probe)
+
+    assert breaker.state == OPEN
+    assert breaker.stats()['calls'] == 0
@@ -0,0 +1,139 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+from src import db
+from src.models.conversation_lease import ConversationLease
+from src.services.conversation_queue import (
+    LEAD, ConversationBusy, ConversationLock, ConversationQueue,
+    DatabaseConversationLock, create_conversation_lock)
+from src.services.run_polling import RunBudget, RunTimeout
+
+
+def test_first_message_leads_and_later_ones_wait():
+    queue = ConversationQueue()
+
+    first = queue.enqueue('user-1', 'hello')
+    second = queue.enqueue('user-1', 'are you there?')
+
+    assert first.result(timeout=0) is LEAD
+    assert not second.done()
+
+
+def test_messages_queued_during_a_run_share_the_next_run():
+    queue = ConversationQueue()
+    queue.enqueue('user-1', 'hello')
+    batch = queue.take_batch('user-1')
+    second = queue.enqueue('user-1', 'one more thing')
+    third = queue.enqueue('user-1', 'and another')
+
+    queue.finish('user-1', batch, 'Hi!')
+
+    # the first queued message leads the next batch, which has both
+    assert second.result(timeout=0) is LEAD
+    next_batch = queue.take_batch('user-1')
+    assert [message for message, _ in next_batch] == [
+        'one more thing', 'and another']
+    queue.finish('user-1', next_batch, 'Sure')
+
+    assert third.result(timeout=0) == 'Sure'
+    stats = queue.stats()
+    assert stats['batches'] == 2
+    assert stats['coalesced'] == 1
+    assert stats['conversations'] == 0
+
+
+def test_finish_with_error_fails_the_batch():
+    queue = ConversationQueue()
+    queue.enqueue('user-1', 'hello')
+    follower = queue.enqueue('user-1', 'hello again')
+    batch = queue.take_batch('user-1')
+
+    queue.finish('user-1', batch, error=RuntimeError("run failed"))
+
+    with pytest.raises(RuntimeError, match="run failed"):
+        follower.result(timeout=0)
+
+
+def test_queue_length_is_bounded():
+    queue = ConversationQueue(max_pending=2)
+    queue.enqueue('user-1', 'one')
+    queue.enqueue('user-1', 'two')
+
+    with pytest.raises(ConversationBusy):
+        queue.enqueue('user-1', 'three')
+
+    # other conversations are unaffected
+    assert queue.enqueue('user-2', 'hi').result(timeout=0) is LEAD
+    assert queue.stats()['rejected'] == 1
+
+
+def test_withdrawn_message_is_not_answered():
+    queue = ConversationQueue()
+    queue.enqueue('user-1', 'hello')
+    batch = queue.take_batch('user-1')
+    gave_up = queue.enqueue('user-1', 'still there?')
+
+    queue.withdraw('user-1', gave_up)
+    queue.finish('user-1', batch, 'Hi!')
+
+    assert queue.stats()['conversations'] == 0
+
+
+def test_withdrawn_leader_hands_over():
+    queue = ConversationQueue()
+    queue.enqueue('user-1', 'hello')
+    batch = queue.take_batch('user-1')
+    gave_up = queue.enqueue('user-1', 'still there?')
+    waiting = queue.enqueue('user-1', 'hello?')
+    queue.finish('user-1', batch, 'Hi!')
+    assert gave_up.result(timeout=0) is LEAD
+
+    queue.withdraw('user-1', gave_up)
+
+    assert waiting.result(timeout=0) is LEAD
+    assert [message for message, _ in queue.take_batch('user-1')] == [
+        'hello?']
+
+
+def test_database_lock_excludes_other_holders(app):
+    lock = DatabaseConversationLock(lease=60)
+
+    token = lock.acquire('user-1', RunBudget(1))
+
+    with pytest.raises(RunTimeout, match="previous message"):
+        lock.acquire('user-1', RunBudget(0))
+    assert lock.acquire('user-2', RunBudget(0))
+
+    lock.release('user-1', token)
+    assert lock.acquire('user-1', RunBudget(0))
+
+
+def test_database_lock_takes_over_expired_lease(app):
+    db.session.add(ConversationLease(
+        conversation_key='user-1', owner='crashed-worker',
+        expires_at=datetime.now(timezone.utc) - timedelta(seconds=1)))
+    db.session.commit()
+    lock = DatabaseConversationLock()
+
+    token = lock.acquire('user-1', RunBudget(0))
+
+    assert db.session.get(ConversationLease, 'user-1').owner == token
+
+
+def test_database_lock_release_keeps_other_owner(app):
+    lock = DatabaseConversationLock()
+    token = lock.acquire('user-1', RunBudget(0))
+
+    lock.release('user-1', 'someone-else')
+
+    assert db.session.get(ConversationLease, 'user-1').owner == token
+
+
+def test_create_conversation_lock():
+    assert isinstance(create_conversation_lock({}), ConversationLock)
+    lock = create_conversation_lock({
+        'AI_CONVERSATION_LOCK': 'database',
+        'AI_CONVERSATION_LOCK_LEASE': 90})
+    assert isinstance(lock, DatabaseConversationLock)
+    assert lock.lease == 90
+    with pytest.raises(ValueError):
+        create_conversation_lock({'AI_CONVERSATION_LOCK': 'redis'})
@@ -0,0 +1,69 @@
+import threading
+from unittest.mock import MagicMock
+from src.services.email_dispatcher import EmailDispatcher
+
+
+def test_dispatcher_disabled_does_not_start(app):
+    dispatcher = EmailDispatcher(app)
+    assert dispatcher.enabled is False
+
+    dispatcher.notify()
+
+    assert dispatcher._thread is None
+
+
+def test_dispatcher_drains_outbox_on_notify(app):
+    app.config['EMAIL_OUTBOX_DISPATCH'] = True
+    app.config['EMAIL_OUTBOX_POLL_INTERVAL'] = 60
+    dispatcher = EmailDispatcher(app)
+
+    dispatching = threading.Event()
+    notified = threading.Event()
+    dispatched_again = threading.Event()
+    calls = []
+
+    def dispatch_due():
+        calls.append(True)
+        if len(calls) == 1:
+            dispatching.set()
+            notified.wait(5)
+        else:
+            dispatched_again.set()
+        return 0
+
+    dispatcher._outbox_service = MagicMock()
+    dispatcher._outbox_service.dispatch_due.side_effect = dispatch_due
+
+    dispatcher.notify()
+    assert dispatching.wait(5)
+    # emails committed during a dispatch wake the thread straight away
+    # instead of waiting out the poll interval
+    dispatcher.notify()
+    notified.set()
+
+    assert dispatched_again.wait(5)
+    dispatcher.stop(timeout=5)
+    assert not dispatcher._thread.is_alive()
+    assert len(calls) == 2
+
+
+def test_dispatcher_survives_dispatch_errors(app):
+    app.config['EMAIL_OUTBOX_DISPATCH'] = True
+    app.config['EMAIL_OUTBOX_POLL_INTERVAL'] = 0.01
+    dispatcher = EmailDispatcher(app)
+
+    calls = []
+
+    def dispatch_due():
+        calls.append(True)
+        if len(calls) == 3:
+            dispatcher._stop.set()
+        raise RuntimeError('database unavailable')
+
+    dispatcher._outbox_service = MagicMock()
+    dispatcher._outbox_service.dispatch_due.side_effect = dispatch_due
+
+    dispatcher.start()
+    dispatcher._thread.join(timeout=5)
+
+    assert len(calls) == 3
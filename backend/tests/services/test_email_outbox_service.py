@@ -0,0 +1,136 @@
+import pytest
+from datetime import datetime, timezone, timedelta
+from unittest.mock import patch
+from src.services.email_outbox_service import (
+    BOOKING_CONFIRMATION, EmailOutboxService
+)
+from src.services.booking_service import BookingService
+from src.models.email_outbox import OutboxEmail, OutboxStatus
+from src import db, mail
+
+
+@pytest.fixture
+def outbox_service():
+    return EmailOutboxService()
+
+
+@pytest.fixture
+def booking(app):
+    start_time = datetime(2030, 1, 7, 10, 0, tzinfo=timezone.utc)
+    return BookingService().create_booking({
+        'user': {'email': 'test@example.com', 'full_name': 'Test User'},
+        'timeslots': [
+            {'start_time': start_time.isoformat()},
+            {'start_time': (start_time + timedelta(hours=1)).isoformat()}
+        ]
+    })
+
+
+def test_create_booking_enqueues_confirmation(booking):
+    email = OutboxEmail.query.one()
+
+    assert email.kind == BOOKING_CONFIRMATION
+    assert email.status == OutboxStatus.PENDING
+    assert email.attempts == 0
+    assert email.payload == {
+        'email': 'test@example.com',
+        'booking_date': '2030-01-07',
+        'booking_time': {'start': '10:00', 'end': '12:00'}
+    }
+
+
+def test_dispatch_due_sends_email(app, outbox_service, booking):
+    app.config['MAIL_USERNAME'] = 'cafe@example.com'
+    with mail.record_messages() as sent:
+        assert outbox_service.dispatch_due() == 1
+
+    assert len(sent) == 1
+    assert sent[0].recipients == ['test@example.com']
+    assert '10:00 - 12:00' in sent[0].body
+    email = OutboxEmail.query.one()
+    assert email.status == OutboxStatus.SENT
+    assert email.sent_at is not None
+
+    # nothing left to send
+    assert outbox_service.dispatch_due() == 0
+
+
+def test_dispatch_due_retries_with_backoff(app, outbox_service, booking):
+    app.config['EMAIL_OUTBOX_BACKOFF'] = 30
+    app.config['EMAIL_OUTBOX_MAX_BACKOFF'] = 45
+
+    with patch('src.services.email_service.PooledSender.send',
+               side_effect=RuntimeError('SMTP down')):
+        before = datetime.now(timezone.utc).replace(tzinfo=None)
+        assert outbox_service.dispatch_due() == 1
+
+        email = OutboxEmail.query.one()
+        assert email.status == OutboxStatus.PENDING
+        assert email.attempts == 1
+        assert email.last_error == 'SMTP down'
+        delay = email.next_attempt_at.replace(tzinfo=None) - before
+        assert timedelta(seconds=29) < delay < timedelta(seconds=31)
+
+        # not due yet
+        assert outbox_service.dispatch_due() == 0
+
+        email.next_attempt_at = datetime.now(timezone.utc)
+        db.session.commit()
+        assert outbox_service.dispatch_due() == 1
+        # second retry delay is capped
+        delay = email.next_attempt_at.replace(tzinfo=None) - before
+        assert delay < timedelta(seconds=46)
+
+
+def test_dispatch_due_gives_up_after_max_attempts(app, outbox_service,
+                                                  booking):
+    app.config['EMAIL_OUTBOX_MAX_ATTEMPTS'] = 2
+    email = OutboxEmail.query.one()
+
+    with patch('src.services.email_service.PooledSender.send',
+               side_effect=RuntimeError('SMTP down')):
+        for _ in range(2):
+            email.next_attempt_at = datetime.now(timezone.utc)
+            db.session.commit()
+            outbox_service.dispatch_due()
+
+    assert email.status == OutboxStatus.FAILED
+    assert email.attempts == 2
+    assert outbox_service.dispatch_due() == 0
+
+
+def test_dispatch_due_unknown_kind(app, outbox_service):
+    db.session.add(OutboxEmail(kind='unknown', payload={}))
+    db.session.commit()
+
+    outbox_service.dispatch_due()
+
+    email = OutboxEmail.query.one()
+    assert email.attempts == 1
+    assert 'Unknown outbox email kind' in email.last_error
+
+
+def test_dispatch_due_reuses_one_connection(app, outbox_service, booking):
+    from src.services.email_service import PooledSender
+
+    second = BookingService().create_booking({
+        'user': {'email': 'other@example.com', 'full_name': 'Other User'},
+        'timeslots': [{'start_time': '2030-01-08T10:00:00+00:00'}]
+    })
+    assert second.id is not None
+    app.config['MAIL_USERNAME'] = 'cafe@example.com'
+
+    senders = []
+    original_init = PooledSender.__init__
+
+    def record_sender(self, *args, **kwargs):
+        original_init(self, *args, **kwargs)
+        senders.append(self)
+
+    with patch.object(PooledSender, '__init__', record_sender), \
+            mail.record_messages() as sent:
+        assert outbox_service.dispatch_due() == 2
+
+    assert len(sent) == 2
+    assert len(senders) == 1
+    assert senders[0].connections_opened == 1
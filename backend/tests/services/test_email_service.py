@@ -1,7 +1,12 @@
 import pytest
-from datetime import datetime, timezone
-from unittest.mock import Mock, patch
+from datetime import datetime, timezone, timedelta
+from pathlib import Path
+from unittest.mock import Mock
+from ics import Calendar
 from src.services.email_service import EmailService
+from src.services.ics_renderer import escape_text, fold_line
+
+GOLDEN_DIR = Path(__file__).parent / 'golden'
 
 
 @pytest.fixture
@@ -28,23 +33,10 @@ def test_get_mail_initialization(app, email_service):
         assert mail is not None
 
 
-def test_send_confirmation_success(app, email_service, valid_booking_data):
-    with app.app_context():
-        mock_mail = Mock()
-        with patch.object(email_service, '_get_mail', return_value=mock_mail):
-            result = email_service.send_confirmation(
-                valid_booking_data['email'],
-                valid_booking_data['booking_date'],
-                valid_booking_data['booking_time']
-            )
-            assert result is True
-            mock_mail.send.assert_called_once()
-
-
-def test_send_confirmation_missing_parameters(app, email_service):
+def test_build_confirmation_missing_parameters(app, email_service):
     with app.app_context():
         with pytest.raises(ValueError, match="Missing required parameters"):
-            email_service.send_confirmation(None, None, None)
+            email_service.build_confirmation(None, None, None)
 
 
 def test_create_calendar_event(app, email_service, valid_booking_data):
@@ -60,15 +52,59 @@ def test_create_calendar_event(app, email_service, valid_booking_data):
             "%Y-%m-%d %H:%M"
         ).replace(tzinfo=timezone.utc)
 
-        calendar = email_service._create_calendar_event(
+        content = email_service._create_calendar_event(
             valid_booking_data['email'],
             start_time,
             end_time
         )
-        event = list(calendar.events)[0]
+        # parse with the ics library that used to build the invitation
+        event = list(Calendar(content).events)[0]
         assert event.name == "Dialogue Cafe Booking"
         assert event.begin.datetime == start_time
         assert event.end.datetime == end_time
+        assert event.location == EmailService.LOCATION
+        assert event.description == (
+            "Your booking at Dialogue Cafe is confirmed!")
+        assert "METHOD:REQUEST\r\n" in content
+
+
+def test_calendar_event_matches_golden(app, email_service):
+    app.config['MAIL_USERNAME'] = 'cafe@example.com'
+    with app.app_context():
+        content = email_service._get_ics_renderer().render(
+            'test@example.com',
+            datetime(2024, 1, 20, 10, 0, tzinfo=timezone.utc),
+            datetime(2024, 1, 20, 11, 0, tzinfo=timezone.utc),
+            uid='booking-golden@dialoguecafe',
+            dtstamp=datetime(2024, 1, 1, 12, 0, tzinfo=timezone.utc)
+        )
+    with open(GOLDEN_DIR / 'booking_invitation.ics', newline='') as f:
+        assert content == f.read()
+
+
+def test_calendar_event_has_unique_uid(app, email_service):
+    app.config['MAIL_USERNAME'] = 'cafe@example.com'
+    start_time = datetime(2024, 1, 20, 10, 0, tzinfo=timezone.utc)
+    with app.app_context():
+        first, second = [
+            list(Calendar(email_service._create_calendar_event(
+                'test@example.com', start_time, start_time + timedelta(hours=1)
+            )).events)[0].uid
+            for _ in range(2)
+        ]
+    assert first != second
+
+
+def test_ics_lines_are_folded_and_escaped():
+    long_text = 'Caf\u00e9; ' * 20 + 'a,b\\c\nd'
+    line = fold_line(f"DESCRIPTION:{escape_text(long_text)}")
+    physical = line.split('\r\n')
+    assert len(physical) > 1
+    assert all(len(part.encode('utf-8')) <= 75 for part in physical)
+    assert all(part.startswith(' ') for part in physical[1:])
+    unfolded = line.replace('\r\n ', '')
+    assert unfolded.endswith('a\\,b\\\\c\\nd')
+    assert '\\; ' in unfolded
 
 
 def test_mail_not_initialized(app, email_service):
@@ -90,18 +126,72 @@ def test_get_mail_caching(app, email_service):
         assert first_mail is second_mail
 
 
-def test_send_confirmation_non_value_error(
-    app, email_service, valid_booking_data
-):
+def test_build_confirmation(app, email_service, valid_booking_data):
     with app.app_context():
-        with patch.object(
-            email_service, '_get_mail', side_effect=Exception("Some error")
-        ):
-            with pytest.raises(
-                RuntimeError, match="Email service error: Some error"
-            ):
-                email_service.send_confirmation(
-                    valid_booking_data['email'],
-                    valid_booking_data['booking_date'],
-                    valid_booking_data['booking_time']
-                )
+        msg = email_service.build_confirmation(
+            valid_booking_data['email'],
+            valid_booking_data['booking_date'],
+            valid_booking_data['booking_time']
+        )
+        assert msg.recipients == ['test@example.com']
+        assert '10:00 - 11:00' in msg.body
+        assert msg.attachments[0].filename == 'booking.ics'
+
+
+def _mock_mail(connections):
+    mail = Mock()
+    mail.connect.side_effect = connections
+    for connection in connections:
+        connection.__enter__ = Mock(return_value=connection)
+        connection.__exit__ = Mock(return_value=None)
+    return mail
+
+
+def test_pooled_sender_reuses_connection(app):
+    from src.services.email_service import PooledSender
+
+    connection = Mock()
+    mail = _mock_mail([connection])
+
+    with PooledSender(mail) as sender:
+        for _ in range(3):
+            sender.send(Mock())
+
+    assert mail.connect.call_count == 1
+    assert connection.send.call_count == 3
+    connection.__exit__.assert_called_once()
+
+
+def test_pooled_sender_reconnects_when_dropped(app):
+    import smtplib
+    from src.services.email_service import PooledSender
+
+    dropped = Mock()
+    dropped.send.side_effect = smtplib.SMTPServerDisconnected()
+    fresh = Mock()
+    mail = _mock_mail([dropped, fresh])
+    message = Mock()
+
+    with PooledSender(mail) as sender:
+        sender.send(message)
+
+    dropped.host.close.assert_called_once()
+    fresh.send.assert_called_once_with(message)
+    assert sender.connections_opened == 2
+
+
+def test_pooled_sender_keeps_connection_on_message_error(app):
+    import smtplib
+    from src.services.email_service import PooledSender
+
+    connection = Mock()
+    connection.send.side_effect = [
+        smtplib.SMTPRecipientsRefused({}), None]
+    mail = _mock_mail([connection])
+
+    with PooledSender(mail) as sender:
+        with pytest.raises(smtplib.SMTPRecipientsRefused):
+            sender.send(Mock())
+        sender.send(Mock())
+
+    assert mail.connect.call_count == 1
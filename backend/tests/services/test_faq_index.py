@@ -0,0 +1,84 @@
+import pytest
+from src.services.ai_service import FAQ_RESPONSES
+from src.services.faq_index import FaqIndex, tokenize
+
+
+@pytest.fixture
+def faq_index():
+    return FaqIndex(FAQ_RESPONSES)
+
+
+def test_tokenize_normalises_words():
+    assert tokenize("Do you have Wi-Fi at the Café?") == ['wifi', 'cafe']
+    assert tokenize("What are the opening hours?") == [
+        'what', 'opening', 'hour']
+
+
+def test_section_headings_are_not_indexed(faq_index):
+    questions = [question for question, _ in faq_index.entries]
+
+    assert "GENERAL INFORMATION" not in questions
+    assert len(questions) == len(
+        [answer for _, answer in FAQ_RESPONSES if answer != "."])
+
+
+@pytest.mark.parametrize("message,question", [
+    ("What are your opening hours?",
+     "What are the opening hours of Dialogue Café?"),
+    ("where are you located?", "Where is Dialogue Café located?"),
+    ("Is there wifi", "Do you provide Wi-Fi for customers?"),
+    ("what payment methods do you accept",
+     "What payment methods do you accept?"),
+])
+def test_match_answers_known_questions(faq_index, message, question):
+    answer = dict(FAQ_RESPONSES)[question]
+
+    assert faq_index.match(message) == answer
+
+
+@pytest.mark.parametrize("message", [
+    "hi",
+    "Can I book a table for 2pm tomorrow?",
+    "Show me the latte video",
+    "What time do you close on Friday?",
+    "Can I host an event on Friday at 3pm?",
+])
+def test_match_leaves_other_messages_to_the_assistant(faq_index, message):
+    assert faq_index.match(message) is None
+
+
+def test_match_requires_margin_over_runner_up():
+    faq_index = FaqIndex([
+        ("Do you sell coffee beans?", "Yes"),
+        ("Do you sell coffee cups?", "No"),
+    ], min_score=0.1, min_margin=0.2)
+
+    assert faq_index.match("coffee") is None
+    assert faq_index.match("coffee beans") == "Yes"
+
+
+def test_match_threshold_is_configurable():
+    message = "Is there a student discount"
+    strict = FaqIndex(FAQ_RESPONSES)
+    lenient = FaqIndex(FAQ_RESPONSES, min_score=0.3)
+
+    assert strict.match(message) is None
+    assert lenient.match(message).startswith("We are currently applying 15%")
+
+
+def test_stats_track_hit_rate(faq_index):
+    faq_index.match("What are your opening hours?")
+    faq_index.match("Can I book a table for 2pm tomorrow?")
+
+    stats = faq_index.stats()
+
+    assert stats['lookups'] == 2
+    assert stats['hits'] == 1
+    assert stats['hit_rate'] == 0.5
+
+
+def test_suggest_returns_loose_matches(faq_index):
+    suggestions = faq_index.suggest("Is there wifi I could use?")
+
+    assert suggestions[0][0] == "Do you provide Wi-Fi for customers?"
+    assert faq_index.suggest("Quantum chromodynamics") == []
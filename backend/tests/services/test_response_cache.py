@@ -0,0 +1,60 @@
+import pytest
+from unittest.mock import patch
+from src.services.response_cache import ResponseCache, normalize_message
+
+
+def test_normalize_message():
+    assert normalize_message("  Where's the  CAFÉ?! ") == "where s the cafe"
+    assert normalize_message("Where is the cafe") == normalize_message(
+        "where is the café?")
+
+
+def test_get_returns_stored_response():
+    cache = ResponseCache()
+
+    assert cache.set('key', "We are on campus") is True
+
+    assert cache.get('key') == "We are on campus"
+    assert cache.get('other') is None
+    stats = cache.stats()
+    assert stats['hits'] == 1
+    assert stats['misses'] == 1
+    assert stats['hit_rate'] == 0.5
+
+
+def test_entries_expire_after_ttl():
+    cache = ResponseCache(ttl=60)
+    with patch('src.services.response_cache.time.monotonic',
+               return_value=1000):
+        cache.set('key', "Hello")
+    with patch('src.services.response_cache.time.monotonic',
+               return_value=1061):
+        assert cache.get('key') is None
+    assert cache.stats()['size'] == 0
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResponseCache(max_entries=2)
+    cache.set('a', "A")
+    cache.set('b', "B")
+    cache.get('a')
+
+    cache.set('c', "C")
+
+    assert cache.get('b') is None
+    assert cache.get('a') == "A"
+    assert cache.stats()['evictions'] == 1
+
+
+@pytest.mark.parametrize("response", [
+    "",
+    "Monday at 2pm is available, shall I book it?",
+    "You can see free timeslots on the booking page.",
+])
+def test_stateful_replies_are_not_stored(response):
+    cache = ResponseCache()
+
+    assert cache.set('key', response) is False
+
+    assert cache.get('key') is None
+    assert cache.stats()['skipped'] == 1
@@ -0,0 +1,96 @@
+import pytest
+from unittest.mock import patch
+from src.services.run_polling import (
+    PollBackoff, RunBudget, RunMetrics, RunTimeout)
+
+
+def test_backoff_grows_to_max_delay():
+    backoff = PollBackoff(initial_delay=0.25, max_delay=1.0, jitter=0)
+
+    delays = [backoff.next_delay() for _ in range(5)]
+
+    assert delays == [0.25, 0.5, 1.0, 1.0, 1.0]
+
+
+def test_backoff_reset():
+    backoff = PollBackoff(initial_delay=0.25, max_delay=1.0, jitter=0)
+    backoff.next_delay()
+    backoff.next_delay()
+
+    backoff.reset()
+
+    assert backoff.next_delay() == 0.25
+
+
+@pytest.mark.parametrize("sample,expected", [(0.0, 1.0), (1.0, 0.8)])
+def test_backoff_jitter_only_shortens_delay(sample, expected):
+    backoff = PollBackoff(initial_delay=1.0, max_delay=1.0, jitter=0.2)
+
+    with patch('src.services.run_polling.random.random',
+               return_value=sample):
+        assert backoff.next_delay() == pytest.approx(expected)
+
+
+def test_run_metrics_stats():
+    metrics = RunMetrics()
+    for polls, latency in [(1, 0.5), (3, 1.5), (2, 1.0)]:
+        metrics.record(polls, latency)
+
+    assert metrics.stats() == {
+        'runs': 3,
+        'polls': 6,
+        'polls_per_run': 2.0,
+        'latency_p50': 1.0,
+        'latency_p95': 1.5,
+        'timeouts': 0,
+        'cancellations': 0,
+        'cancellations_pending': 0
+    }
+
+
+def test_run_metrics_empty():
+    stats = RunMetrics().stats()
+
+    assert stats['runs'] == 0
+    assert stats['polls_per_run'] == 0.0
+    assert stats['latency_p50'] == 0.0
+
+
+def test_run_metrics_window_keeps_recent_latencies():
+    metrics = RunMetrics(window=2)
+    for latency in [10.0, 1.0, 2.0]:
+        metrics.record(1, latency)
+
+    stats = metrics.stats()
+    assert stats['runs'] == 3
+    assert stats['latency_p95'] == 2.0
+
+
+def test_run_budget_counts_down():
+    with patch('src.services.run_polling.time.monotonic',
+               side_effect=[100.0, 104.0, 111.0]):
+        budget = RunBudget(10)
+
+        assert budget.remaining() == 6.0
+        assert budget.remaining() == 0.0
+
+
+def test_run_budget_check_raises_when_expired():
+    budget = RunBudget(0)
+
+    assert budget.expired()
+    with pytest.raises(RunTimeout, match="Timeout waiting for assistant"):
+        budget.check()
+
+
+def test_run_metrics_count_timeouts_and_cancellations():
+    metrics = RunMetrics()
+    metrics.record_timeout()
+    metrics.record_cancellation(finished=True)
+    metrics.record_cancellation(finished=False)
+
+    stats = metrics.stats()
+
+    assert stats['timeouts'] == 1
+    assert stats['cancellations'] == 1
+    assert stats['cancellations_pending'] == 1
@@ -0,0 +1,233 @@
+import json
+import threading
+import pytest
+from unittest.mock import MagicMock, patch
+from src.services.secret_provider import (
+    CachedSecretProvider, EnvironmentSecretProvider, FileSecretProvider,
+    KeyVaultSecretProvider, SecretNotFound, SecretProvider,
+    create_secret_provider)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeProvider(SecretProvider):
+    def __init__(self, value='key-1'):
+        self.value = value
+        self.calls = 0
+        self.error = None
+
+    def get_secret(self, name):
+        self.calls += 1
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+@pytest.fixture
+def cached():
+    provider = FakeProvider()
+    clock = FakeClock()
+    secrets = CachedSecretProvider(
+        provider, ttl=100, refresh_ahead=20, retry_interval=5, clock=clock)
+    # refreshes are driven by the tests, not the background thread
+    secrets._start = lambda: None
+    return secrets, provider, clock
+
+
+def test_environment_provider():
+    provider = EnvironmentSecretProvider({'OPENAI_API_KEY': 'secret'})
+
+    assert provider.get_secret('openai-api-key') == 'secret'
+    with pytest.raises(SecretNotFound, match='OTHER_KEY'):
+        provider.get_secret('other-key')
+
+
+def test_file_provider(tmp_path):
+    path = tmp_path / 'secrets.json'
+    provider = FileSecretProvider(str(path))
+
+    with pytest.raises(SecretNotFound, match='does not exist'):
+        provider.get_secret('openai-api-key')
+
+    path.write_text(json.dumps({'openai-api-key': 'secret'}))
+    assert provider.get_secret('openai-api-key') == 'secret'
+    with pytest.raises(SecretNotFound):
+        provider.get_secret('other-key')
+
+
+@patch('src.services.secret_provider.DefaultAzureCredential')
+@patch('src.services.secret_provider.SecretClient')
+def test_key_vault_provider_builds_client_once(mock_client, mock_credential):
+    mock_client.return_value.get_secret.return_value = MagicMock(
+        value='secret')
+    provider = KeyVaultSecretProvider('test-vault')
+
+    mock_client.assert_not_called()
+    assert provider.get_secret('openai-api-key') == 'secret'
+    assert provider.get_secret('openai-api-key') == 'secret'
+
+    mock_client.assert_called_once_with(
+        vault_url='https://test-vault.vault.azure.net',
+        credential=mock_credential.return_value)
+
+
+def test_cached_secret_is_fetched_once(cached):
+    secrets, provider, clock = cached
+
+    assert secrets.get_secret('openai-api-key') == 'key-1'
+    clock.now += 99
+    assert secrets.get_secret('openai-api-key') == 'key-1'
+
+    assert provider.calls == 1
+    assert secrets.stats()['hits'] == 1
+    assert secrets.stats()['misses'] == 1
+
+
+def test_refresh_picks_up_rotated_secret(cached):
+    secrets, provider, clock = cached
+    changes = []
+    secrets.subscribe(lambda name, value: changes.append((name, value)))
+    secrets.get_secret('openai-api-key')
+
+    assert secrets.stats()['next_refresh'] == 80
+    provider.value = 'key-2'
+    clock.now += 80
+    assert secrets.refresh('openai-api-key') is True
+
+    assert secrets.get_secret('openai-api-key') == 'key-2'
+    assert changes == [('openai-api-key', 'key-2')]
+    assert secrets.stats()['changes'] == 1
+
+
+def test_unchanged_secret_does_not_notify(cached):
+    secrets, provider, clock = cached
+    changes = []
+    secrets.subscribe(lambda name, value: changes.append((name, value)))
+    secrets.get_secret('openai-api-key')
+
+    secrets.refresh('openai-api-key')
+
+    assert changes == []
+
+
+def test_failed_refresh_keeps_value_and_retries(cached):
+    secrets, provider, clock = cached
+    secrets.get_secret('openai-api-key')
+    provider.error = RuntimeError('vault unavailable')
+    clock.now += 80
+
+    assert secrets.refresh('openai-api-key') is False
+
+    assert secrets.get_secret('openai-api-key') == 'key-1'
+    assert secrets.stats()['refresh_failures'] == 1
+    assert secrets.stats()['next_refresh'] == 5
+
+
+def test_expired_secret_is_returned_when_fetch_fails(cached):
+    secrets, provider, clock = cached
+    secrets.get_secret('openai-api-key')
+    provider.error = RuntimeError('vault unavailable')
+    clock.now += 100
+
+    assert secrets.get_secret('openai-api-key') == 'key-1'
+    assert provider.calls == 2
+
+
+def test_first_fetch_failure_is_raised(cached):
+    secrets, provider, clock = cached
+    provider.error = RuntimeError('vault unavailable')
+
+    with pytest.raises(RuntimeError, match='vault unavailable'):
+        secrets.get_secret('openai-api-key')
+
+
+def test_background_thread_refreshes_before_expiry():
+    refreshed = threading.Event()
+
+    class RotatingProvider(SecretProvider):
+        def __init__(self):
+            self.calls = 0
+
+        def get_secret(self, name):
+            self.calls += 1
+            return f'key-{self.calls}'
+
+    secrets = CachedSecretProvider(
+        RotatingProvider(), ttl=0.2, refresh_ahead=0.15)
+    secrets.subscribe(lambda name, value: refreshed.set())
+    try:
+        assert secrets.get_secret('openai-api-key') == 'key-1'
+        assert refreshed.wait(5)
+        assert secrets.get_secret('openai-api-key') != 'key-1'
+    finally:
+        secrets.stop(timeout=5)
+
+
+def test_refresh_ahead_is_capped_below_ttl(cached):
+    secrets, provider, clock = cached
+    secrets = CachedSecretProvider(
+        provider, ttl=100, refresh_ahead=100, clock=clock)
+
+    assert secrets.refresh_ahead == 50
+
+
+def test_background_thread_does_not_spin_with_short_ttl():
+    """Test a TTL no longer than refresh_ahead doesn't refresh nonstop"""
+    provider = FakeProvider()
+    secrets = CachedSecretProvider(
+        provider, ttl=0.1, refresh_ahead=120, min_refresh_interval=0.2)
+    try:
+        secrets.get_secret('openai-api-key')
+        secrets._stop.wait(0.5)
+    finally:
+        secrets.stop(timeout=5)
+
+    # the first fetch, then a refresh every 0.2 seconds at most
+    assert 2 <= provider.calls <= 4
+
+
+def test_create_secret_provider(tmp_path):
+    assert isinstance(
+        create_secret_provider({'SECRET_PROVIDER': 'env',
+                                'SECRET_CACHE_TTL': 0}),
+        EnvironmentSecretProvider)
+
+    secrets = create_secret_provider({
+        'SECRET_PROVIDER': 'file',
+        'SECRET_FILE': str(tmp_path / 'secrets.json'),
+        'SECRET_CACHE_TTL': 60,
+        'SECRET_REFRESH_AHEAD': 10
+    })
+    assert isinstance(secrets, CachedSecretProvider)
+    assert isinstance(secrets.provider, FileSecretProvider)
+    assert secrets.refresh_ahead == 10
+
+    assert isinstance(
+        create_secret_provider({'KEY_VAULT_NAME': 'test-vault'}).provider,
+        KeyVaultSecretProvider)
+
+    with pytest.raises(ValueError):
+        create_secret_provider({'SECRET_PROVIDER': 'vault'})
+
+
+def test_tests_and_development_read_secrets_from_environment(app):
+    from src.config.config import DevelopmentConfig
+
+    assert isinstance(
+        create_secret_provider(app.config).provider,
+        EnvironmentSecretProvider)
+    assert DevelopmentConfig.SECRET_PROVIDER == 'env'
+
+
+def test_incomplete_provider_cannot_be_created():
+    class NoLookupProvider(SecretProvider):
+        pass
+
+    with pytest.raises(TypeError):
+        NoLookupProvider()
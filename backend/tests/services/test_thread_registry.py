@@ -0,0 +1,357 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock, patch
+from src.models.conversation_thread import ConversationThread
+from src.services.ai_service import AIService
+from src.services.thread_registry import (
+    MAX_PENDING_MESSAGES, DatabaseThreadRegistry, InMemoryThreadRegistry,
+    ThreadRegistry, create_thread_registry)
+from src import db
+
+
+def test_memory_registry_get_and_set():
+    registry = InMemoryThreadRegistry()
+
+    assert registry.get("user-1") is None
+    registry.set("user-1", "thread-1")
+
+    assert registry.get("user-1") == "thread-1"
+    stats = registry.stats()
+    assert stats['hits'] == 1
+    assert stats['misses'] == 1
+
+
+def test_memory_registry_evicts_least_recently_used():
+    registry = InMemoryThreadRegistry(max_entries=2)
+    registry.set("user-1", "thread-1")
+    registry.set("user-2", "thread-2")
+    registry.get("user-1")
+
+    registry.set("user-3", "thread-3")
+
+    assert registry.get("user-2") is None
+    assert registry.get("user-1") == "thread-1"
+    assert registry.stats()['evictions'] == 1
+
+
+def test_memory_registry_expires_idle_users():
+    registry = InMemoryThreadRegistry(ttl=60)
+    with patch('src.services.thread_registry.time.monotonic') as monotonic:
+        monotonic.return_value = 0
+        registry.set("user-1", "thread-1")
+        registry.set("user-2", "thread-2")
+
+        # using a thread extends its TTL
+        monotonic.return_value = 50
+        assert registry.get("user-1") == "thread-1"
+
+        monotonic.return_value = 70
+        assert registry.get("user-1") == "thread-1"
+        assert registry.get("user-2") is None
+
+    stats = registry.stats()
+    assert stats['expirations'] == 1
+    assert stats['size'] == 1
+
+
+def test_memory_registry_stays_bounded_with_many_users():
+    registry = InMemoryThreadRegistry(max_entries=5000)
+
+    for user in range(20000):
+        registry.set(f"user-{user}", f"thread-{user}")
+        # recent users come back while older ones have been evicted
+        if user >= 100:
+            assert registry.get(f"user-{user - 100}") == f"thread-{user - 100}"
+
+    stats = registry.stats()
+    assert stats['size'] == 5000
+    assert stats['evictions'] == 15000
+    assert registry.get("user-0") is None
+    assert registry.get("user-19999") == "thread-19999"
+
+
+def test_memory_registry_forgets_abandoned_runs():
+    registry = InMemoryThreadRegistry(max_entries=1)
+    registry.set("user-1", "thread-1")
+    registry.set_abandoned_run("user-1", "run-1")
+
+    assert registry.lookup("user-1").abandoned_run_id == "run-1"
+    # a new thread has no run in flight
+    registry.set("user-1", "thread-2")
+    assert registry.lookup("user-1").abandoned_run_id is None
+
+    registry.set_abandoned_run("user-1", "run-2")
+    registry.set("user-2", "thread-3")
+    assert registry.lookup("user-1") is None
+    assert "user-1" not in registry._abandoned_runs
+    # nothing is kept for users without a thread
+    registry.set_abandoned_run("user-3", "run-3")
+    assert registry.stats()['size'] == 1
+    assert registry.lookup("user-3") is None
+
+
+def test_memory_registry_pending_messages():
+    registry = InMemoryThreadRegistry(ttl=60)
+    exchange = [{'role': 'user', 'content': "Hi"},
+                {'role': 'assistant', 'content': "Hello"}]
+
+    with patch('src.services.thread_registry.time.monotonic') as monotonic:
+        monotonic.return_value = 0
+        registry.add_pending_messages("user-1", exchange)
+        # kept for the user's first run, which starts their thread
+        assert registry.lookup("user-1") == (None, None, tuple(exchange))
+        assert registry.get("user-1") is None
+
+        registry.set("user-1", "thread-1")
+        registry.add_pending_messages("user-1", exchange[:1])
+        assert registry.lookup("user-1").pending_messages == tuple(
+            exchange + exchange[:1])
+        registry.clear_pending_messages("user-1", 2)
+        assert registry.lookup("user-1") == (
+            "thread-1", None, (exchange[0],))
+
+        # an expired thread is not continued
+        monotonic.return_value = 100
+        registry.add_pending_messages("user-1", exchange[:1])
+        assert registry.lookup("user-1") == (None, None, (exchange[0],))
+
+
+def test_memory_registry_bounds_pending_messages():
+    registry = InMemoryThreadRegistry()
+
+    for number in range(30):
+        registry.add_pending_messages(
+            "user-1", [{'role': 'user', 'content': str(number)}])
+
+    pending = registry.lookup("user-1").pending_messages
+    assert len(pending) == MAX_PENDING_MESSAGES
+    assert pending[-1]['content'] == "29"
+
+
+def test_database_registry_get_and_set(app):
+    registry = DatabaseThreadRegistry()
+
+    assert registry.get("user-1") is None
+    registry.set("user-1", "thread-1")
+    registry.set("user-1", "thread-2")
+
+    assert registry.get("user-1") == "thread-2"
+    assert registry.stats() == {
+        'backend': 'database',
+        'size': 1,
+        'ttl': 86400,
+        'hits': 1,
+        'misses': 1,
+        'expirations': 0
+    }
+
+
+def test_database_registry_leaves_caller_session_alone(app):
+    registry = DatabaseThreadRegistry()
+
+    with patch.object(db.session, 'commit') as commit:
+        registry.set("user-1", "thread-1")
+        registry.set_abandoned_run("user-1", "run-1")
+        assert registry.lookup("user-1") == ("thread-1", "run-1", ())
+
+    commit.assert_not_called()
+
+
+def test_registry_looked_up_once_per_turn(app):
+    client = MagicMock()
+    client.beta.threads.create.return_value = MagicMock(id="thread-1")
+    client.beta.threads.runs.create.return_value = MagicMock(
+        status="completed")
+    service = AIService()
+    service.client = client
+    service.assistant = MagicMock(id="test-assistant")
+    service.thread_registry = DatabaseThreadRegistry()
+    service.get_ai_response("Hello", user_id="user-1")
+
+    with patch.object(service.thread_registry, 'lookup',
+                      wraps=service.thread_registry.lookup) as lookup:
+        service.get_ai_response("Follow up", user_id="user-1")
+
+    lookup.assert_called_once_with("user-1")
+
+
+def test_database_registry_pending_messages(app):
+    registry = DatabaseThreadRegistry(ttl=60)
+    exchange = [{'role': 'user', 'content': "Hi"},
+                {'role': 'assistant', 'content': "Hello"}]
+
+    registry.add_pending_messages("user-1", exchange)
+    assert registry.lookup("user-1") == (None, None, tuple(exchange))
+
+    registry.set("user-1", "thread-1")
+    registry.add_pending_messages("user-1", exchange[:1])
+    assert registry.lookup("user-1").pending_messages == tuple(
+        exchange + exchange[:1])
+    registry.clear_pending_messages("user-1", 2)
+    assert registry.lookup("user-1") == ("thread-1", None, (exchange[0],))
+
+    # an expired thread is not continued
+    db.session.get(ConversationThread, "user-1").last_used_at = (
+        datetime.now(timezone.utc) - timedelta(seconds=120))
+    db.session.commit()
+    registry.add_pending_messages("user-1", exchange)
+    assert registry.lookup("user-1") == (None, None, tuple(exchange))
+
+
+def test_database_registry_ignores_and_purges_expired(app):
+    registry = DatabaseThreadRegistry(ttl=60)
+    registry.set("user-1", "thread-1")
+    registry.set("user-2", "thread-2")
+    db.session.get(ConversationThread, "user-1").last_used_at = (
+        datetime.now(timezone.utc) - timedelta(seconds=120))
+    db.session.commit()
+
+    assert registry.get("user-1") is None
+    assert registry.get("user-2") == "thread-2"
+
+    assert registry.purge_expired() == 1
+    assert db.session.get(ConversationThread, "user-1") is None
+    assert registry.stats()['expirations'] == 1
+
+
+def test_database_registry_with_many_users(app):
+    registry = DatabaseThreadRegistry()
+
+    for user in range(2000):
+        registry.set(user, f"thread-{user}")
+
+    assert registry.stats()['size'] == 2000
+    assert registry.get(0) == "thread-0"
+    assert registry.get("1999") == "thread-1999"
+
+
+def test_database_registry_shared_between_workers(app):
+    """Test a follow-up message on another worker continues the thread"""
+    client = MagicMock()
+    client.beta.threads.create.return_value = MagicMock(id="thread-1")
+    client.beta.threads.runs.create.return_value = MagicMock(
+        status="completed")
+
+    workers = []
+    for _ in range(2):
+        service = AIService()
+        service.client = client
+        service.assistant = MagicMock(id="test-assistant")
+        service.thread_registry = DatabaseThreadRegistry()
+        workers.append(service)
+
+    workers[0].get_ai_response("Hello", user_id="user-1")
+    workers[1].get_ai_response("Follow up", user_id="user-1")
+
+    client.beta.threads.create.assert_called_once()
+    thread_ids = [call[1]["thread_id"] for call in
+                  client.beta.threads.messages.create.call_args_list]
+    assert thread_ids == ["thread-1", "thread-1"]
+
+
+def test_database_registry_abandoned_run(app):
+    registry = DatabaseThreadRegistry()
+    registry.set("user-1", "thread-1")
+
+    registry.set_abandoned_run("user-1", "run-1")
+    assert registry.lookup("user-1").abandoned_run_id == "run-1"
+
+    registry.set_abandoned_run("user-1", None)
+    assert registry.lookup("user-1").abandoned_run_id is None
+
+    registry.set_abandoned_run("user-1", "run-2")
+    registry.set("user-1", "thread-2")
+    assert registry.lookup("user-1").abandoned_run_id is None
+
+
+def test_database_registry_shares_abandoned_runs(app):
+    """Test another worker waits for a run the first one cancelled"""
+    client = MagicMock()
+    client.beta.threads.create.return_value = MagicMock(id="thread-1")
+    client.beta.threads.runs.create.return_value = MagicMock(
+        id="run-1", status="queued")
+    client.beta.threads.runs.retrieve.return_value = MagicMock(
+        id="run-1", status="in_progress")
+    client.beta.threads.runs.cancel.return_value = MagicMock(
+        id="run-1", status="cancelling")
+
+    workers = []
+    for _ in range(2):
+        service = AIService()
+        service.client = client
+        service.assistant = MagicMock(id="test-assistant")
+        service.poll_settings = {'initial_delay': 0, 'max_delay': 0}
+        service.run_timeout = 0
+        service.cancel_timeout = 0
+        service.thread_registry = DatabaseThreadRegistry()
+        workers.append(service)
+
+    with pytest.raises(RuntimeError, match="Timeout"):
+        workers[0].get_ai_response("Hello", user_id="user-1")
+    client.beta.threads.messages.create.reset_mock()
+
+    # the run is still stopping when the next message reaches worker 2
+    with pytest.raises(RuntimeError, match="previous response"):
+        workers[1].get_ai_response("Are you there?", user_id="user-1")
+    client.beta.threads.messages.create.assert_not_called()
+
+    # once it has stopped the message is posted and the entry dropped
+    workers[1].run_timeout = 30
+    client.beta.threads.runs.retrieve.return_value = MagicMock(
+        id="run-1", status="cancelled")
+    client.beta.threads.runs.create.return_value = MagicMock(
+        id="run-2", status="completed")
+    workers[1].get_ai_response("Are you there?", user_id="user-1")
+
+    client.beta.threads.messages.create.assert_called_once()
+    entry = workers[0].thread_registry.lookup("user-1")
+    assert entry.abandoned_run_id is None
+
+
+def test_incomplete_registry_cannot_be_created():
+    class GetOnlyRegistry(ThreadRegistry):
+        def get(self, user_id):
+            return None
+
+    with pytest.raises(TypeError):
+        GetOnlyRegistry()
+
+
+def test_create_thread_registry():
+    memory = create_thread_registry({
+        'AI_THREAD_REGISTRY': 'memory',
+        'AI_THREAD_MAX_ENTRIES': 10,
+        'AI_THREAD_TTL': 60
+    })
+    database = create_thread_registry({'AI_THREAD_REGISTRY': 'database'})
+
+    assert isinstance(memory, InMemoryThreadRegistry)
+    assert (memory.max_entries, memory.ttl) == (10, 60)
+    assert isinstance(database, DatabaseThreadRegistry)
+    with pytest.raises(ValueError, match="Unknown thread registry"):
+        create_thread_registry({'AI_THREAD_REGISTRY': 'redis'})
+
+
+def test_database_registry_on_async_path(app):
+    """Test the async path looks threads up off the event loop"""
+    import asyncio
+    from unittest.mock import AsyncMock
+
+    service = AIService()
+    service.assistant = MagicMock(id="test-assistant")
+    service.thread_registry = DatabaseThreadRegistry()
+    service.thread_registry.set("user-1", "thread-1")
+
+    client = MagicMock()
+    client.beta.threads.create = AsyncMock()
+    client.beta.threads.messages.create = AsyncMock()
+    client.beta.threads.runs.create = AsyncMock(
+        return_value=MagicMock(status="completed"))
+    client.beta.threads.messages.list = AsyncMock()
+    service.async_client = client
+
+    asyncio.run(service.get_ai_response_async("Hello", user_id="user-1"))
+
+    client.beta.threads.create.assert_not_called()
+    assert client.beta.threads.messages.create.call_args[1][
+        "thread_id"] == "thread-1"
@@ -218,3 +218,150 @@ def test_check_timeslots_valid_friday_afternoon(app, timeslot_service, user):
 
     with pytest.raises(ValueError, match="Selected time is outside opening hours"):
         timeslot_service.check_timeslots_valid(user, timeslots)
+
+
+def test_get_timeslot_usage_only_counts_booked(app, timeslot_service):
+    from src.services.booking_service import BookingService
+    start_time = datetime(2030, 1, 7, 10, 0, tzinfo=timezone.utc)
+    booking_service = BookingService()
+
+    bookings = [
+        booking_service.create_booking({
+            'user': {'email': f'user{i}@example.com',
+                     'full_name': 'Test User'},
+            'timeslots': [{'start_time': start_time.isoformat()}]
+        })
+        for i in range(3)
+    ]
+    bookings[1].cancel()
+    bookings[2].complete()
+    db.session.commit()
+
+    usage = timeslot_service.get_timeslot_usage(
+        start_time, start_time + timedelta(hours=2))
+
+    assert list(usage.values()) == [(1, 3)]
+
+
+def test_get_booked_count_drift(app, timeslot_service, user):
+    start_time = datetime(2030, 1, 7, 10, 0, tzinfo=timezone.utc)
+    timeslot = Timeslot(start_time=start_time)
+    consistent = Timeslot(start_time=start_time + timedelta(hours=1))
+    booking = Booking(user=user)
+    booking.timeslots.append(timeslot)
+    db.session.add_all([timeslot, consistent, booking])
+    db.session.commit()
+
+    drift = timeslot_service.get_booked_count_drift()
+
+    assert drift == [(timeslot, 0, 1)]
+
+
+def test_get_opening_slots_week(app, timeslot_service):
+    # Monday 2030-01-07 to Sunday 2030-01-13
+    start = datetime(2030, 1, 7, 0, 0, tzinfo=timezone.utc)
+    end = datetime(2030, 1, 13, 23, 0, tzinfo=timezone.utc)
+
+    slots = timeslot_service.get_opening_slots(start, end)
+
+    assert len(slots) == 4 * 9 + 5
+    assert slots[0] == datetime(2030, 1, 7, 8, 0, tzinfo=timezone.utc)
+    assert slots[-1] == datetime(2030, 1, 11, 12, 0, tzinfo=timezone.utc)
+    assert all(timeslot_service._is_within_opening_hours(s) for s in slots)
+
+
+def test_get_opening_slots_partial_day(app, timeslot_service):
+    start = datetime(2030, 1, 7, 15, 30, tzinfo=timezone.utc)
+    end = datetime(2030, 1, 8, 9, 0, tzinfo=timezone.utc)
+
+    slots = timeslot_service.get_opening_slots(start, end)
+
+    assert [s.isoformat() for s in slots] == [
+        '2030-01-07T16:00:00+00:00',
+        '2030-01-08T08:00:00+00:00',
+        '2030-01-08T09:00:00+00:00'
+    ]
+
+
+def test_reserve_timeslots(app, timeslot_service):
+    timeslot = Timeslot(
+        start_time=datetime(2030, 1, 7, 10, 0, tzinfo=timezone.utc),
+        capacity=2)
+    db.session.add(timeslot)
+    db.session.commit()
+
+    timeslot_service.reserve_timeslots([timeslot])
+    timeslot_service.reserve_timeslots([timeslot])
+    assert timeslot.booked_count == 2
+    assert timeslot.is_full
+
+    with pytest.raises(ValueError, match="10:00 is fully booked"):
+        timeslot_service.reserve_timeslots([timeslot])
+    assert timeslot.booked_count == 2
+
+
+def test_get_or_create_timeslots(app, timeslot_service, count_statements):
+    start = datetime(2030, 1, 7, 10, 0, tzinfo=timezone.utc)
+    start_times = [start + timedelta(hours=i) for i in range(4)]
+    existing = Timeslot(start_time=start_times[1])
+    db.session.add(existing)
+    db.session.commit()
+
+    with count_statements() as statements:
+        timeslots = timeslot_service.get_or_create_timeslots(start_times)
+
+    assert len(statements) == 2
+    assert 'DO NOTHING RETURNING' in statements[1]
+    assert timeslots[1] is existing
+    assert [ts.start_time.replace(tzinfo=timezone.utc) for ts in timeslots] \
+        == start_times
+    assert all(ts.id is not None for ts in timeslots)
+    assert Timeslot.query.count() == 4
+
+
+def test_get_or_create_timeslots_conflicting_insert(app, timeslot_service):
+    from sqlalchemy import event
+
+    start_time = datetime(2030, 1, 7, 10, 0, tzinfo=timezone.utc)
+    inserted = []
+
+    def insert_concurrently(conn, cursor, statement, *args):
+        # simulate another booking committing the slot after our SELECT
+        if statement.startswith('INSERT INTO timeslots') and not inserted:
+            inserted.append(True)
+            cursor.execute(
+                "INSERT INTO timeslots (start_time, booked_count, capacity) "
+                "VALUES ('2030-01-07 10:00:00.000000', 0, 3)")
+
+    event.listen(db.engine, 'before_cursor_execute', insert_concurrently)
+    try:
+        timeslots = timeslot_service.get_or_create_timeslots([start_time])
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', insert_concurrently)
+
+    assert inserted
+    assert len(timeslots) == 1
+    assert timeslots[0].id is not None
+    assert Timeslot.query.count() == 1
+
+
+def test_has_overlapping_timeslots_single_query(app, timeslot_service, user,
+                                                count_statements):
+    start = datetime(2020, 1, 6, 8, 0, tzinfo=timezone.utc)
+    for i in range(200):
+        booking = Booking(user=user, status=BookingStatus.BOOKED)
+        booking.timeslots.append(
+            Timeslot(start_time=start + timedelta(hours=i)))
+        db.session.add(booking)
+    db.session.commit()
+    db.session.refresh(user)
+
+    with count_statements() as statements:
+        overlapping = timeslot_service._has_overlapping_timeslots(
+            user, [start + timedelta(hours=199)])
+        not_overlapping = timeslot_service._has_overlapping_timeslots(
+            user, [start + timedelta(hours=200)])
+
+    assert overlapping is True
+    assert not_overlapping is False
+    assert len(statements) == 2
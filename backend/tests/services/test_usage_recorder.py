@@ -0,0 +1,160 @@
+from datetime import datetime, timedelta, timezone
+import pytest
+from src import db
+from src.models.assistant_run import AssistantRun, AssistantToolCall
+from src.services.usage_recorder import UsageRecorder
+from src.services.usage_service import UsageService
+
+
+def _record(recorder, **values):
+    run = {
+        'run_id': 'run-1',
+        'thread_id': 'thread-1',
+        'user_id': 'user-1',
+        'status': 'completed',
+        'prompt_tokens': 100,
+        'completion_tokens': 20,
+        'total_tokens': 120,
+        'wall_time': 1.5,
+        'polls': 3,
+        'tool_calls': []
+    }
+    run.update(values)
+    recorder.record(**run)
+
+
+def test_record_is_written_on_flush(app):
+    recorder = UsageRecorder(app)
+
+    _record(recorder, tool_calls=[('check_availability', 0.25),
+                                  ('create_booking', 0.5)])
+
+    assert AssistantRun.query.count() == 0
+    assert recorder.stats()['queued'] == 1
+
+    assert recorder.flush() == 1
+
+    run = AssistantRun.query.one()
+    assert run.run_id == 'run-1'
+    assert run.total_tokens == 120
+    assert run.polls == 3
+    assert [(call.name, call.duration) for call in run.tool_calls] == [
+        ('check_availability', 0.25), ('create_booking', 0.5)]
+    assert recorder.stats() == {
+        'enabled': True, 'queued': 0, 'written': 1, 'dropped': 0}
+
+
+def test_flush_writes_in_batches(app):
+    app.config['AI_USAGE_BATCH_SIZE'] = 2
+    recorder = UsageRecorder(app)
+
+    for number in range(5):
+        _record(recorder, run_id=f'run-{number}')
+
+    assert recorder.flush() == 5
+    assert AssistantRun.query.count() == 5
+
+
+def test_record_drops_when_queue_is_full(app):
+    app.config['AI_USAGE_MAX_QUEUE'] = 2
+    recorder = UsageRecorder(app)
+
+    for number in range(3):
+        _record(recorder, run_id=f'run-{number}')
+
+    assert recorder.stats()['queued'] == 2
+    assert recorder.stats()['dropped'] == 1
+
+
+def test_record_disabled(app):
+    app.config['AI_USAGE_ENABLED'] = False
+    recorder = UsageRecorder(app)
+
+    _record(recorder)
+
+    assert recorder.stats()['queued'] == 0
+    assert recorder.flush() == 0
+
+
+def test_writer_thread_writes_records(app):
+    app.config['AI_USAGE_WRITER'] = True
+    app.config['AI_USAGE_FLUSH_INTERVAL'] = 0.01
+    recorder = UsageRecorder(app)
+    # the writer thread gets its own session and the in-memory database
+    # is per connection, so only check it drained the queue
+    written = []
+    recorder._write = written.extend
+
+    _record(recorder)
+    recorder.start()
+    try:
+        for _ in range(500):
+            if written:
+                break
+            recorder._stop.wait(0.01)
+    finally:
+        recorder.stop(timeout=5)
+
+    assert [values['run_id'] for values in written] == ['run-1']
+
+
+def test_record_starts_writer_thread(app):
+    """Test records made outside a Flask request still get written"""
+    app.config['AI_USAGE_WRITER'] = True
+    recorder = UsageRecorder(app)
+    recorder._write = lambda batch: None
+
+    _record(recorder)
+    try:
+        assert recorder._thread.is_alive()
+    finally:
+        recorder.stop(timeout=5)
+
+
+def _add_run(user_id, total_tokens, created_at, tool_calls=(), **values):
+    run = AssistantRun(
+        run_id='run', user_id=user_id,
+        status=values.get('status', 'completed'),
+        prompt_tokens=total_tokens - 10, completion_tokens=10,
+        total_tokens=total_tokens, wall_time=values.get('wall_time', 1.0),
+        polls=2, created_at=created_at,
+        tool_calls=[AssistantToolCall(name=name, duration=duration)
+                    for name, duration in tool_calls])
+    db.session.add(run)
+
+
+def test_usage_summary(app):
+    now = datetime.now(timezone.utc)
+    _add_run('user-1', 110, now,
+             [('check_availability', 0.2), ('create_booking', 0.6)])
+    _add_run('user-1', 60, now, [('check_availability', 0.4)],
+             wall_time=3.0)
+    _add_run('user-2', 1010, now - timedelta(days=1))
+    # outside the window
+    _add_run('user-3', 5000, now - timedelta(days=30))
+    db.session.commit()
+
+    summary = UsageService().get_usage_summary(
+        days=7, prompt_cost=0.01, completion_cost=0.03)
+
+    assert summary['days'] == 7
+    assert [day['runs'] for day in summary['daily']] == [1, 2]
+    today = summary['daily'][1]
+    assert today['date'] == now.date().isoformat()
+    assert today['total_tokens'] == 170
+    assert today['max_wall_time'] == 3.0
+    assert today['cost'] == round((150 * 0.01 + 20 * 0.03) / 1000, 6)
+
+    tools = {tool['name']: tool for tool in summary['tools']}
+    assert tools['check_availability']['calls'] == 2
+    assert tools['check_availability']['avg_duration'] == pytest.approx(0.3)
+    assert tools['create_booking']['max_duration'] == 0.6
+
+    assert [(user['user_id'], user['total_tokens'])
+            for user in summary['users']] == [('user-2', 1010),
+                                              ('user-1', 170)]
+
+
+def test_usage_summary_empty(app):
+    assert UsageService().get_usage_summary() == {
+        'days': 7, 'daily': [], 'tools': [], 'users': []}
@@ -0,0 +1,123 @@
+import asyncio
+import httpx
+from unittest.mock import AsyncMock, patch
+from src.asgi import create_asgi_app
+
+
+def _post(app, path, **kwargs):
+    async def request():
+        transport = httpx.ASGITransport(app=create_asgi_app(
+            app, origins=['http://frontend.test']))
+        async with httpx.AsyncClient(
+                transport=transport, base_url='http://test') as client:
+            return await client.post(path, **kwargs)
+
+    return asyncio.run(request())
+
+
+def test_async_chat_success(app):
+    with patch('src.ai_service.get_ai_response_async',
+               new_callable=AsyncMock) as mock_response:
+        mock_response.return_value = "Hello! How can I help you?"
+
+        response = _post(app, '/api/ai/chat', json={
+            'message': 'Hi there',
+            'user_id': 'user-1'
+        })
+
+    assert response.status_code == 200
+    assert response.json() == {
+        'response': "Hello! How can I help you?",
+        'success': True
+    }
+    mock_response.assert_awaited_once_with('Hi there', 'user-1')
+
+
+def test_async_chat_runs_in_app_context(app):
+    from flask import current_app
+
+    async def get_ai_response_async(user_message, user_id):
+        return current_app.name
+
+    with patch('src.ai_service.get_ai_response_async',
+               side_effect=get_ai_response_async):
+        response = _post(app, '/api/ai/chat', json={'message': 'Hi'})
+
+    assert response.json()['response'] == app.name
+
+
+def test_async_chat_missing_message(app):
+    response = _post(app, '/api/ai/chat', json={})
+
+    assert response.status_code == 400
+    assert response.json() == {'error': 'No message provided'}
+
+
+def test_async_chat_invalid_request(app):
+    response = _post(app, '/api/ai/chat', content=b'invalid json')
+
+    assert response.status_code == 500
+    assert response.json()['success'] is False
+
+
+def test_async_chat_service_error(app):
+    with patch('src.ai_service.get_ai_response_async',
+               new_callable=AsyncMock) as mock_response:
+        mock_response.side_effect = Exception('AI service error')
+
+        response = _post(app, '/api/ai/chat', json={'message': 'Hi there'})
+
+    assert response.status_code == 500
+    assert response.json() == {'error': 'AI service error', 'success': False}
+
+
+def test_async_chat_cors_header(app):
+    with patch('src.ai_service.get_ai_response_async',
+               new_callable=AsyncMock, return_value="Hi"):
+        allowed = _post(app, '/api/ai/chat', json={'message': 'Hi'},
+                        headers={'Origin': 'http://frontend.test'})
+        other = _post(app, '/api/ai/chat', json={'message': 'Hi'},
+                      headers={'Origin': 'http://evil.test'})
+
+    assert allowed.headers['access-control-allow-origin'] == (
+        'http://frontend.test')
+    assert 'access-control-allow-origin' not in other.headers
+
+
+def test_other_routes_are_served_by_flask(app):
+    async def request():
+        transport = httpx.ASGITransport(app=create_asgi_app(app))
+        async with httpx.AsyncClient(
+                transport=transport, base_url='http://test') as client:
+            return await client.get('/')
+
+    response = asyncio.run(request())
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "message": "Welcome to the Timeslot Scheduling Tool"
+    }
+
+
+def test_flask_requests_are_served_concurrently(app):
+    from threading import Barrier
+
+    # each request waits inside the view until the other one arrives
+    barrier = Barrier(2, timeout=5)
+
+    def wait_for_other_request():
+        barrier.wait()
+        return {'status': 'success'}
+
+    app.add_url_rule('/test/wait', view_func=wait_for_other_request)
+
+    async def requests():
+        transport = httpx.ASGITransport(app=create_asgi_app(app))
+        async with httpx.AsyncClient(
+                transport=transport, base_url='http://test') as client:
+            return await asyncio.gather(client.get('/test/wait'),
+                                        client.get('/test/wait'))
+
+    responses = asyncio.run(requests())
+
+    assert [response.status_code for response in responses] == [200, 200]